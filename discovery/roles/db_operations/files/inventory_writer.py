@@ -0,0 +1,108 @@
+# Copyright 2024 Dell Inc. or its subsidiaries. All Rights Reserved.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import os
+from typing import Dict, List, Tuple
+
+inventory_header = "# This file is generated by omnia, and should not be edited\n"
+
+
+class InventoryWriter:
+    """
+    Batched writer of the omnia inventory files.
+    Additions and removals of hosts are collected per inventory file and every changed file
+    is written once, atomically, by write(). An inventory file holds one group named like
+    the file with one host per line, e.g. "node1" or "node1 ansible_host=10.5.0.101".
+    """
+
+    def __init__(self, inventory_dir: str):
+        self.inventory_dir = os.path.abspath(inventory_dir)
+        self.operations: Dict[str, List[Tuple[str, str, str]]] = {}
+
+    def add(self, inventory_file: str, entry: str) -> None:
+        """
+        Adds a host to an inventory file, replacing the line of the same host if it exists.
+
+        Args:
+            inventory_file (str): The name of the inventory file.
+            entry (str): The host line, the hostname optionally followed by host variables.
+        """
+        self.operations.setdefault(inventory_file, []).append(("add", entry.split()[0], entry))
+
+    def remove(self, inventory_file: str, hostname: str) -> None:
+        """
+        Removes a host from an inventory file.
+
+        Args:
+            inventory_file (str): The name of the inventory file.
+            hostname (str): The hostname to remove.
+        """
+        self.operations.setdefault(inventory_file, []).append(("remove", hostname, None))
+
+    def read_inventory(self, file_path: str, inventory_file: str) -> Tuple[List[str], Dict[str, str]]:
+        """
+        Reads an inventory file.
+
+        Args:
+            file_path (str): The path to the inventory file.
+            inventory_file (str): The name of the inventory file, which is also its group name.
+
+        Returns:
+            tuple: The lines before the hosts and a dictionary of hostname to host line.
+        """
+        if not os.path.exists(file_path):
+            return [inventory_header, f"[{inventory_file}]\n"], {}
+        head_lines, hosts = [], {}
+        with open(file_path, 'r', encoding='utf-8') as file:
+            for line in file:
+                stripped_line = line.strip()
+                if not hosts and (not stripped_line or stripped_line.startswith(('#', ';', '['))):
+                    head_lines.append(line if line.endswith("\n") else line + "\n")
+                elif stripped_line and not stripped_line.startswith(('#', ';')):
+                    hosts[stripped_line.split()[0]] = stripped_line
+        return head_lines, hosts
+
+    def write(self) -> Dict[str, str]:
+        """
+        Applies the collected operations and writes every changed inventory file once.
+        The file is written to a temporary file which replaces the inventory file, so readers
+        never see a partially written inventory. Inventory files are left read-only.
+
+        Returns:
+            dict: The inventory files which could not be written and the error message.
+        """
+        errors = {}
+        for inventory_file, operations in self.operations.items():
+            file_path = os.path.join(self.inventory_dir, inventory_file)
+            try:
+                head_lines, hosts = self.read_inventory(file_path, inventory_file)
+                updated_hosts = dict(hosts)
+                for operation, hostname, entry in operations:
+                    if operation == "add":
+                        updated_hosts[hostname] = entry
+                    else:
+                        updated_hosts.pop(hostname, None)
+                if updated_hosts == hosts and os.path.exists(file_path):
+                    continue
+
+                temp_file_path = file_path + ".tmp"
+                with open(temp_file_path, 'w', encoding='utf-8') as file:
+                    file.writelines(head_lines)
+                    file.writelines(entry + "\n" for entry in updated_hosts.values())
+                os.chmod(temp_file_path, 0o444)
+                os.replace(temp_file_path, file_path)
+            except OSError as err:
+                errors[inventory_file] = f"{str(type(err))} {str(err)}"
+        self.operations.clear()
+        return errors
@@ -0,0 +1,143 @@
+# Copyright 2024 Dell Inc. or its subsidiaries. All Rights Reserved.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+"""
+    This module allocates the IP addresses of the nodes from a range.
+    The addresses in use are loaded once per range and tracked in a bitmap.
+"""
+
+import ipaddress
+from psycopg2.extensions import AsIs
+
+# Allocators of the process, by table, column and range
+allocators = {}
+# Advisory locks held by the process, one per table and column
+locked_columns = set()
+
+
+class IPAllocator:
+    """
+    Allocator of the free addresses of a range of a table column.
+    The addresses of the range in use are loaded with one query, the allocator holds a
+    session advisory lock on the column until the connection is closed, so discovery
+    processes running at the same time do not hand out the same address.
+    """
+
+    def __init__(self, cursor, table, column, start_ip, end_ip):
+        """
+        Loads the addresses of the range in use.
+
+        Args:
+            cursor (psycopg2.extensions.cursor): A cursor object for executing SQL queries.
+            table (str): The table holding the addresses, e.g. cluster.nodeinfo.
+            column (str): The INET column holding the addresses, e.g. admin_ip.
+            start_ip (str): The first address of the range.
+            end_ip (str): The last address of the range.
+        """
+        self.start = int(ipaddress.IPv4Address(start_ip))
+        self.size = max(int(ipaddress.IPv4Address(end_ip)) - self.start + 1, 0)
+        self.used = bytearray((self.size + 7) // 8)
+        # First index which may be free, for every index allocations started from
+        self.next_free = {}
+        self.lock_cursor = None
+
+        lock_key = f"{table}.{column}"
+        if lock_key not in locked_columns:
+            cursor.execute("SELECT pg_advisory_lock(hashtext(%s))", (lock_key,))
+            locked_columns.add(lock_key)
+            # The lock is held as long as the session of the cursor is open
+            self.lock_cursor = cursor
+        cursor.execute("SELECT host(%s) FROM %s WHERE %s BETWEEN %s::inet AND %s::inet",
+                       (AsIs(column), AsIs(table), AsIs(column), str(start_ip), str(end_ip)))
+        for (ip,) in cursor.fetchall():
+            self.reserve(ip)
+
+    def get_index(self, ip):
+        """
+        Returns the index of an address in the range, None if it is outside of the range.
+        """
+        index = int(ipaddress.IPv4Address(ip)) - self.start
+        return index if 0 <= index < self.size else None
+
+    def is_used(self, index):
+        """
+        Returns True if the address at the index is in use.
+        """
+        return bool(self.used[index >> 3] & (1 << (index & 7)))
+
+    def set_used(self, index):
+        """
+        Marks the address at the index as in use.
+        """
+        self.used[index >> 3] |= 1 << (index & 7)
+
+    def reserve(self, ip):
+        """
+        Reserves an address of the range.
+
+        Args:
+            ip (str): The address to reserve.
+
+        Returns:
+            bool: True if the address was free and is now reserved, False if it is in use
+            or outside of the range.
+        """
+        index = self.get_index(ip)
+        if index is None or self.is_used(index):
+            return False
+        self.set_used(index)
+        return True
+
+    def allocate(self, start_ip=None):
+        """
+        Reserves the first free address of the range, from start_ip if given.
+
+        Args:
+            start_ip (str): The address to start searching from, the start of the range by default.
+
+        Returns:
+            ipaddress.IPv4Address: The reserved address, None if no address is free.
+        """
+        start_index = 0 if start_ip is None else int(ipaddress.IPv4Address(start_ip)) - self.start
+        if start_index < 0 or start_index >= self.size:
+            return None
+        # Addresses are never released, so the search resumes where the last one stopped
+        index = self.next_free.get(start_index, start_index)
+        while index < self.size and self.is_used(index):
+            index += 1
+        self.next_free[start_index] = index
+        if index >= self.size:
+            return None
+        self.set_used(index)
+        return ipaddress.IPv4Address(self.start + index)
+
+
+def get_allocator(cursor, table, column, start_ip, end_ip):
+    """
+    Returns the allocator of a range, loading the range on its first use in the process.
+
+    Args:
+        cursor (psycopg2.extensions.cursor): A cursor object for executing SQL queries.
+        table (str): The table holding the addresses, e.g. cluster.nodeinfo.
+        column (str): The INET column holding the addresses, e.g. admin_ip.
+        start_ip (str): The first address of the range.
+        end_ip (str): The last address of the range.
+
+    Returns:
+        IPAllocator: The allocator of the range.
+    """
+    key = (table, column, str(start_ip), str(end_ip))
+    if key not in allocators:
+        allocators[key] = IPAllocator(cursor, table, column, start_ip, end_ip)
+    return allocators[key]
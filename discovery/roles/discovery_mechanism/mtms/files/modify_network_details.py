@@ -15,6 +15,7 @@
 import ipaddress
 import sys
 import re
+import ip_allocator
 oim = "oim"
 
 
@@ -77,19 +78,36 @@ def check_presence_bmc_ip(cursor, temp_bmc_ip):
     return output
 
 
-def check_presence_admin_ip(cursor, temp_admin_ip):
+def get_admin_ip_allocator(cursor, uncorrelated_admin_start_ip, admin_static_start_range, admin_static_end_range):
     """
-     Check presence of admin ip in DB.
+     Get the allocator of the admin ips, the admin ips in use are loaded from DB on first use.
      Parameters:
          cursor: Pointer to omniadb DB.
-         temp_admin_ip: admin_ip whose presence we need to check in DB.
+         uncorrelated_admin_start_ip: In case correlation doesn't work, from where we should start assigning the IP.
+         admin_static_start_range: Admin static start ip
+         admin_static_end_range: Admin static end ip
      Returns:
-         bool: that gives true or false if the admin ip is present in DB.
+         IPAllocator: allocator of the admin static range.
     """
-    query = "SELECT EXISTS(SELECT admin_ip FROM cluster.nodeinfo WHERE admin_ip=%s)"
-    cursor.execute(query, (str(temp_admin_ip),))
-    output = cursor.fetchone()[0]
-    return output
+    start_ip = min(ipaddress.IPv4Address(uncorrelated_admin_start_ip), ipaddress.IPv4Address(admin_static_start_range))
+    return ip_allocator.get_allocator(cursor, "cluster.nodeinfo", "admin_ip", start_ip, admin_static_end_range)
+
+
+def reserve_admin_ip(cursor, admin_ip, uncorrelated_admin_start_ip, admin_static_start_range, admin_static_end_range):
+    """
+     Reserve a correlated admin ip, if it is not used by another node.
+     Parameters:
+         cursor: Pointer to omniadb DB.
+         admin_ip: admin_ip to reserve.
+         uncorrelated_admin_start_ip: In case correlation doesn't work, from where we should start assigning the IP.
+         admin_static_start_range: Admin static start ip
+         admin_static_end_range: Admin static end ip
+     Returns:
+         bool: true if the admin ip was free and is reserved for the node.
+    """
+    allocator = get_admin_ip_allocator(cursor, uncorrelated_admin_start_ip, admin_static_start_range,
+                                       admin_static_end_range)
+    return allocator.reserve(admin_ip)
 
 
 def cal_uncorrelated_admin_ip(cursor, uncorrelated_admin_start_ip, admin_static_start_range, admin_static_end_range,
@@ -106,24 +124,13 @@ def cal_uncorrelated_admin_ip(cursor, uncorrelated_admin_start_ip, admin_static_
           admin_ip: A valid uncorrelated admin_ip for the node.
     """
 
-    sql = f'''select admin_ip from cluster.nodeinfo where node!='oim' ORDER BY id DESC LIMIT 1'''
-    cursor.execute(sql)
-    last_admin_ip = cursor.fetchone()
-    uncorr_output = check_presence_admin_ip(cursor, uncorrelated_admin_start_ip)
-    if last_admin_ip is None or not uncorr_output:
-        admin_ip = ipaddress.IPv4Address(uncorrelated_admin_start_ip)
-        return admin_ip
-    elif uncorr_output:
-        while True:
-            uncorrelated_admin_start_ip = ipaddress.IPv4Address(uncorrelated_admin_start_ip) + 1
-            admin_ip = ipaddress.IPv4Address(uncorrelated_admin_start_ip)
-            output = check_presence_admin_ip(cursor, admin_ip)
-            if not output:
-                break
-            elif admin_ip > admin_static_end_range:
-                sys.exit(
-                    "We have reached the end of admin_static_ranges. Please do a cleanup and provide a wider range, if more nodes needs to be discovered.")
-        return admin_ip
+    allocator = get_admin_ip_allocator(cursor, uncorrelated_admin_start_ip, admin_static_start_range,
+                                       admin_static_end_range)
+    admin_ip = allocator.allocate(uncorrelated_admin_start_ip)
+    if admin_ip is None:
+        sys.exit(
+            "We have reached the end of admin_static_ranges. Please do a cleanup and provide a wider range, if more nodes needs to be discovered.")
+    return admin_ip
 
 
 def reassign_bmc_ip(cursor, bmc_static_start_ip, bmc_static_end_ip):
@@ -136,13 +143,10 @@ def reassign_bmc_ip(cursor, bmc_static_start_ip, bmc_static_end_ip):
           Returns:
               a valid bmc_ip for the node.
     """
-    temp_bmc_ip = bmc_static_start_ip
-    while True:
-        output = check_presence_bmc_ip(cursor, temp_bmc_ip)
-        if not output:
-            return temp_bmc_ip
-        elif output and temp_bmc_ip < bmc_static_end_ip:
-            temp_bmc_ip = ipaddress.IPv4Address(temp_bmc_ip) + 1
-        elif temp_bmc_ip > bmc_static_end_ip:
-            sys.exit(
-                "We have reached the end of bmc_static_ranges. Please do a cleanup and provide a wider range, if more nodes needs to be discovered.")
+    allocator = ip_allocator.get_allocator(cursor, "cluster.nodeinfo", "bmc_ip", bmc_static_start_ip,
+                                           bmc_static_end_ip)
+    bmc_ip = allocator.allocate()
+    if bmc_ip is None:
+        sys.exit(
+            "We have reached the end of bmc_static_ranges. Please do a cleanup and provide a wider range, if more nodes needs to be discovered.")
+    return bmc_ip
@@ -17,12 +17,12 @@ import ipaddress
 import sys, os
 import warnings
 import correlation_admin_bmc
-import modify_network_details
 
 db_path = sys.argv[15]
 sys.path.insert(0, db_path)
 
 import omniadb_connection
+import modify_network_details
 
 discovery_ranges = sys.argv[1]
 bmc_static_range = sys.argv[2]
@@ -107,12 +107,12 @@ def update_db():
                 modify_network_details.update_stanza_file(serial[key].lower(), node, static_stanza_path)
                 admin_ip = correlation_admin_bmc.correlation_bmc_to_admin(bmc[key], admin_subnet, netmask_bits)
                 if admin_static_start_range <= admin_ip <= admin_static_end_range:
-                    output = modify_network_details.check_presence_admin_ip(cursor, admin_ip)
-                    if not output:
+                    if modify_network_details.reserve_admin_ip(cursor, admin_ip, uncorrelated_admin_start_ip,
+                                                              admin_static_start_range, admin_static_end_range):
                         omniadb_connection.insert_node_info(serial[key], node, host_name, None, admin_ip,
                                                             bmc[key], discovery_mechanism, bmc_mode, None, None,
                                                             None)
-                    elif output:
+                    else:
                         admin_ip = modify_network_details.cal_uncorrelated_admin_ip(cursor,
                                                                                     uncorrelated_admin_start_ip,
                                                                                     admin_static_start_range,
@@ -17,12 +17,12 @@ import sys, os
 import warnings
 import ipaddress
 import correlation_admin_bmc
-import modify_network_details
 
 db_path = sys.argv[12]
 sys.path.insert(0, db_path)
 
 import omniadb_connection
+import modify_network_details
 
 dynamic_stanza_path = os.path.abspath(sys.argv[1])
 node_name = sys.argv[2]
@@ -78,12 +78,12 @@ def update_db():
                 bmc_ip = modify_network_details.reassign_bmc_ip(cursor,bmc_static_start_ip,bmc_static_end_ip)
                 admin_ip = correlation_admin_bmc.correlation_bmc_to_admin(str(bmc_ip), pxe_subnet, netmask_bits)
                 if admin_static_start_range <= admin_ip <= admin_static_end_range:
-                    output = modify_network_details.check_presence_admin_ip(cursor, admin_ip)
-                    if not output:
+                    if modify_network_details.reserve_admin_ip(cursor, admin_ip, uncorrelated_admin_start_ip,
+                                                              admin_static_start_range, admin_static_end_range):
                         omniadb_connection.insert_node_info(serial[key], node, host_name, None, admin_ip,
                                                             bmc_ip, discovery_mechanism, bmc_mode, None, None,
                                                             None)
-                    elif output:
+                    else:
                         admin_ip = modify_network_details.cal_uncorrelated_admin_ip(cursor, uncorrelated_admin_start_ip,admin_static_start_range,admin_static_end_range,discovery_mechanism)
                         omniadb_connection.insert_node_info(serial[key], node, host_name, None, admin_ip,
                                                             bmc_ip, discovery_mechanism, bmc_mode, None, None,
@@ -83,10 +83,10 @@ def insert_switch_details(cursor,switch_v3_name,switch_v3_port):
     if correlation_status == "true":
         admin_ip = correlation_admin_bmc.correlation_bmc_to_admin(str(bmc_ip), admin_subnet, netmask_bits)
         if admin_static_start_range <= admin_ip <= admin_static_end_range:
-            output = modify_network_details.check_presence_admin_ip(cursor, admin_ip)
-            if not output:
+            if modify_network_details.reserve_admin_ip(cursor, admin_ip, uncorrelated_admin_start_ip,
+                                                      admin_static_start_range, admin_static_end_range):
                 omniadb_connection.insert_node_info(None, node, host_name, None, admin_ip, bmc_ip, discovery_mechanism, bmc_mode, switch_v3_ip, switch_v3_name, switch_v3_port)
-            elif output:
+            else:
                 admin_ip = modify_network_details.cal_uncorrelated_admin_ip(cursor, uncorrelated_admin_start_ip, admin_static_start_range,admin_static_end_range,discovery_mechanism)
                 omniadb_connection.insert_node_info(None, node, host_name, None, admin_ip, bmc_ip, discovery_mechanism, bmc_mode, switch_v3_ip, switch_v3_name, switch_v3_port)
         else:
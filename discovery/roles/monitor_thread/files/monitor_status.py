@@ -36,40 +36,27 @@ class MonitoringThread(threading.Thread):
         node_details = get_node_details()
         add_details_to_db()
 
-# get_node_details() function runs 2 commands on management station:
-# nodels all nodelist.status : to check status of all nodes
-# lsdef <nodename> | grep mac : to check mac address of the node
-# These details are then stored in a dictionary format like: node_details[nodename]= [status, mac]
+# xCAT attributes fetched for all nodes, in the order they are stored in node_details
+node_attributes = ["nodelist.status", "mac.mac", "vpd.serial"]
+
+# get_node_details() function runs a single command on management station:
+# nodels all nodelist.status mac.mac vpd.serial : to get status, mac address and serial of all nodes
+# nodels prints one line per node and attribute like: nodename: mac.mac: aa:bb:cc:dd:ee:ff
+# These details are then stored in a dictionary format like: node_details[nodename]= [status, mac, serial]
 # where node_details is the dictionary name, nodename is the key to dictionary
-# value corresponding to each key is an array comprising of node status and mac address
+# value corresponding to each key is an array comprising of node status, mac address and serial
 def get_node_details():
-    node_status_cmd = '/opt/xcat/bin/nodels all nodelist.status'
-    temp = subprocess.run([node_status_cmd], shell=True,capture_output=True,text=True)
-    output = temp.stdout
-    output = output.split("\n")
-    for line in output:
-        line = line.split(':')
-        if len(line[0]) > 0:
-            node_details[line[0]] = []
-            node_details[line[0]].append(line[1].strip())
-            
-    for node in node_details.keys():
-        node_details_cmd = '/opt/xcat/bin/lsdef' + ' ' + node + ' | grep mac='
-        temp = subprocess.run([node_details_cmd], shell=True,capture_output=True,text=True)
-        output = temp.stdout
-        if len(output) > 0:
-            node_details[node].append(output.split('=')[1].strip('\n'))
-        else:
-            node_details[node].append("")
-
-    for node in node_details.keys():
-        node_details_cmd = '/opt/xcat/bin/lsdef' + ' ' + node + ' | grep serial='
-        temp = subprocess.run([node_details_cmd], shell=True,capture_output=True,text=True)
-        output = temp.stdout
-        if len(output) > 0:
-            node_details[node].append(output.split('=')[1].strip('\n'))
-        else:
-            node_details[node].append("")
+    node_details_cmd = ['/opt/xcat/bin/nodels', 'all'] + node_attributes
+    temp = subprocess.run(node_details_cmd, capture_output=True, text=True)
+    node_details.clear()
+    for line in temp.stdout.split("\n"):
+        node, _, attribute_value = line.partition(':')
+        attribute, _, value = attribute_value.strip().partition(':')
+        node = node.strip()
+        if len(node) > 0 and attribute in node_attributes:
+            if node not in node_details:
+                node_details[node] = [""] * len(node_attributes)
+            node_details[node][node_attributes.index(attribute)] = value.strip()
     return node_details
 
 
@@ -78,38 +65,54 @@ def get_node_details():
 # Else, status of node in DB will be updated to current status.
 # MAC of node will also be updated in DB if MAC address given by XCAT is a valid MAC address 
 # and if current mac address is None. 
+# All nodes are read with one query, compared in memory and the changes of all nodes are
+# written with one update in a single transaction. Inventory files are updated after the commit.
 def add_details_to_db():
     conn = omniadb_connection.create_connection()
     cursor = conn.cursor()
-
-    for node in node_details.keys():
-        node_info_db = parse_syslog.get_node_info_db(cursor, node)
+    nodes_info_db = parse_syslog.get_nodes_info_db(cursor)
+    # Reads only the computes.log lines logged since the last pass
+    parse_syslog.update_computes_log_index()
+
+    node_updates = []
+    inventory_updates = []
+    for node, (xcat_status, xcat_admin_mac, xcat_service_tag) in node_details.items():
+        node_info_db = nodes_info_db.get(node)
         if node_info_db is None:
             syslog.syslog(syslog.LOG_INFO, f"monitor_status:add_details_to_db: Unable to fetch {node} info from db")
             continue
 
-        xcat_status, xcat_admin_mac, xcat_service_tag = node_details[node][0], node_details[node][1], node_details[node][2]
         db_status, db_admin_mac, db_service_tag = node_info_db[6], node_info_db[7], node_info_db[0]
-        
+
+        updated_node_info = None
         if xcat_status == "booted" and db_status != "booted":
             updated_node_info = parse_syslog.get_updated_cpu_gpu_info(node)     # Collects latest CPU & GPU details from computes.log file
-            parse_syslog.update_db(cursor, node, updated_node_info)             # Updates DB with latest info.
-            parse_syslog.update_inventory(node_info_db, updated_node_info)      # Updates inventory with latest info.
+            inventory_updates.append((node_info_db, updated_node_info))
 
-        if xcat_status is not db_status:
-            sql_update_status = "Update cluster.nodeinfo set status = %s where node = %s"
-            cursor.execute(sql_update_status, (xcat_status, node))
-        
+        admin_mac = None
         if not db_admin_mac and xcat_admin_mac and re.match("[0-9a-f]{2}([-:]?)[0-9a-f]{2}(\\1[0-9a-f]{2}){4}$", xcat_admin_mac.lower()):
-            sql_mac = "Update cluster.nodeinfo set admin_mac = %s where node = %s"
-            cursor.execute(sql_mac, (xcat_admin_mac, node))
-        
+            admin_mac = xcat_admin_mac
+
+        service_tag = None
         if not db_service_tag and xcat_service_tag:
-            sql_serial = "Update cluster.nodeinfo set service_tag = %s where node = %s"
-            cursor.execute(sql_serial, (xcat_service_tag, node))
+            service_tag = xcat_service_tag
+
+        if xcat_status != db_status or updated_node_info or admin_mac or service_tag:
+            node_updates.append((node, xcat_status, admin_mac, service_tag, updated_node_info is not None)
+                                + (updated_node_info or (None, None, None, None)))
 
+    # Updates DB with the changes of all nodes in one transaction
+    conn.autocommit = False
+    with conn:
+        parse_syslog.update_nodes_db(cursor, node_updates)
     conn.close()
 
+    # Updates inventory with latest info, writing every changed inventory file once
+    inventory_writer = parse_syslog.InventoryWriter(parse_syslog.omnia_inventory_dir)
+    for node_info_db, updated_node_info in inventory_updates:
+        parse_syslog.update_inventory(inventory_writer, node_info_db, updated_node_info)
+    parse_syslog.write_inventory(inventory_writer)
+
 
 def main():
     try:
@@ -12,10 +12,14 @@
 #  See the License for the specific language governing permissions and
 #  limitations under the License.
 
-import commentedconfigparser
+import glob
+import json
 import os
+import re
 import syslog
 from psycopg2.extensions import cursor
+from psycopg2.extras import execute_values
+from inventory_writer import InventoryWriter
 
 def get_count(line: str) -> int:
     """
@@ -33,20 +37,20 @@ def get_count(line: str) -> int:
     return 0
 
 
-def get_node_info_db(cursor: cursor, node: str) -> tuple:
+def get_nodes_info_db(cursor: cursor) -> dict:
     """
-    Retrieves node information from the database based on the given node.
+    Retrieves the information of all nodes from the database in a single query.
 
     Parameters:
         cursor (Cursor): The database cursor object.
-        node (str): The node for which to retrieve the information.
 
     Returns:
-        tuple: A tuple containing the node information retrieved from the database.
+        dict: A dictionary with the node as key and a tuple containing the node information as value.
     """
     # Define the SQL query to retrieve node information
     query = """
         SELECT
+            node,
             service_tag,
             admin_ip,
             cpu,
@@ -58,18 +62,184 @@ def get_node_info_db(cursor: cursor, node: str) -> tuple:
             hostname
         FROM
             cluster.nodeinfo
-        WHERE
-            node = %s
     """
 
-    # Execute the SQL query with the given node
-    cursor.execute(query, (node,))
+    # Execute the SQL query
+    cursor.execute(query)
+
+    # Map every node to its info, without the node column
+    return {row[0]: row[1:] for row in cursor.fetchall()}
+
+
+# Log of the cluster nodes, the omnia_cpu_gpu_info postscript logs the CPU and GPU found on a node
+computes_log_file_path = '/var/log/xcat/computes.log'
+# Read offset of computes.log and the latest CPU and GPU found on every node
+computes_log_index_path = '/opt/omnia/.computes_log_index.json'
+
+# Records of computes.log and the (kind, vendor) they set, "No ... Found" records clear the vendor
+cpu_gpu_records = {
+    "NVIDIA GPU Found": ("gpu", "nvidia"),
+    "AMD GPU Found": ("gpu", "amd"),
+    "Intel GPU Found": ("gpu", "intel"),
+    "No GPU Found": ("gpu", ""),
+    "Intel CPU Found": ("cpu", "intel"),
+    "AMD CPU Found": ("cpu", "amd"),
+    "No CPU Found": ("cpu", ""),
+}
+cpu_gpu_record_pattern = re.compile("|".join(re.escape(record) for record in cpu_gpu_records))
+
+
+class ComputesLogIndex:
+    """
+    Index of the CPU and GPU records of computes.log.
+    Only the lines appended since the last update are read, the byte offset and the latest
+    CPU and GPU of every node are kept in a state file between runs of the monitoring thread.
+    """
+
+    def __init__(self, log_path: str = computes_log_file_path, state_path: str = computes_log_index_path):
+        self.log_path = log_path
+        self.state_path = state_path
+        self.inode = None
+        self.offset = 0
+        self.nodes = {}
+
+    def load(self) -> None:
+        """
+        Loads the state file, the whole log is read again when it is missing or invalid.
+        """
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as file:
+                state = json.load(file)
+            self.inode, self.offset, self.nodes = state["inode"], state["offset"], state["nodes"]
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError, TypeError) as err:
+            syslog.syslog(syslog.LOG_ERR, f"parse_syslog:ComputesLogIndex:load: Ignoring invalid '{self.state_path}': {str(err)}")
+            self.inode, self.offset, self.nodes = None, 0, {}
+
+    def save(self) -> None:
+        """
+        Writes the state file atomically.
+        """
+        try:
+            temp_path = self.state_path + ".tmp"
+            with open(temp_path, 'w', encoding='utf-8') as file:
+                json.dump({"inode": self.inode, "offset": self.offset, "nodes": self.nodes}, file)
+            os.replace(temp_path, self.state_path)
+        except OSError as err:
+            syslog.syslog(syslog.LOG_ERR, f"parse_syslog:ComputesLogIndex:save: Error writing '{self.state_path}': {str(err)}")
+
+    def get_rotated_log_path(self) -> str:
+        """
+        Returns the path of the rotated log which was indexed last, None if it is gone.
+        """
+        for path in glob.glob(self.log_path + "?*"):
+            try:
+                if not path.endswith(".gz") and os.stat(path).st_ino == self.inode:
+                    return path
+            except OSError:
+                continue
+        return None
+
+    def read_records(self, path: str, offset: int) -> int:
+        """
+        Indexes the complete lines of a log file from the given byte offset.
+
+        Args:
+            path (str): The path of the log file.
+            offset (int): The byte offset to start reading from.
+
+        Returns:
+            int: The byte offset after the last complete line.
+        """
+        with open(path, 'rb') as file:
+            file.seek(offset)
+            for raw_line in file:
+                # A line still being written is read again by the next update
+                if not raw_line.endswith(b"\n"):
+                    break
+                offset += len(raw_line)
+                line = raw_line.decode('utf-8', errors='replace')
+                record_match = cpu_gpu_record_pattern.search(line)
+                if record_match:
+                    # A malformed record is skipped, so the lines after it are still indexed
+                    try:
+                        self.add_record(line, record_match)
+                    except ValueError as err:
+                        syslog.syslog(syslog.LOG_ERR, f"parse_syslog:ComputesLogIndex:read_records: Skipping invalid record in '{path}': {line.strip()}: {str(err)}")
+        return offset
+
+    def add_record(self, line: str, record_match: re.Match) -> None:
+        """
+        Stores a CPU or GPU record as the latest one of the node which logged it.
+        The node is one of the words before the record, e.g. the syslog hostname.
+
+        Args:
+            line (str): The log line.
+            record_match (re.Match): The match of the record in the line.
+        """
+        kind, vendor = cpu_gpu_records[record_match.group(0)]
+        count = get_count(line) if vendor else 0
+        for word in re.split(r"[\s:\[\]]+", line[:record_match.start()]):
+            if not word or word.isdigit():
+                continue
+            # Nodes logging with their fully qualified name are found by their short name too
+            for name in {word, word.split('.')[0]}:
+                self.nodes.setdefault(name, {})[kind] = [vendor, count]
+
+    def update(self) -> None:
+        """
+        Indexes the lines appended to the log since the last update.
+        When the log was rotated, the rest of the rotated log is read before the new log.
+        """
+        try:
+            log_stat = os.stat(self.log_path)
+        except FileNotFoundError:
+            syslog.syslog(syslog.LOG_ERR, f"parse_syslog:ComputesLogIndex:update: File '{self.log_path}' not found")
+            return
+        try:
+            if self.inode is not None and self.inode != log_stat.st_ino:
+                rotated_log_path = self.get_rotated_log_path()
+                if rotated_log_path:
+                    self.read_records(rotated_log_path, self.offset)
+                self.offset = 0
+            elif log_stat.st_size < self.offset:
+                # The log was truncated in place
+                self.offset = 0
+            self.inode = log_stat.st_ino
+            self.offset = self.read_records(self.log_path, self.offset)
+        except (OSError, Exception) as err:
+            syslog.syslog(syslog.LOG_ERR, f"parse_syslog:ComputesLogIndex:update: Exception in '{self.log_path}' parsing: " + str(type(err)) + " " + str(err))
+
+    def get_cpu_gpu_info(self, node: str) -> tuple:
+        """
+        Retrieves the latest CPU and GPU information logged by a node.
+
+        Args:
+            node (str): The name of the node.
+
+        Returns:
+            tuple: A tuple containing the CPU (str), GPU (str), CPU count (int), and GPU count (int).
+        """
+        node_records = self.nodes.get(node, {})
+        cpu, cpu_count = node_records.get("cpu", ["", 0])
+        gpu, gpu_count = node_records.get("gpu", ["", 0])
+        return (cpu, gpu, cpu_count, gpu_count)
+
+
+computes_log_index = None
 
-    # Fetch the node info
-    node_info = cursor.fetchone()
 
-    # Return the node information
-    return node_info
+def update_computes_log_index() -> None:
+    """
+    Indexes the lines appended to computes.log since the last run and saves the index.
+    """
+    global computes_log_index
+    if computes_log_index is None:
+        computes_log_index = ComputesLogIndex()
+        computes_log_index.load()
+    computes_log_index.update()
+    computes_log_index.save()
 
 
 def get_updated_cpu_gpu_info(node: str) -> tuple:
@@ -82,188 +252,57 @@ def get_updated_cpu_gpu_info(node: str) -> tuple:
     Returns:
         tuple: A tuple containing the CPU (str), GPU (str), CPU count (int), and GPU count (int).
     """
-    # Define the strings to search for GPU and CPU
-    nvidia_gpu_str = "NVIDIA GPU Found"
-    amd_gpu_str = "AMD GPU Found"
-    no_gpu_str = "No GPU Found"
-    intel_cpu_str = "Intel CPU Found"
-    amd_cpu_str = "AMD CPU Found"
-    intel_gpu_str = "Intel GPU Found"
-    no_cpu_str = "No CPU Found"
-
-    # Initialize variables
-    cpu = ""
-    cpu_count = 0
-    gpu = ""
-    gpu_count = 0
-    gpu_found = False
-    cpu_found = False
-
-    # Define the path to the log file
-    computes_log_file_path = '/var/log/xcat/computes.log'
-
-    try:
-        # Open the log file
-        with open(computes_log_file_path, 'r', encoding='utf-8') as file:
-            # Read the contents of the file
-            contents = file.readlines()
-            if contents:
-                # Iterate over the lines in reverse order
-                for line in reversed(contents):
-                    # Check if the node name is present in the line
-                    if node in line:
-                        # Check if the GPU have been found
-                        if gpu_found == False:
-                            # Check if the Nvidia GPU str is present in the line
-                            if nvidia_gpu_str in line:
-                                gpu = "nvidia"
-                                gpu_count = get_count(line)
-                                gpu_found = True
-                            # Check if the AMD GPU str is present in the line
-                            elif amd_gpu_str in line:
-                                gpu = "amd"
-                                gpu_count = get_count(line)
-                                gpu_found = True
-                            # Check if the Intel GPU str is present in the line
-                            elif intel_gpu_str in line:
-                                gpu = "intel"
-                                gpu_count = get_count(line)
-                                gpu_found = True
-                            # Check if the No GPU str is present in the line
-                            elif no_gpu_str in line:
-                                gpu_found = True
-
-                        # Check if the CPU has been found
-                        if cpu_found == False:
-                            # Check if the Intel CPU str is present in the line
-                            if intel_cpu_str in line:
-                                cpu = "intel"
-                                cpu_count = get_count(line)
-                                cpu_found = True
-                            # Check if the AMD CPU str is present in the line
-                            elif amd_cpu_str in line:
-                                cpu = "amd"
-                                cpu_count = get_count(line)
-                                cpu_found = True
-                            # Check if the No CPU str is present in the line
-                            elif no_cpu_str in line:
-                                cpu_found = True
-
-                        # Break out of the loop if both GPU and CPU have been found
-                        if cpu_found == True and gpu_found == True:
-                            break
-
-    except FileNotFoundError:
-        # Log an error if the file is not found
-        syslog.syslog(syslog.LOG_ERR, f"parse_syslog:get_updated_cpu_gpu_info: File '{computes_log_file_path}' not found")
-    except IOError as err:
-        # Log an error if there is an issue reading the file
-        syslog.syslog(syslog.LOG_ERR, f"parse_syslog:get_updated_cpu_gpu_info: Error reading file '{computes_log_file_path}'")
-    except Exception as err:
-        # Log an error if there is any other exception
-        syslog.syslog(syslog.LOG_ERR, f"parse_syslog:get_updated_cpu_gpu_info: Exception in '{computes_log_file_path}' parsing: " + str(type(err)) + " " + str(err))
-    finally:
-        # Return the CPU and GPU information
-        return (cpu, gpu, cpu_count, gpu_count)
+    if computes_log_index is None:
+        update_computes_log_index()
+    return computes_log_index.get_cpu_gpu_info(node)
 
 
-def update_db(cursor: cursor, node: str, updated_node_info: tuple) -> None:
+def update_nodes_db(cursor: cursor, node_updates: list) -> None:
     """
-    Update the database with the updated node information.
+    Update the database with the changes of all nodes in a single statement.
     Args:
         cursor (cursor): The cursor object for executing SQL queries.
-        node (str): The name of the node to update.
-        updated_node_info (tuple): A tuple containing the updated information for the node.
+        node_updates (list): A list of tuples (node, status, admin_mac, service_tag, update_cpu_gpu,
+                             cpu, gpu, cpu_count, gpu_count). A None admin_mac or service_tag keeps
+                             the value in the database, cpu and gpu details are set when update_cpu_gpu is True.
     """
-    # Unpack the updated node information tuple
-    cpu, gpu, cpu_count, gpu_count = updated_node_info
+    if not node_updates:
+        return
 
     # Prepare the SQL query for updating the database
     sql_update_db = """
         UPDATE
-            cluster.nodeinfo
+            cluster.nodeinfo AS nodeinfo
         SET
-            cpu = %s,
-            gpu = %s,
-            cpu_count = %s,
-            gpu_count = %s
+            status = updates.status,
+            admin_mac = COALESCE(updates.admin_mac, nodeinfo.admin_mac),
+            service_tag = COALESCE(updates.service_tag, nodeinfo.service_tag),
+            cpu = CASE WHEN updates.update_cpu_gpu THEN updates.cpu ELSE nodeinfo.cpu END,
+            gpu = CASE WHEN updates.update_cpu_gpu THEN updates.gpu ELSE nodeinfo.gpu END,
+            cpu_count = CASE WHEN updates.update_cpu_gpu THEN updates.cpu_count ELSE nodeinfo.cpu_count END,
+            gpu_count = CASE WHEN updates.update_cpu_gpu THEN updates.gpu_count ELSE nodeinfo.gpu_count END
+        FROM
+            (VALUES %s) AS updates(node, status, admin_mac, service_tag, update_cpu_gpu, cpu, gpu, cpu_count, gpu_count)
         WHERE
-            node = %s
-    """
-    # Execute the SQL query with the updated parameters
-    params = (cpu, gpu, cpu_count, gpu_count, node)
-    cursor.execute(sql_update_db, params)
-
-
-def remove_hostname_inventory(inventory_file: str, hostname: str) -> None:
+            nodeinfo.node = updates.node
     """
-    Removes a hostname from the inventory file.
+    # Casts type the columns of the VALUES list when the first row holds NULLs
+    template = "(%s, %s, %s::macaddr, %s, %s::boolean, %s, %s, %s::integer, %s::integer)"
+    # Execute the SQL query with all rows in one statement
+    execute_values(cursor, sql_update_db, node_updates, template=template, page_size=len(node_updates))
 
-    Args:
-        inventory_file (str): The name of the inventory file.
-        hostname (str): The hostname to remove.
-    """
-    try:
-        # Read the inventory file
-        config = commentedconfigparser.CommentedConfigParser(allow_no_value=True)
-        config.read(inventory_file, encoding='utf-8')
-
-        # Change the permission of the file
-        os.chmod(inventory_file, 0o644)
-
-        # Remove hostname if exists in the inventory file
-        if not config.remove_option(inventory_file, hostname):
-            # Log a message if the hostname is not found
-            syslog.syslog(syslog.LOG_INFO, f"parse_syslog:remove_hostname_inventory: '{hostname}' is not found in '{inventory_file}'")
-            return
-
-        # Write the updated inventory file
-        with open(inventory_file, 'w', encoding='utf-8') as configfile:
-            config.write(configfile, space_around_delimiters=False)
-
-    except (OSError,
-            Exception) as err:
-        syslog.syslog(syslog.LOG_ERR, f"parse_syslog:remove_hostname_inventory: {str(type(err))} {str(err)}")
-    finally:
-        # Change the permission of the file to readonly
-        os.chmod(inventory_file, 0o444)
-
-
-def add_hostname_inventory(inventory_file: str, hostname: str) -> None:
-    """
-    Adds a hostname to the inventory file.
-    Args:
-        inventory_file (str): The path to the inventory file.
-        hostname (str): The hostname to add.
-    """
-    try:
-        # Read the config file
-        config = commentedconfigparser.CommentedConfigParser(allow_no_value=True)
-        config.read(inventory_file, encoding='utf-8')
-
-        # Change the permission of the file
-        os.chmod(inventory_file, 0o644)
 
-        # Set the hostname
-        config.set(inventory_file, hostname)
+# Directory of the inventory files, written once per monitoring pass by InventoryWriter
+omnia_inventory_dir = "/opt/omnia/omnia_inventory/"
 
-        # Write the inventory file
-        with open(inventory_file, 'w', encoding='utf-8') as configfile:
-            config.write(configfile, space_around_delimiters=False)
 
-    except (OSError,
-            Exception) as err:
-        syslog.syslog(syslog.LOG_ERR, f"parse_syslog:add_hostname_inventory: {str(type(err))} {str(err)}")
-    finally:
-        # Change the permission of the file to readonly
-        os.chmod(inventory_file, 0o444)
-
-
-def update_inventory(node_info_db: tuple, updated_node_info: tuple) -> None:
+def update_inventory(inventory_writer: InventoryWriter, node_info_db: tuple, updated_node_info: tuple) -> None:
     """
     Update the inventory files based on the updated node information.
+    The changes are collected by the inventory writer, which writes every changed file once.
 
     Args:
+        inventory_writer (InventoryWriter): The writer collecting the inventory changes of the pass.
         node_info_db (tuple): A tuple containing the node information from the database.
         updated_node_info (tuple): A tuple containing the updated node information.
     """
@@ -277,25 +316,19 @@ def update_inventory(node_info_db: tuple, updated_node_info: tuple) -> None:
         if not hostname:
             return
 
-        # Change the current working directory to the inventory directory
-        curr_dir = os.getcwd()
-        omnia_inventory_dir = "/opt/omnia/omnia_inventory/"
-        if curr_dir != omnia_inventory_dir:
-            os.chdir(omnia_inventory_dir)
-
         # Update inventory files if the CPU has been modified
         if updated_cpu != db_cpu:
             if db_cpu:
                 # Remove existing hostname from corresponding inventory file
                 inventory_file_str = "compute_cpu_intel" if db_cpu == "intel" else "compute_cpu_amd"
-                remove_hostname_inventory(inventory_file_str, hostname)
+                inventory_writer.remove(inventory_file_str, hostname)
             if updated_cpu:
                 # Add hostname to corresponding inventory file
                 inventory_file_str = "compute_cpu_intel" if updated_cpu == "intel" else "compute_cpu_amd"
-                add_hostname_inventory(inventory_file_str, hostname)
+                inventory_writer.add(inventory_file_str, hostname)
                 # Add hostname and admin ip to compute_hostname_ip inventory file
                 hostname_ip_str = f"{hostname} ansible_host={admin_ip}"
-                add_hostname_inventory("compute_hostname_ip", hostname_ip_str)
+                inventory_writer.add("compute_hostname_ip", hostname_ip_str)
 
         # Update inventory files if the GPU has been modified
         if updated_gpu != db_gpu:
@@ -307,7 +340,7 @@ def update_inventory(node_info_db: tuple, updated_node_info: tuple) -> None:
                     inventory_file_str = "compute_gpu_amd"
                 elif db_gpu == "intel":
                     inventory_file_str = "compute_gpu_intel"
-                remove_hostname_inventory(inventory_file_str, hostname)
+                inventory_writer.remove(inventory_file_str, hostname)
             if updated_gpu:
                 # Add hostname to corresponding inventory file
                 if updated_gpu == "nvidia":
@@ -316,6 +349,17 @@ def update_inventory(node_info_db: tuple, updated_node_info: tuple) -> None:
                     inventory_file_str = "compute_gpu_amd"
                 elif updated_gpu == "intel":
                     inventory_file_str = "compute_gpu_intel"
-                add_hostname_inventory(inventory_file_str, hostname)
+                inventory_writer.add(inventory_file_str, hostname)
     except Exception as e:
         syslog.syslog(syslog.LOG_ERR, f"parse_syslog:update_inventory: Exception occurred: {str(type(e))} {str(e)}")
+
+
+def write_inventory(inventory_writer: InventoryWriter) -> None:
+    """
+    Writes the inventory files changed in this pass, each file once.
+
+    Args:
+        inventory_writer (InventoryWriter): The writer collecting the inventory changes of the pass.
+    """
+    for inventory_file, err in inventory_writer.write().items():
+        syslog.syslog(syslog.LOG_ERR, f"parse_syslog:write_inventory: Error writing '{inventory_file}': {err}")
@@ -0,0 +1,295 @@
+# Copyright 2025 Dell Inc. or its subsidiaries. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Module to download large artifacts over HTTP with parallel range requests.
+
+Files are split into chunks fetched concurrently into <dest>.parts/, each chunk
+resuming from the bytes it already holds, and joined once all are complete.
+Servers without range support are read as a single resumable stream. All
+downloads share one bandwidth limit, read from DOWNLOAD_BANDWIDTH_LIMIT in bytes
+per second (0 disables it), and report their progress periodically.
+"""
+
+import os
+import json
+import time
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.adapters import HTTPAdapter
+
+# Files smaller than this are fetched as a single stream
+min_chunked_size = 64 * 1024 * 1024
+read_size = 1024 * 1024
+request_timeout = 60
+progress_interval = 10
+
+session_lock = threading.Lock()
+download_session = None
+
+def get_download_session():
+    """
+    Return the HTTP session shared by all downloads, creating it on first use.
+    """
+    global download_session
+    with session_lock:
+        if download_session is None:
+            download_session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=16, pool_maxsize=64)
+            download_session.mount('https://', adapter)
+            download_session.mount('http://', adapter)
+        return download_session
+
+def get_env_int(name, default):
+    """
+    Read a non-negative integer from the environment.
+
+    Args:
+        name: Name of the environment variable.
+        default: Value used when the variable is unset or invalid.
+    """
+    try:
+        value = int(os.environ.get(name, default))
+    except ValueError:
+        print(f"Ignoring invalid {name} value {os.environ.get(name)}")
+        return default
+    return max(value, 0)
+
+
+class BandwidthLimiter:
+    """
+    Token bucket limiting the combined throughput of all downloads.
+    """
+
+    def __init__(self, rate):
+        """
+        Args:
+            rate: Allowed bytes per second, 0 for unlimited.
+        """
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def consume(self, size):
+        """
+        Block until size bytes may be transferred.
+
+        Args:
+            size: Number of bytes about to be transferred.
+        """
+        if not self.rate:
+            return
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= size
+            wait_time = -self.tokens / self.rate if self.tokens < 0 else 0
+        if wait_time:
+            time.sleep(wait_time)
+
+
+class DownloadProgress:
+    """
+    Thread safe byte counter printing progress of a download periodically.
+    """
+
+    def __init__(self, name, total_size, done_size=0):
+        """
+        Args:
+            name: Name printed with the progress.
+            total_size: Expected size in bytes, None if unknown.
+            done_size: Bytes already present from an earlier attempt.
+        """
+        self.name = name
+        self.total_size = total_size
+        self.done_size = done_size
+        self.start_size = done_size
+        self.started = time.monotonic()
+        self.reported = self.started
+        self.lock = threading.Lock()
+
+    def add(self, size):
+        """
+        Count transferred bytes and print the progress when it is due.
+
+        Args:
+            size: Number of bytes transferred.
+        """
+        with self.lock:
+            self.done_size += size
+            now = time.monotonic()
+            if now - self.reported < progress_interval:
+                return
+            self.reported = now
+            self.report(now)
+
+    def report(self, now=None):
+        """
+        Print transferred bytes, percentage and average rate.
+        """
+        now = now or time.monotonic()
+        rate = (self.done_size - self.start_size) / max(now - self.started, 0.001)
+        percent = f"{100 * self.done_size / self.total_size:.1f}%" if self.total_size else "unknown size"
+        print(f"Downloading {self.name}: {self.done_size} bytes ({percent}), {rate / 1024 / 1024:.2f} MiB/s")
+
+
+bandwidth_limiter = BandwidthLimiter(get_env_int('DOWNLOAD_BANDWIDTH_LIMIT', 0))
+
+def get_url_info(url):
+    """
+    Fetch the size, range support, ETag and Last-Modified of a URL.
+
+    Args:
+        url: The URL of the artifact.
+
+    Returns:
+        dict: The information found, empty if the server does not answer HEAD requests.
+    """
+    try:
+        response = get_download_session().head(url, allow_redirects=True, timeout=request_timeout)
+    except requests.RequestException as err:
+        print(f"Unable to fetch headers of {url}: {err}")
+        return {}
+    if response.status_code != 200:
+        return {}
+    info = {'url': response.url,
+            'ranges': response.headers.get('Accept-Ranges', '').lower() == 'bytes'}
+    if 'Content-Length' in response.headers:
+        info['size'] = int(response.headers['Content-Length'])
+    if 'ETag' in response.headers:
+        info['etag'] = response.headers['ETag']
+    if 'Last-Modified' in response.headers:
+        info['last_modified'] = response.headers['Last-Modified']
+    return info
+
+def fetch_range(url, part_path, start, end, progress, size=None):
+    """
+    Download the bytes start..end (inclusive, end None for the rest) into part_path,
+    resuming after the bytes the part already holds.
+
+    Args:
+        url: The URL of the artifact.
+        part_path: File the bytes are appended to.
+        start: First byte offset.
+        end: Last byte offset, None to read until the end.
+        progress: DownloadProgress of the file.
+        size: Size of the artifact if known.
+    """
+    done = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    if end is not None and start + done > end:
+        return
+    # The part was complete when a previous run was interrupted before joining the parts
+    if end is None and size is not None and start + done >= size:
+        return
+    headers = {}
+    # A bounded chunk always needs a range, also the first one starting at byte 0
+    if end is not None or start + done > 0:
+        headers['Range'] = f"bytes={start + done}-{'' if end is None else end}"
+
+    with get_download_session().get(url, headers=headers, stream=True, timeout=request_timeout) as response:
+        if end is None and 'Range' in headers and response.status_code == 416:
+            # Nothing is left after the bytes the part holds, the size is checked after joining
+            return
+        response.raise_for_status()
+        if 'Range' in headers and response.status_code != 206:
+            if end is not None:
+                raise requests.RequestException(f"Server ignored the range {headers['Range']} of {url}")
+            # The server ignored the range, start the part over
+            progress.add(-done)
+            mode = 'wb'
+        else:
+            mode = 'ab'
+        with open(part_path, mode) as part_file:
+            for data in response.iter_content(read_size):
+                bandwidth_limiter.consume(len(data))
+                part_file.write(data)
+                progress.add(len(data))
+
+def download_file(url, dest_path, workers=None):
+    """
+    Download a URL to dest_path. Complete files are skipped by the download cache,
+    which verifies their digest; dest_path is always downloaded again.
+
+    Args:
+        url: The URL of the artifact.
+        dest_path: Destination file path.
+        workers: Number of concurrent range requests, defaults to DOWNLOAD_CHUNK_WORKERS.
+
+    Returns:
+        dict: Size, ETag and Last-Modified of the artifact, for the download cache.
+
+    Raises:
+        requests.RequestException: If the download fails.
+    """
+    workers = workers or get_env_int('DOWNLOAD_CHUNK_WORKERS', 4) or 1
+    info = get_url_info(url)
+    size = info.get('size')
+    source_url = info.get('url', url)
+
+    parts_directory = f"{dest_path}.parts"
+    state_path = os.path.join(parts_directory, 'state.json')
+    state = {'url': url, 'size': size, 'etag': info.get('etag'), 'last_modified': info.get('last_modified')}
+    try:
+        with open(state_path, 'r', encoding='utf-8') as state_file:
+            previous_state = json.load(state_file)
+    except (FileNotFoundError, ValueError):
+        previous_state = None
+    if previous_state != state:
+        # Parts from a different version of the artifact cannot be resumed
+        shutil.rmtree(parts_directory, ignore_errors=True)
+    os.makedirs(parts_directory, exist_ok=True)
+    with open(state_path, 'w', encoding='utf-8') as state_file:
+        json.dump(state, state_file)
+
+    if size and info.get('ranges') and size >= min_chunked_size and workers > 1:
+        chunk_size = -(-size // workers)
+        ranges = [(start, min(start + chunk_size, size) - 1) for start in range(0, size, chunk_size)]
+    else:
+        ranges = [(0, None)]
+    part_paths = [os.path.join(parts_directory, f"part{index}") for index in range(len(ranges))]
+
+    done_size = sum(os.path.getsize(part_path) for part_path in part_paths if os.path.exists(part_path))
+    progress = DownloadProgress(os.path.basename(dest_path), size, done_size)
+    with ThreadPoolExecutor(max_workers=len(ranges)) as executor:
+        futures = [executor.submit(fetch_range, source_url, part_path, start, end, progress, size)
+                   for part_path, (start, end) in zip(part_paths, ranges)]
+        for future in futures:
+            future.result()
+    progress.report()
+
+    # Every bounded chunk must hold exactly its range, a part holding more bytes
+    # means a range request was answered with the whole artifact
+    for part_path, (start, end) in zip(part_paths, ranges):
+        if end is not None and os.path.getsize(part_path) != end - start + 1:
+            shutil.rmtree(parts_directory, ignore_errors=True)
+            raise requests.RequestException(
+                f"Part {os.path.basename(part_path)} of {url} holds {os.path.getsize(part_path)} bytes, "
+                f"expected {end - start + 1}")
+
+    tmp_dest_path = f"{dest_path}.tmp"
+    with open(tmp_dest_path, 'wb') as dest_file:
+        for part_path in part_paths:
+            with open(part_path, 'rb') as part_file:
+                shutil.copyfileobj(part_file, dest_file, read_size)
+    if size is not None and os.path.getsize(tmp_dest_path) != size:
+        os.remove(tmp_dest_path)
+        shutil.rmtree(parts_directory, ignore_errors=True)
+        raise requests.RequestException(f"Downloaded size of {url} does not match {size} bytes")
+    os.replace(tmp_dest_path, dest_path)
+    shutil.rmtree(parts_directory, ignore_errors=True)
+    return info
@@ -20,6 +20,15 @@ This module provides utility functions for managing package statuses and running
 import subprocess
 import os
 import shlex
+import shutil
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from status_store import get_status_store
+
+# Records the package signature repository metadata was last generated for
+metadata_state_file = ".omnia_metadata_state"
+# apt-ftparchive cache of parsed .deb control data
+deb_cache_db_file = ".omnia_packages_cache.db"
 
 def update_status(package_name, package_type, status, status_file_path):
     """
@@ -30,46 +39,68 @@ def update_status(package_name, package_type, status, status_file_path):
     status: The status of the package.
     status_file_path: The path to the status file.
     """
-    # Read existing statuses from the status file
-    try:
-        with open(status_file_path, 'r', encoding='utf-8') as status_file:
-            existing_statuses = status_file.readlines()
-    except FileNotFoundError:
-        existing_statuses = []
+    get_status_store(status_file_path).update(package_name, package_type, status)
 
-    # Skip writing entries with status "Skipped"
-    #if status == "Skipped":
-    #    return
+def get_directory_signature(directory, extension):
+    """
+    Compute a signature of the packages in a directory from their names, sizes and mtimes.
 
-    package_status = f"{package_name},{package_type},{status}\n"
+    directory: The repository directory.
+    extension: The package file extension, e.g. '.rpm'.
+    """
+    sha256 = hashlib.sha256()
+    with os.scandir(directory) as entries:
+        package_files = sorted((entry.name, entry.stat()) for entry in entries
+                if entry.is_file() and entry.name.endswith(extension))
+    for name, stat in package_files:
+        sha256.update(f"{name}:{stat.st_size}:{stat.st_mtime_ns}\n".encode('utf-8'))
+    return sha256.hexdigest()
+
+def is_metadata_current(directory, metadata_path, signature):
+    """
+    Check whether the metadata of a directory was generated for the given package signature.
 
-    found = False
-    # Check if the status entry already exists in the status file
-    if existing_statuses:
-        for i, existing_status in enumerate(existing_statuses):
-            if existing_status.startswith(f"{package_name},{package_type},"):
-                existing_statuses[i] = package_status
-                found = True
-                break
+    directory: The repository directory.
+    metadata_path: Path of the generated metadata file.
+    signature: The signature returned by get_directory_signature.
+    """
+    try:
+        with open(os.path.join(directory, metadata_state_file), 'r', encoding='utf-8') as state_file:
+            return os.path.exists(metadata_path) and state_file.read().strip() == signature
+    except FileNotFoundError:
+        return False
 
-    if not found:
-        # If the entry doesn't exist, append it to the file
-        existing_statuses.append(package_status)
+def save_metadata_state(directory, signature):
+    """
+    Record the package signature the metadata of a directory was generated for.
 
-    # Write the updated status to the specified file
-    with open(status_file_path, 'w', encoding='utf-8') as status_file:
-        status_file.writelines(existing_statuses)
+    directory: The repository directory.
+    signature: The signature returned by get_directory_signature.
+    """
+    with open(os.path.join(directory, metadata_state_file), 'w', encoding='utf-8') as state_file:
+        state_file.write(f"{signature}\n")
 
 def run_createrepo_rhel(directory):
     """
     Run createrepo command on the specified directory.
 
+    Directories whose packages did not change since the last run are skipped, and
+    existing metadata is updated incrementally with createrepo --update.
+
     directory: The directory path where createrepo will be executed.
     """
     directory = shlex.quote(directory).strip("'\"")
+    signature = get_directory_signature(directory, '.rpm')
+    if is_metadata_current(directory, os.path.join(directory, 'repodata', 'repomd.xml'), signature):
+        print(f"No new packages in {directory}. Skipping createrepo.")
+        return
+
     command = ["createrepo", directory]
+    if os.path.exists(os.path.join(directory, 'repodata', 'repomd.xml')):
+        command = ["createrepo", "--update", directory]
     try:
         subprocess.run(command, check=True)
+        save_metadata_state(directory, signature)
     except subprocess.CalledProcessError as e:
         print(f"Error running createrepo in {directory}: {e}")
 
@@ -77,18 +108,43 @@ def run_dpkg_scan(directory):
     """
     Run dpkg-scanpackages command on the specified directory.
 
+    Directories whose packages did not change since the last run are skipped. When
+    apt-ftparchive is available it is used with a package cache database, so only
+    new .deb files are read.
+
     directory: The directory path where dpkg-scanpackages will be executed.
     """
-    try:
-        # Change directory to the specified directory
-        os.chdir(directory)
-
-        # Run dpkg-scanpackages command
+    signature = get_directory_signature(directory, '.deb')
+    packages_path = os.path.join(directory, "Packages")
+    if is_metadata_current(directory, packages_path, signature):
+        print(f"No new packages in {directory}. Skipping package index generation.")
+        return
+
+    if shutil.which("apt-ftparchive"):
+        command = ["apt-ftparchive", "--db", deb_cache_db_file, "packages", "."]
+    else:
         command = ["dpkg-scanpackages", ".", "/dev/null"]
-        with open("Packages", "w") as output_file:
-            subprocess.run(command, stdout=output_file, check=True)
+    try:
+        # Run the scan in the specified directory
+        with open(f"{packages_path}.tmp", "w") as output_file:
+            subprocess.run(command, stdout=output_file, check=True, cwd=directory)
+        os.replace(f"{packages_path}.tmp", packages_path)
+        save_metadata_state(directory, signature)
     except subprocess.CalledProcessError as e:
-        print(f"Error running dpkg-scanpackages in {directory}: {e}")
+        print(f"Error running {command[0]} in {directory}: {e}")
+
+def run_metadata_jobs(func, directories):
+    """
+    Regenerate the metadata of independent repository directories in parallel.
+
+    func: The metadata function run for each directory.
+    directories: The repository directories.
+    """
+    directories = [directory for directory in dict.fromkeys(directories) if os.path.exists(directory)]
+    if not directories:
+        return
+    with ThreadPoolExecutor(max_workers=len(directories)) as executor:
+        list(executor.map(func, directories))
 
 def run_createrepo_on_rhel_directories(repo_store_path, cluster_os_type, cluster_os_version, version_variables):
     """
@@ -114,9 +170,7 @@ def run_createrepo_on_rhel_directories(repo_store_path, cluster_os_type, cluster
         base_directories.append(os.path.join(repo_store_path, 'cluster', 'yum', 'amdgpu',
                     version_variables.get('amdgpu_version', '')))
 
-    for directory in base_directories:
-        if os.path.exists(directory):
-            run_createrepo_rhel(directory)
+    run_metadata_jobs(run_createrepo_rhel, base_directories)
 
 def run_createrepo_on_ubuntu_directories(repo_store_path, cluster_os_type, cluster_os_version, version_variables):
     """
@@ -147,6 +201,4 @@ def run_createrepo_on_ubuntu_directories(repo_store_path, cluster_os_type, clust
         if os.path.exists(os.path.join(repo_store_path, 'cluster', 'apt', 'intel')):
             base_directories.append(os.path.join(repo_store_path, 'cluster', 'apt', 'intel',
                         version_variables.get('intelgaudi_version', '')))
-    for directory in base_directories:
-        if os.path.exists(directory):
-            run_dpkg_scan(directory)
+    run_metadata_jobs(run_dpkg_scan, base_directories)
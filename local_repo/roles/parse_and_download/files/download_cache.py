@@ -0,0 +1,249 @@
+# Copyright 2025 Dell Inc. or its subsidiaries. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Module providing a content-addressed cache for artifacts downloaded to the repository store.
+
+Every artifact is stored once under <repo_store_path>/cluster/.download_cache/objects,
+named by its sha256 digest, and hard linked to the paths the packages expect it at.
+index.json maps each artifact (tarball, iso, pip spec, git ref) to the files it produced
+together with their size, digest, inode and mtime and the ETag/Last-Modified headers seen at download time.
+"""
+
+import os
+import json
+import shutil
+import hashlib
+import threading
+
+cache_directory_name = '.download_cache'
+hash_chunk_size = 1024 * 1024
+
+cache_instances = {}
+cache_instances_lock = threading.Lock()
+
+def get_download_cache(repo_store_path):
+    """
+    Return the download cache of a repository store, loading it on first use.
+
+    Args:
+        repo_store_path: Path to the repository store.
+    """
+    with cache_instances_lock:
+        cache = cache_instances.get(repo_store_path)
+        if cache is None:
+            cache = DownloadCache(repo_store_path)
+            cache_instances[repo_store_path] = cache
+        return cache
+
+def get_file_stat(file_path):
+    """
+    Return the inode and modification time of a file, which change when it is replaced or written.
+
+    Args:
+        file_path: Path to the file.
+    """
+    file_stat = os.stat(file_path)
+    return [file_stat.st_ino, file_stat.st_mtime_ns]
+
+def get_file_digest(file_path):
+    """
+    Compute the sha256 digest of a file.
+
+    Args:
+        file_path: Path to the file.
+    """
+    sha256 = hashlib.sha256()
+    with open(file_path, 'rb') as file:
+        for chunk in iter(lambda: file.read(hash_chunk_size), b''):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+class DownloadCache:
+    """
+    Content-addressed store and index of downloaded artifacts.
+    """
+
+    def __init__(self, repo_store_path):
+        """
+        Args:
+            repo_store_path: Path to the repository store.
+        """
+        self.cache_directory = os.path.join(repo_store_path, 'cluster', cache_directory_name)
+        self.objects_directory = os.path.join(self.cache_directory, 'objects')
+        self.index_path = os.path.join(self.cache_directory, 'index.json')
+        self.lock = threading.RLock()
+        self.entries = self.load_index()
+
+    def load_index(self):
+        """
+        Load the cache index from disk.
+        """
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as index_file:
+                return json.load(index_file).get('entries', {})
+        except FileNotFoundError:
+            return {}
+        except ValueError as err:
+            print(f"Ignoring corrupted download cache index {self.index_path}: {err}")
+            return {}
+
+    def save_index(self):
+        """
+        Atomically write the cache index to disk, caller must hold the lock.
+        """
+        os.makedirs(self.cache_directory, exist_ok=True)
+        tmp_index_path = f"{self.index_path}.tmp"
+        with open(tmp_index_path, 'w', encoding='utf-8') as index_file:
+            json.dump({'entries': self.entries}, index_file, indent=1, sort_keys=True)
+        os.replace(tmp_index_path, self.index_path)
+
+    def get_object_path(self, digest):
+        """
+        Return the path of the object holding the content with the given digest.
+
+        Args:
+            digest: sha256 digest of the content.
+        """
+        return os.path.join(self.objects_directory, digest[:2], digest)
+
+    def is_object_valid(self, file_record):
+        """
+        Check that the object of a file record exists and has the recorded size.
+
+        Args:
+            file_record: File record of an index entry.
+        """
+        object_path = self.get_object_path(file_record['digest'])
+        return os.path.isfile(object_path) and os.path.getsize(object_path) == file_record['size']
+
+    def is_path_valid(self, file_record):
+        """
+        Check that the file at the recorded path holds the recorded content.
+
+        A path hard linked to its object, or with the inode and mtime recorded when it
+        was last verified, is trusted without rehashing; any other file of the recorded
+        size is verified against the digest and its inode and mtime are recorded.
+
+        Args:
+            file_record: File record of an index entry.
+        """
+        path = file_record['path']
+        if not os.path.isfile(path) or os.path.getsize(path) != file_record['size']:
+            return False
+        object_path = self.get_object_path(file_record['digest'])
+        if os.path.exists(object_path) and os.path.samefile(path, object_path):
+            return True
+        if file_record.get('stat') == get_file_stat(path):
+            return True
+        if get_file_digest(path) != file_record['digest']:
+            return False
+        # Copies across filesystems are hashed once, not on every lookup
+        file_record['stat'] = get_file_stat(path)
+        self.save_index()
+        return True
+
+    def link_object(self, digest, dest_path):
+        """
+        Atomically place the object with the given digest at dest_path.
+
+        Args:
+            digest: sha256 digest of the content.
+            dest_path: Path the content is expected at.
+        """
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+        tmp_dest_path = f"{dest_path}.cache_tmp"
+        if os.path.lexists(tmp_dest_path):
+            os.remove(tmp_dest_path)
+        try:
+            os.link(self.get_object_path(digest), tmp_dest_path)
+        except OSError:
+            shutil.copy2(self.get_object_path(digest), tmp_dest_path)
+        os.replace(tmp_dest_path, dest_path)
+
+    def lookup(self, key, url=None):
+        """
+        Return the index entry of a source if all its files are verified.
+
+        Missing or damaged files are restored from their objects, so a hit never
+        needs the network.
+
+        Args:
+            key: The cache key of the artifact.
+            url: The URL the artifact is expected to come from, a changed URL is a miss.
+
+        Returns:
+            dict: The index entry, or None on a cache miss.
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or (url is not None and entry.get('url') != url):
+                return None
+            for file_record in entry['files']:
+                if self.is_path_valid(file_record):
+                    continue
+                if not self.is_object_valid(file_record):
+                    return None
+                print(f"Restoring {file_record['path']} from download cache")
+                self.link_object(file_record['digest'], file_record['path'])
+                file_record['stat'] = get_file_stat(file_record['path'])
+                self.save_index()
+            return entry
+
+    def store(self, key, files, url=None, headers=None):
+        """
+        Move downloaded files into the cache and record them for a source.
+
+        Content already present in the cache is kept once; the downloaded copy is
+        replaced by a link to the existing object.
+
+        Args:
+            key: The cache key of the artifact.
+            files: List of (downloaded_path, dest_path) tuples.
+            url: The URL the files were fetched from.
+            headers: Size, ETag and Last-Modified of the artifact.
+        """
+        file_records = []
+        for downloaded_path, dest_path in files:
+            digest = get_file_digest(downloaded_path)
+            size = os.path.getsize(downloaded_path)
+            with self.lock:
+                object_path = self.get_object_path(digest)
+                if os.path.isfile(object_path) and os.path.getsize(object_path) == size:
+                    if downloaded_path != dest_path:
+                        os.remove(downloaded_path)
+                else:
+                    os.makedirs(os.path.dirname(object_path), exist_ok=True)
+                    try:
+                        os.link(downloaded_path, object_path)
+                        if downloaded_path != dest_path:
+                            os.remove(downloaded_path)
+                    except OSError:
+                        shutil.move(downloaded_path, object_path)
+                if not os.path.exists(dest_path) or not os.path.samefile(dest_path, object_path):
+                    self.link_object(digest, dest_path)
+            file_records.append({'path': dest_path, 'digest': digest, 'size': size,
+                                 'stat': get_file_stat(dest_path)})
+
+        entry = {'files': file_records}
+        if url:
+            entry['url'] = url
+        if headers:
+            entry.update({name: value for name, value in headers.items()
+                          if name in ['etag', 'last_modified']})
+        with self.lock:
+            self.entries[key] = entry
+            self.save_index()
+        return entry
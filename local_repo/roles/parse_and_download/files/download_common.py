@@ -20,10 +20,15 @@ tarball,manifest,ansible-galaxy collection.
 import subprocess
 import os, shlex
 import sys
-import tarfile
+import tempfile
 from jinja2 import Template
 import shutil
 from common_utility import update_status
+import requests
+from download_cache import get_download_cache
+from chunked_downloader import download_file
+from git_mirror import get_mirror_path, init_mirror, resolve_remote_commit, fetch_commit, \
+        archive_commit, get_checkout_commit, checkout_commit
 
 def process_pip_package(package, repo_store_path, status_file_path):
     """
@@ -48,23 +53,41 @@ def process_pip_package(package, repo_store_path, status_file_path):
     os.makedirs(pip_modules_directory, exist_ok=True)  # Ensure the directory exists
     pip_modules_directory = shlex.quote(pip_modules_directory).strip("'\"")
 
-    # Pip specific processing logic goes here
-    # ...
+    # Only pinned requirements always resolve to the same files and can be served from cache
+    cache = get_download_cache(repo_store_path)
+    cache_key = f"pip:{package_name}"
+    cacheable = '==' in package_name or '://' in package_name
+    if cacheable and cache.lookup(cache_key):
+        print(f"Pip Package {package_name} already exists in {pip_modules_directory}. Skipping download.")
+        update_status(package_name, package_type, 'Success', status_file_path)
+        return
+
+    # Pinned packages are downloaded to a staging directory to learn which files they consist of
+    download_directory = pip_modules_directory
+    if cacheable:
+        download_directory = tempfile.mkdtemp(prefix='.pip_', dir=pip_modules_directory)
 
     # Download the package
     download_command = [
         python_version, '-m', 'pip', 'download',
         package_name,
-        '-d', pip_modules_directory
+        '-d', download_directory
     ]
 
     try:
         # Run the download command
         subprocess.run(download_command, check=True)
+        if cacheable:
+            cache.store(cache_key, [(os.path.join(download_directory, file_name),
+                    os.path.join(pip_modules_directory, file_name))
+                    for file_name in sorted(os.listdir(download_directory))])
         status = 'Success'
     except subprocess.CalledProcessError:
         print(f"Error: Unable to download Pip Package {package_name}")
         status = 'Failed'
+    finally:
+        if cacheable:
+            shutil.rmtree(download_directory, ignore_errors=True)
 
     # Update the status
     update_status(package_name, package_type, status, status_file_path)
@@ -99,22 +122,30 @@ def process_git_package(package, repo_store_path, status_file_path):
     clone_directory = shlex.quote(clone_directory).strip("'\"")
     tarball_path = os.path.join(git_modules_directory, f'{package_name}.tar.gz')
 
-    try:
-        # Using wget to check if the URL exists (returns 0 for success, non-zero for failure)
-        subprocess.run(['wget', '-q', '--spider', '--tries=1', url], check=True)
-        # Clone the repository only if it doesn't exist
-        if not os.path.exists(clone_directory):
-            clone_command = ['git', 'clone', '--branch', version, url, clone_directory]
-            subprocess.run(clone_command, check=True)
-
-            # Create a tarball of the cloned repository in the same directory
-            with tarfile.open(tarball_path, 'w:gz') as tar:
-                tar.add(clone_directory, arcname=package_name)
+    cache = get_download_cache(repo_store_path)
+    cache_key = f"git:{tarball_path}"
+    mirror_path = get_mirror_path(git_modules_directory, package_name)
 
-            status = "Success"
-        else:
-            print(f"Git Package {package_name} already exists in {clone_directory}. Skipping download.")
-            status = "Success"
+    try:
+        # Resolving the ref needs no objects, so an unchanged ref costs a single ls-remote
+        commit = resolve_remote_commit(url, version)
+        if commit is not None and cache.lookup(cache_key, url=f"{url}@{commit}") and \
+                get_checkout_commit(clone_directory) == commit:
+            print(f"Git Package {package_name} at {commit} already exists at {tarball_path}. Skipping download.")
+            update_status(package_name, package_type, "Success", status_file_path)
+            return
+
+        # Fetch only the requested commit into the bare mirror
+        init_mirror(mirror_path, url)
+        commit = fetch_commit(mirror_path, version, commit)
+
+        if not cache.lookup(cache_key, url=f"{url}@{commit}"):
+            archive_commit(mirror_path, commit, package_name, tarball_path)
+            cache.store(cache_key, [(tarball_path, tarball_path)], url=f"{url}@{commit}")
+        # Some consumers build from the checked out directory instead of the tarball
+        if get_checkout_commit(clone_directory) != commit:
+            checkout_commit(mirror_path, commit, clone_directory)
+        status = "Success"
     except subprocess.CalledProcessError as e:
         print(f"Error: Command failed with return code {e.returncode}")
         # Set status as "Failed"
@@ -166,35 +197,29 @@ def process_tarball_package(package, repo_store_path, status_file_path, version_
     tarball_path = os.path.join(tarball_directory, f"{package_name}.tar.gz")
     tarball_path = shlex.quote(tarball_path).strip("'\"")
 
+    cache = get_download_cache(repo_store_path)
+    cache_key = f"tarball:{tarball_path}"
+    if path_support == False and url_support == True and cache.lookup(cache_key, url=url):
+        print(f"Tarball Package {package_name} verified in download cache at {tarball_path}")
+        update_status(package_name, package_type, "Success", status_file_path)
+        return
+
     if path_support == False and url_support == True:
-        try:
-            if "nvidia-gpu-operator" in package_name:
-                pass
-            else:
-                # Using wget to check if the URL exists (returns 0 for success, non-zero for failure)
-                subprocess.run(['wget', '-q', '--spider', '--tries=1', url], check=True)
-
-            # Check if the tarball already exists
-            if os.path.exists(tarball_path):
-                print(f"Tarball Package {package_name} already exists at {tarball_path}")
-                try:
-                    print("Verifying for package download completion")
-                    subprocess.run(['wget', '-c','-O', tarball_path, url], check=True)
-                    status = "Success"
-                except subprocess.CalledProcessError:
-                    status = "Failed"
-            elif url:
-                # Using wget to download the tarball from the URL
-                try:
-                    subprocess.run(['wget', '-O', tarball_path, url], check=True)
-                    status = "Success"
-                except subprocess.CalledProcessError:
-                    status = "Failed"
-            else:
-                status = "No URL provided"
-        except subprocess.CalledProcessError:
-            print(f"Error: Package {package_name} not found at {url}")
-            status = "Failed"
+        if url:
+            try:
+                # Resumes partial downloads, complete tarballs were skipped by the cache lookup
+                headers = download_file(url, tarball_path)
+                if headers.get('size') is None:
+                    # Without the remote size the download is unverified, so it is fetched again next time
+                    print(f"Size of {url} is unknown, Package {package_name} is not cached")
+                else:
+                    cache.store(cache_key, [(tarball_path, tarball_path)], url=url, headers=headers)
+                status = "Success"
+            except (requests.RequestException, OSError) as err:
+                print(f"Error: Unable to download Package {package_name} from {url}: {err}")
+                status = "Failed"
+        else:
+            status = "No URL provided"
     elif path_support == True and url_support == False:
         try:
             shutil.copy(path, tarball_path)
@@ -382,17 +407,20 @@ def process_iso_package(package, repo_store_path, status_file_path, cluster_os_t
             download_file_name = url.split('/')
             print(f"Download file name: {download_file_name[-1]}")
             iso_file_path = os.path.join(iso_directory, download_file_name[-1])
-            # Check if the file already exists
-            if os.path.exists(iso_file_path):
-                print(f"ISO Package {package_name} already exists at {iso_directory}")
+            cache = get_download_cache(repo_store_path)
+            cache_key = f"iso:{iso_file_path}"
+            # Check if the file already exists and is complete
+            if cache.lookup(cache_key, url=url):
+                print(f"ISO Package {package_name} verified in download cache at {iso_directory}")
                 status = "Success"
             else:
-                # Using wget to check if the URL exists (returns 0 for success, non-zero for failure)
-                subprocess.run(['wget', '-q', '--spider', '--tries=1', url], check=True)
-                iso_tmp_file =  os.path.join('/tmp', download_file_name[-1])
-                # Using wget to download the iso file from the URL
-                subprocess.run(['wget', '-O', iso_tmp_file, url], check=True)
-                shutil.move(iso_tmp_file, iso_file_path)
+                # Resumes partial downloads, complete isos were skipped by the cache lookup
+                headers = download_file(url, iso_file_path)
+                if headers.get('size') is None:
+                    # Without the remote size the download is unverified, so it is fetched again next time
+                    print(f"Size of {url} is unknown, ISO Package {package_name} is not cached")
+                else:
+                    cache.store(cache_key, [(iso_file_path, iso_file_path)], url=url, headers=headers)
                 status = "Success"
         except:
             status = "Failed"
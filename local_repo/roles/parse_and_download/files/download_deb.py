@@ -18,36 +18,32 @@ from jinja2 import Template
 from common_utility import update_status
 import distro
 
-def process_deb_package(package, repo_store_path, status_file_path, cluster_os_type, cluster_os_version, repo_config, version_variables, cluster_name):
+omnia_always = ['amdgpu', 'intelgaudi', 'cuda', 'ofed']
+
+def get_skip_repos(cluster_os_version):
     """
-    Process a Debian (deb) package
+    Return the repository names whose packages are not downloaded.
+
     Args:
-        package: The package information dictionary.
-        repo_store_path: Path to the repository store.
-        status_file_path: Path to the status file.
-        cluster_os_type: Cluster OS type.
         cluster_os_version: Cluster OS version.
-        repo_config: Repository configuration.
-        version_variables: Variables for rendering version template.
     """
-    repo_name = package['repo_name']
-    package_type = package['type']
-    package_template = Template(package.get('package', None))  # Use Jinja2 Template for package
-    # Render the packages, substituting Jinja variables if present
-    package_name = package_template.render(**version_variables)
-    package_name = shlex.quote(package_name).strip("'\"")
-
-    print(f"Processing DEB: {package_name}, Repo Name: {repo_name}, Repo Config: {repo_config}")
-    user_apt_conf_path= "/etc/apt/user_apt.conf"
     # Specify the repository names that should be skipped
     os_version = distro.version()
     if os_version != cluster_os_version:
-        skip_repos = ['focal','jammy','noble','deadsnake-ppa']
-    else:
-        skip_repos = ['focal','jammy','noble']
-    download_flag = False
-    omnia_always = ['amdgpu', 'intelgaudi', 'cuda', 'ofed']
+        return ['focal','jammy','noble','deadsnake-ppa']
+    return ['focal','jammy','noble']
 
+def get_deb_directory(repo_store_path, cluster_os_type, cluster_os_version, version_variables, cluster_name):
+    """
+    Return the directory deb packages of a software stack are downloaded to.
+
+    Args:
+        repo_store_path: Path to the repository store.
+        cluster_os_type: Cluster OS type.
+        cluster_os_version: Cluster OS version.
+        version_variables: Variables for rendering version template.
+        cluster_name: The software stack the packages belong to.
+    """
     # Construct the path based on the provided repository store format
     if cluster_name == 'beegfs':
         deb_directory = os.path.join(repo_store_path, 'cluster', 'apt', 'beegfs',
@@ -67,7 +63,34 @@ def process_deb_package(package, repo_store_path, status_file_path, cluster_os_t
     else:
         deb_directory = os.path.join(repo_store_path, 'cluster', cluster_os_type, cluster_os_version, 'deb')
 
-    deb_directory = shlex.quote(deb_directory).strip("'\"")
+    return shlex.quote(deb_directory).strip("'\"")
+
+def process_deb_package(package, repo_store_path, status_file_path, cluster_os_type, cluster_os_version, repo_config, version_variables, cluster_name):
+    """
+    Process a Debian (deb) package
+    Args:
+        package: The package information dictionary.
+        repo_store_path: Path to the repository store.
+        status_file_path: Path to the status file.
+        cluster_os_type: Cluster OS type.
+        cluster_os_version: Cluster OS version.
+        repo_config: Repository configuration.
+        version_variables: Variables for rendering version template.
+    """
+    repo_name = package['repo_name']
+    package_type = package['type']
+    package_template = Template(package.get('package', None))  # Use Jinja2 Template for package
+    # Render the packages, substituting Jinja variables if present
+    package_name = package_template.render(**version_variables)
+    package_name = shlex.quote(package_name).strip("'\"")
+
+    print(f"Processing DEB: {package_name}, Repo Name: {repo_name}, Repo Config: {repo_config}")
+    user_apt_conf_path= "/etc/apt/user_apt.conf"
+    skip_repos = get_skip_repos(cluster_os_version)
+    download_flag = False
+
+    deb_directory = get_deb_directory(repo_store_path, cluster_os_type, cluster_os_version,
+            version_variables, cluster_name)
 
     # Default status value
     status = "Skipped"
@@ -79,10 +102,9 @@ def process_deb_package(package, repo_store_path, status_file_path, cluster_os_t
             if repo_config == 'always' or cluster_name in omnia_always:
                 # Ensure directory exist
                 os.makedirs(deb_directory, exist_ok=True)
-                os.chdir(deb_directory)
                 # Download the package
                 command = ['apt-get' ,'download', package_name, '-o', f'Dir::Cache={deb_directory}']
-                subprocess.run(command, check=True)
+                subprocess.run(command, check=True, cwd=deb_directory)
                 print(f"DEB Package {package_name} downloaded successfully.")
 
                 dependencies_cmd = ['apt-cache', 'depends', '--recurse', package_name]
@@ -105,7 +127,7 @@ def process_deb_package(package, repo_store_path, status_file_path, cluster_os_t
                         dependency = shlex.quote(dependency).strip("'\"")
                         download_dependency_command = ['apt-get', 'download', dependency, '-o', f'Dir::Cache={deb_directory}']
                         try:
-                            subprocess.run(download_dependency_command, check=True)
+                            subprocess.run(download_dependency_command, check=True, cwd=deb_directory)
                             print(f"Package {dependency} downloaded successfully.")
                         except subprocess.CalledProcessError as e:
                             print(f"Error downloading package {dependency}: {e}")
@@ -130,11 +152,10 @@ def process_deb_package(package, repo_store_path, status_file_path, cluster_os_t
                     status = "Skipped"
                 except subprocess.CalledProcessError:
                     os.makedirs(deb_directory, exist_ok=True)
-                    os.chdir(deb_directory)
                     # Download the package, update default cache
                     subprocess.run(['apt-get', 'update'], check=True)
                     command = ['apt-get' ,'download', package_name, '-o', f'Dir::Cache={deb_directory}']
-                    subprocess.run(command, check=True)
+                    subprocess.run(command, check=True, cwd=deb_directory)
                     print(f"DEB Package {package_name} downloaded successfully.")
                     status= "Success"
 
@@ -166,8 +187,7 @@ def process_deb_package(package, repo_store_path, status_file_path, cluster_os_t
                         except subprocess.CalledProcessError:
                             try:
                                 os.makedirs(deb_directory, exist_ok=True)
-                                os.chdir(deb_directory)
-                                subprocess.run(download_dependency_command, check=True)
+                                subprocess.run(download_dependency_command, check=True, cwd=deb_directory)
                             except subprocess.CalledProcessError as e:
                                 print(f"Failed to download {dependency}: {e}")
                             except Exception as e:
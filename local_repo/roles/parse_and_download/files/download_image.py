@@ -19,9 +19,8 @@ Module to handle downloading and processing image packages.
 import subprocess
 from jinja2 import Template
 from common_utility import update_status
-import requests, shlex
-
-json_headers = "application/vnd.oci.image.index.v1+json"
+import shlex
+from image_mirror import manifest_exists, check_manifests, copy_image
 
 def process_image_tag_package(package_name, repo_config, nerdctl_registry_host, image_tag, crt_file_path):
     """
@@ -41,34 +40,18 @@ def process_image_tag_package(package_name, repo_config, nerdctl_registry_host,
 
     # Check if image exists in omnia_local_registry
     try:
-        headers = {"Accept": json_headers}
-        url = f"https://{nerdctl_registry_host}/v2/{package_name.split('/', 1)[-1]}/manifests/{image_tag}"
-        response = requests.get(url, headers=headers, verify=crt_file_path)
-        if response.status_code == 200:
+        if manifest_exists(nerdctl_registry_host, package_name.split('/', 1)[-1], image_tag, crt_file_path):
             print(f"Image {package_name}:{image_tag} exists in the registry {nerdctl_registry_host}.")
             return "Success"
         else:
-            pull_command = ["nerdctl", "pull", f"{package_name}:{image_tag}"]
-            pull_command_all_platforms = ["nerdctl", "pull", f"{package_name}:{image_tag}", "--all-platforms"]
-            tag_command = ["nerdctl", "tag", f"{package_name}:{image_tag}", f"{nerdctl_registry_host}/{package_name.split('/', 1)[-1]}:{image_tag}"]
-            push_command = ["nerdctl", "push", f"{nerdctl_registry_host}/{package_name.split('/', 1)[-1]}:{image_tag}"]
             try:
-                subprocess.run(pull_command, check=True)
-                subprocess.run(tag_command, check=True)
-                push_command_output = subprocess.run(push_command, capture_output=True, text=True)
-
-                if push_command_output.returncode == 0:
-                    return "Success"
-                else:
-                    if "failed to create a tmp single-platform image" in push_command_output.stderr:
-                        subprocess.run(pull_command_all_platforms, check=True)
-                        subprocess.run(tag_command, check=True)
-                        subprocess.run(push_command, check=True)
-                        return "Success"
-                    else:
-                        raise subprocess.CalledProcessError(returncode=1, cmd="failed to push image to private registry")
-            except subprocess.CalledProcessError as e:
-                return "Failed"
+                copy_image(package_name, image_tag, nerdctl_registry_host, image_tag, crt_file_path)
+                return "Success"
+            except Exception as err:
+                print(f"Unable to copy {package_name}:{image_tag} directly to {nerdctl_registry_host}: {err}. "
+                        "Falling back to nerdctl.")
+            return mirror_image_with_nerdctl(f"{package_name}:{image_tag}",
+                    f"{nerdctl_registry_host}/{package_name.split('/', 1)[-1]}:{image_tag}")
     except Exception as err:
         print(f"An error occurred: {err}")
         print(f"Exception occured while trying to access registry {nerdctl_registry_host}.")
@@ -95,38 +78,52 @@ def process_image_digest_package(package_name, repo_config, nerdctl_registry_hos
 
 
     try:
-        headers = {"Accept": json_headers}
-        url = f"https://{nerdctl_registry_host}/v2/{package_name.split('/', 1)[-1]}/manifests/{new_tag}"
-        response = requests.get(url, headers=headers, verify=crt_file_path)
-        if response.status_code == 200:
+        if manifest_exists(nerdctl_registry_host, package_name.split('/', 1)[-1], new_tag, crt_file_path):
             print(f"Image {package_name}:{new_tag} exists in the registry {nerdctl_registry_host}.")
             return "Success"
         else:
-            pull_command = ["nerdctl", "pull", f"{package_name}@sha256:{image_digest}"]
-            pull_command_all_platforms = ["nerdctl", "pull", f"{package_name}@sha256:{image_digest}", "--all-platforms"]
-            tag_command = ["nerdctl", "tag", f"{package_name}@sha256:{image_digest}", f"{nerdctl_registry_host}/{package_name.split('/', 1)[-1]}:{new_tag}"]
-            push_command = ["nerdctl", "push", f"{nerdctl_registry_host}/{package_name.split('/', 1)[-1]}:{new_tag}"]
             try:
-                subprocess.run(pull_command, check=True)
-                subprocess.run(tag_command, check=True)
-                push_command_output = subprocess.run(push_command, capture_output=True, text=True)
-                if push_command_output.returncode == 0:
-                    return "Success"
-                else:
-                    if "failed to create a tmp single-platform image" in push_command_output.stderr:
-                        subprocess.run(pull_command_all_platforms, check=True)
-                        subprocess.run(tag_command, check=True)
-                        subprocess.run(push_command, check=True)
-                        return "Success"
-                    else:
-                        raise subprocess.CalledProcessError(returncode=1, cmd="failed to push image to private registry")
-            except subprocess.CalledProcessError as e:
-                return "Failed"
+                copy_image(package_name, f"sha256:{image_digest}", nerdctl_registry_host, new_tag, crt_file_path)
+                return "Success"
+            except Exception as err:
+                print(f"Unable to copy {package_name}@sha256:{image_digest} directly to "
+                        f"{nerdctl_registry_host}: {err}. Falling back to nerdctl.")
+            return mirror_image_with_nerdctl(f"{package_name}@sha256:{image_digest}",
+                    f"{nerdctl_registry_host}/{package_name.split('/', 1)[-1]}:{new_tag}")
     except Exception as err:
         print(f"An error occurred: {err}")
         print(f"Exception occured while trying to access registry {nerdctl_registry_host}.")
         return "Failed"
 
+def mirror_image_with_nerdctl(source_image, target_image):
+    """
+    Mirror an image by pulling it into containerd, tagging and pushing it.
+
+    Args:
+        source_image: The upstream image reference.
+        target_image: The local registry image reference.
+    """
+    pull_command = ["nerdctl", "pull", source_image]
+    pull_command_all_platforms = ["nerdctl", "pull", source_image, "--all-platforms"]
+    tag_command = ["nerdctl", "tag", source_image, target_image]
+    push_command = ["nerdctl", "push", target_image]
+    try:
+        subprocess.run(pull_command, check=True)
+        subprocess.run(tag_command, check=True)
+        push_command_output = subprocess.run(push_command, capture_output=True, text=True)
+        if push_command_output.returncode == 0:
+            return "Success"
+        else:
+            if "failed to create a tmp single-platform image" in push_command_output.stderr:
+                subprocess.run(pull_command_all_platforms, check=True)
+                subprocess.run(tag_command, check=True)
+                subprocess.run(push_command, check=True)
+                return "Success"
+            else:
+                raise subprocess.CalledProcessError(returncode=1, cmd="failed to push image to private registry")
+    except subprocess.CalledProcessError as e:
+        return "Failed"
+
 def check_image_in_registry(image_name, image_version, user_registries):
     """
     Check if an image exists in the user's registries.
@@ -151,10 +148,7 @@ def check_image_in_registry(image_name, image_version, user_registries):
 
                 print(f"Checking for image: {image_name}:{image_version} in registry {host}.")
                 # Check if the image with the specified tag/digest exists
-                headers = {"Accept": json_headers}
-                url = f"https://{host}/v2/{image_name.split('/', 1)[-1]}/manifests/{image_version}"
-                response = requests.get(url, headers=headers, verify=cert_file_path)
-                if response.status_code == 200:
+                if manifest_exists(host, image_name.split('/', 1)[-1], image_version, cert_file_path):
                     print(f"Image {image_name}:{image_version} exists in the registry {host}.")
                     return True
                 else:
@@ -168,6 +162,57 @@ def check_image_in_registry(image_name, image_version, user_registries):
         return False
 
 
+def get_new_tag(software_names):
+    """
+    Return the tag images referenced by digest are pushed to the local registry with.
+
+    Args:
+        software_names: List of software names.
+    """
+    if len(software_names) and (software_names[-1] == "kserve" or software_names[-1] == "kubeflow"):
+        return "omnia-" + software_names[-1]
+    return "omnia"
+
+def precheck_image_packages(packages, repo_config, nerdctl_registry_host, version_variables, user_registries, software_names, openssl_cert_path):
+    """
+    Check the manifests of all image packages in one concurrent batch.
+
+    The results are remembered for the run, so process_image_package skips images
+    that are already present without contacting the registries again.
+
+    Args:
+        packages: List of image package information dictionaries.
+        repo_config: Repository configuration.
+        nerdctl_registry_host: Nerdctl registry host.
+        version_variables: Variables for rendering version template.
+        user_registries: External registries hosted by user.
+        software_names: List of software names.
+        openssl_cert_path: Certificate of the local registry.
+    """
+    if repo_config not in ["always", "partial"]:
+        return
+
+    new_tag = get_new_tag(software_names)
+    manifests = []
+    for package in packages:
+        repository = shlex.quote(package['package']).strip("'\"").split('/', 1)[-1]
+        references = []
+        if 'tag' in package:
+            image_tag = shlex.quote(Template(package['tag']).render(**version_variables)).strip("'\"")
+            references.append((image_tag, image_tag))
+        if 'digest' in package:
+            references.append((new_tag, "sha256:" + package['digest']))
+        for local_reference, user_reference in references:
+            manifests.append((nerdctl_registry_host, repository, local_reference, openssl_cert_path))
+            if repo_config == "partial" and user_registries:
+                # check_image_in_registry only consults the first user registry
+                registry = user_registries[0]
+                cert_file_path = (registry.get("cert_path") or "").strip() or False
+                manifests.append((registry.get("host"), repository, user_reference, cert_file_path))
+
+    results = check_manifests(manifests)
+    print(f"Checked {len(results)} image manifests, {sum(results.values())} already present.")
+
 def process_image_package(package, repo_config, nerdctl_registry_host, status_file_path, version_variables, user_registries, software_names, openssl_cert_path):
     """
     Process an image package.
@@ -186,10 +231,7 @@ def process_image_package(package, repo_config, nerdctl_registry_host, status_fi
     # Define default values
     process_image_tag = False
     process_image_digest = False
-    if len(software_names) and (software_names[-1] == "kserve" or software_names[-1] == "kubeflow"):
-        new_tag= "omnia-" + software_names[-1]
-    else:
-        new_tag= "omnia"
+    new_tag = get_new_tag(software_names)
     status= "Failed"
     complete_package_name = package_name
 
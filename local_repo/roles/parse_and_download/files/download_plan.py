@@ -0,0 +1,252 @@
+# Copyright 2025 Dell Inc. or its subsidiaries. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Module to plan package downloads without executing them.
+
+The functions mirror the signatures of the process_* functions of the download
+modules, so process_by_package_type dispatches to them unchanged in dry run mode.
+Each one returns a plan entry describing whether the package is already present,
+its expected size and the backend that would fetch it. No subprocess is started;
+only HEAD requests are sent to learn the size of missing URL artifacts.
+"""
+
+import os
+import glob
+import shlex
+from jinja2 import Template
+import download_rpm
+import download_deb
+from download_cache import get_download_cache
+from chunked_downloader import get_url_info
+from download_image import get_new_tag
+from image_mirror import get_manifest_status
+
+plan_fields = ['package', 'type', 'state', 'size', 'backend']
+
+# Send HEAD requests for the expected size of missing URL artifacts
+fetch_remote_sizes = True
+
+def plan_entry(package_name, package_type, state, backend, size=None, status=None):
+    """
+    Build a plan entry.
+
+    Args:
+        package_name: The package name as reported in the status file.
+        package_type: The package type.
+        state: 'present', 'download', 'copy' or 'skip'.
+        backend: The tool or protocol that fetches the package.
+        size: Expected size in bytes, None if unknown.
+        status: Status recorded without running the download when the package needs no work.
+    """
+    return {
+        'package': package_name,
+        'type': package_type,
+        'state': state,
+        'size': size,
+        'backend': backend,
+        'status': status
+    }
+
+def get_cached_size(entry):
+    """
+    Return the total size of the files of a download cache entry.
+
+    Args:
+        entry: Download cache index entry.
+    """
+    return sum(file_record['size'] for file_record in entry['files'])
+
+def plan_url_artifact(package_name, package_type, repo_store_path, cache_key, url, path):
+    """
+    Plan an artifact fetched from a URL or copied from a local path.
+
+    Args:
+        package_name: The package name.
+        package_type: The package type.
+        repo_store_path: Path to the repository store.
+        cache_key: The download cache key of the artifact.
+        url: The URL of the artifact.
+        path: Local path of the artifact, if provided.
+    """
+    if path is not None and len(path) > 1 and os.path.isfile(path):
+        return plan_entry(package_name, package_type, 'copy', 'copy', os.path.getsize(path))
+    entry = get_download_cache(repo_store_path).lookup(cache_key, url=url)
+    if entry:
+        return plan_entry(package_name, package_type, 'present', 'cache', get_cached_size(entry), "Success")
+    size = get_url_info(url).get('size') if fetch_remote_sizes else None
+    return plan_entry(package_name, package_type, 'download', 'http', size)
+
+def process_rpm_package(package, repo_store_path, status_file_path, cluster_os_type, cluster_os_version, repo_config, version_variables, cluster_name):
+    """
+    Plan an rpm package.
+    """
+    package_name = Template(package.get('package', None)).render(**version_variables)
+    package_name = shlex.quote(package_name).strip("'\"")
+    if package['repo_name'] in download_rpm.skip_repos or \
+            (repo_config == 'never' and cluster_name not in download_rpm.omnia_always):
+        return plan_entry(package_name, package['type'], 'skip', 'dnf', status="Skipped")
+
+    # Dependencies are only known to dnf, so the package is fetched even if its rpm exists
+    rpm_directory = download_rpm.get_rpm_directory(repo_store_path, cluster_os_type,
+            cluster_os_version, version_variables, cluster_name)
+    rpm_files = glob.glob(os.path.join(glob.escape(rpm_directory), f"{glob.escape(package_name)}-*.rpm"))
+    state = 'present' if rpm_files else 'download'
+    return plan_entry(package_name, package['type'], state, 'dnf',
+            sum(os.path.getsize(rpm_file) for rpm_file in rpm_files) or None)
+
+def process_deb_package(package, repo_store_path, status_file_path, cluster_os_type, cluster_os_version, repo_config, version_variables, cluster_name):
+    """
+    Plan a deb package.
+    """
+    package_name = Template(package.get('package', None)).render(**version_variables)
+    package_name = shlex.quote(package_name).strip("'\"")
+    if package['repo_name'] in download_deb.get_skip_repos(cluster_os_version) or \
+            (repo_config == 'never' and cluster_name not in download_deb.omnia_always):
+        return plan_entry(package_name, package['type'], 'skip', 'apt', status="Skipped")
+
+    # Dependencies are only known to apt, so the package is fetched even if its deb exists
+    deb_directory = download_deb.get_deb_directory(repo_store_path, cluster_os_type,
+            cluster_os_version, version_variables, cluster_name)
+    deb_name = glob.escape(package_name.split('=')[0])
+    deb_files = glob.glob(os.path.join(glob.escape(deb_directory), f"{deb_name}_*.deb"))
+    state = 'present' if deb_files else 'download'
+    return plan_entry(package_name, package['type'], state, 'apt',
+            sum(os.path.getsize(deb_file) for deb_file in deb_files) or None)
+
+def process_pip_package(package, repo_store_path, status_file_path):
+    """
+    Plan a pip package.
+    """
+    package_name = shlex.quote(package['package']).strip("'\"")
+    entry = get_download_cache(repo_store_path).lookup(f"pip:{package_name}")
+    if entry:
+        return plan_entry(package_name, package['type'], 'present', 'cache', get_cached_size(entry), "Success")
+    return plan_entry(package_name, package['type'], 'download', 'pip')
+
+def process_git_package(package, repo_store_path, status_file_path):
+    """
+    Plan a git package.
+    """
+    package_name = shlex.quote(package['package']).strip("'\"")
+    url = shlex.quote(package.get('url', None)).strip("'\"")
+    version = shlex.quote(package.get('version', None)).strip("'\"")
+    tarball_path = os.path.join(repo_store_path, 'cluster', 'git', f'{package_name}.tar.gz')
+    # The ref may have moved, so a present package is still resolved with git ls-remote
+    entry = get_download_cache(repo_store_path).lookup(f"git:{tarball_path}")
+    if entry and entry.get('url', '').rsplit('@', 1)[0] == url:
+        return plan_entry(package_name, package['type'], 'present', 'git', get_cached_size(entry))
+    return plan_entry(package_name, package['type'], 'download', 'git')
+
+def process_tarball_package(package, repo_store_path, status_file_path, version_variables):
+    """
+    Plan a tarball package.
+    """
+    package_name = Template(package.get('package', None)).render(**version_variables)
+    url = Template(package.get('url', '')).render(**version_variables)
+    url = shlex.quote(url).strip("'\"")
+    tarball_path = os.path.join(repo_store_path, 'cluster', 'tarball', f"{package_name}.tar.gz")
+    tarball_path = shlex.quote(tarball_path).strip("'\"")
+    return plan_url_artifact(package_name, package['type'], repo_store_path,
+            f"tarball:{tarball_path}", url, package.get('path'))
+
+def process_manifest_package(package, repo_store_path, status_file_path):
+    """
+    Plan a manifest package, existing manifests are still resumed with wget -c.
+    """
+    package_name = package['package']
+    manifest_path = os.path.join(repo_store_path, 'cluster', 'manifest', f"{package_name}.yaml")
+    state = 'present' if os.path.exists(manifest_path) else 'download'
+    return plan_entry(package_name, package['type'], state, 'wget')
+
+def process_shell_package(package, repo_store_path, status_file_path):
+    """
+    Plan a shell package.
+    """
+    package_name = package['package']
+    sh_path = os.path.join(repo_store_path, 'cluster', 'shell', f"{package_name}.sh")
+    if os.path.exists(sh_path):
+        return plan_entry(package_name, package['type'], 'present', 'wget', os.path.getsize(sh_path))
+    return plan_entry(package_name, package['type'], 'download', 'wget')
+
+def process_image_package(package, repo_config, nerdctl_registry_host, status_file_path, version_variables, user_registries, software_names, openssl_cert_path):
+    """
+    Plan an image package from the manifests checked by precheck_image_packages.
+    """
+    package_name = shlex.quote(package['package']).strip("'\"")
+    repository = package_name.split('/', 1)[-1]
+    if 'digest' in package:
+        complete_package_name = package['package'] + "@sha256:" + package['digest']
+        local_reference = get_new_tag(software_names)
+        user_reference = "sha256:" + package['digest']
+    else:
+        image_tag = Template(package.get('tag', '')).render(**version_variables)
+        complete_package_name = package['package'] + ":" + image_tag
+        local_reference = user_reference = shlex.quote(image_tag).strip("'\"")
+
+    if repo_config == "never":
+        return plan_entry(complete_package_name, package['type'], 'skip', 'registry', status="Skipped")
+    if repo_config == "partial" and user_registries:
+        registry = user_registries[0]
+        if get_manifest_status(registry.get("host"), repository, user_reference):
+            return plan_entry(complete_package_name, package['type'], 'skip', 'registry', status="Skipped")
+    if get_manifest_status(nerdctl_registry_host, repository, local_reference):
+        return plan_entry(complete_package_name, package['type'], 'present', 'registry', status="Success")
+    return plan_entry(complete_package_name, package['type'], 'download', 'registry')
+
+def process_ansible_galaxy_collection(package, repo_store_path, status_file_path):
+    """
+    Plan an ansible-galaxy collection package.
+    """
+    package_name = shlex.quote(package['package']).strip("'\"")
+    version = shlex.quote(package.get('version', None)).strip("'\"")
+    collections_tarball_path = os.path.join(repo_store_path, 'cluster', 'ansible_galaxy_collection',
+            f'{package_name.replace(".", "-")}-{version}.tar.gz')
+    if os.path.exists(collections_tarball_path):
+        return plan_entry(package_name, package['type'], 'present', 'ansible-galaxy',
+                os.path.getsize(collections_tarball_path), "Success")
+    return plan_entry(package_name, package['type'], 'download', 'ansible-galaxy')
+
+def process_iso_package(package, repo_store_path, status_file_path, cluster_os_type, cluster_os_version, repo_config, version_variables):
+    """
+    Plan an iso package.
+    """
+    package_name = package['package']
+    url = Template(package.get('url', '')).render(**version_variables)
+    iso_directory = os.path.join(repo_store_path, 'cluster', cluster_os_type, cluster_os_version, 'iso',
+            package_name, version_variables.get(f"{package_name}_version", ''))
+    iso_file_path = os.path.join(iso_directory, url.split('/')[-1])
+    return plan_url_artifact(package_name, package['type'], repo_store_path,
+            f"iso:{iso_file_path}", url, package.get('path'))
+
+def write_plan(plan, plan_file_path):
+    """
+    Write the plan to a CSV file and print a summary.
+
+    Args:
+        plan: List of plan entries.
+        plan_file_path: Path of the CSV file.
+    """
+    with open(plan_file_path, 'w', encoding='utf-8') as plan_file:
+        plan_file.write(",".join(plan_fields) + "\n")
+        for entry in plan:
+            size = '' if entry['size'] is None else entry['size']
+            plan_file.write(f"{entry['package']},{entry['type']},{entry['state']},{size},{entry['backend']}\n")
+
+    for state in ['present', 'download', 'copy', 'skip']:
+        entries = [entry for entry in plan if entry['state'] == state]
+        known_size = sum(entry['size'] for entry in entries if entry['size'] is not None)
+        unknown = sum(1 for entry in entries if entry['size'] is None)
+        print(f"{state}: {len(entries)} packages, {known_size} bytes known, {unknown} of unknown size")
+    print(f"Download plan written to {plan_file_path}")
@@ -18,35 +18,33 @@ Module to handle download processes for rpm and debian packages
 import subprocess
 import re
 import os, shlex
+import threading
 from jinja2 import Template
 from common_utility import update_status
 
-def process_rpm_package(package, repo_store_path, status_file_path, cluster_os_type, cluster_os_version, repo_config, version_variables, cluster_name):
+# Specify the repository names that should be skipped
+skip_repos = ['appstream', 'baseos']
+
+omnia_always = ['amdgpu', 'cuda', 'ofed']
+
+# Maximum number of package specs passed to a single dnf invocation
+dnf_chunk_size = 200
+
+# rpm files fetched during this run, per destination directory
+downloaded_rpms = {}
+downloaded_rpms_lock = threading.Lock()
+
+def get_rpm_directory(repo_store_path, cluster_os_type, cluster_os_version, version_variables, cluster_name):
     """
-    Process an rpm package
+    Return the directory rpm packages of a software stack are downloaded to.
+
     Args:
-        package: The package information dictionary.
         repo_store_path: Path to the repository store.
-        status_file_path: Path to the status file.
         cluster_os_type: Cluster OS type.
         cluster_os_version: Cluster OS version.
-        repo_config: Repository configuration.
         version_variables: Variables for rendering version template.
-
+        cluster_name: The software stack the packages belong to.
     """
-    repo_name = package['repo_name']
-    package_type = package['type']
-    package_template = Template(package.get('package', None))  # Use Jinja2 Template for package
-    # Render the packages, substituting Jinja variables if present
-    package_name = package_template.render(**version_variables)
-    package_name = shlex.quote(package_name).strip("'\"")
-    print(f"Processing RPM: {package_name},Repo Name: {repo_name},Repo Config: {repo_config}")
-
-    # Specify the repository names that should be skipped
-    skip_repos = ['appstream', 'baseos']
-
-    omnia_always = ['amdgpu', 'cuda', 'ofed']
-
     # Construct the path based on the provided repository store format
     if cluster_name == 'beegfs':
         rpm_directory = os.path.join(repo_store_path, 'cluster', 'yum', 'beegfs',
@@ -61,7 +59,31 @@ def process_rpm_package(package, repo_store_path, status_file_path, cluster_os_t
         rpm_directory = os.path.join(repo_store_path, 'cluster', cluster_os_type, cluster_os_version, 'rpm')
 
     # shlex quote rpm_directory
-    rpm_directory = shlex.quote(rpm_directory).strip("'\"")
+    return shlex.quote(rpm_directory).strip("'\"")
+
+def process_rpm_package(package, repo_store_path, status_file_path, cluster_os_type, cluster_os_version, repo_config, version_variables, cluster_name):
+    """
+    Process an rpm package
+    Args:
+        package: The package information dictionary.
+        repo_store_path: Path to the repository store.
+        status_file_path: Path to the status file.
+        cluster_os_type: Cluster OS type.
+        cluster_os_version: Cluster OS version.
+        repo_config: Repository configuration.
+        version_variables: Variables for rendering version template.
+
+    """
+    repo_name = package['repo_name']
+    package_type = package['type']
+    package_template = Template(package.get('package', None))  # Use Jinja2 Template for package
+    # Render the packages, substituting Jinja variables if present
+    package_name = package_template.render(**version_variables)
+    package_name = shlex.quote(package_name).strip("'\"")
+    print(f"Processing RPM: {package_name},Repo Name: {repo_name},Repo Config: {repo_config}")
+
+    rpm_directory = get_rpm_directory(repo_store_path, cluster_os_type, cluster_os_version,
+            version_variables, cluster_name)
 
     # Default status value
     status = "Skipped"
@@ -160,3 +182,205 @@ def process_rpm_package(package, repo_store_path, status_file_path, cluster_os_t
 
     # Update status in your status file or perform further processing
     update_status(package_name, package_type, status, status_file_path)
+
+
+def chunk_list(items, chunk_size=dnf_chunk_size):
+    """
+    Split a list into chunks of at most chunk_size items.
+
+    Args:
+        items: The list to split.
+        chunk_size: Maximum number of items per chunk.
+    """
+    return [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+
+def get_dependencies_cmd(package_names):
+    """
+    Build the repoquery command resolving the recursive dependencies of packages.
+
+    Args:
+        package_names: List of package specs queried together.
+    """
+    if package_names == ['rocm']:
+        return ['repoquery', '--disablerepo=*', '--enablerepo=omnia_repo_rocm', '--enablerepo=omnia_repo_amdgpu',
+                '--requires', '--resolve', '--recursive', '--arch=x86_64,noarch'] + package_names
+    return ['repoquery', '--requires', '--resolve', '--recursive', '--arch=x86_64,noarch'] + package_names
+
+def resolve_dependencies(package_names):
+    """
+    Resolve the dependency closure of a set of packages with one repoquery per chunk.
+
+    rocm is queried on its own as it is resolved against the omnia rocm and amdgpu repos only.
+
+    Args:
+        package_names: List of package specs.
+
+    Returns:
+        list: Sorted, deduplicated x86_64 and noarch dependencies.
+    """
+    query_groups = [[name] for name in package_names if name == 'rocm']
+    query_groups += chunk_list([name for name in package_names if name != 'rocm'])
+
+    dependencies = set()
+    for query_group in query_groups:
+        if not query_group:
+            continue
+        output = subprocess.check_output(get_dependencies_cmd(query_group), text=True).splitlines()
+        dependencies.update(dep.strip() for dep in output
+                if any(arch in dep for arch in ['x86_64', 'noarch']))
+    return sorted(dependencies)
+
+def get_package_spec_forms(name_arch, version):
+    """
+    Return the spec forms a dnf list entry can be requested by.
+
+    Args:
+        name_arch: The name.arch column of dnf list.
+        version: The [epoch:]version-release column of dnf list.
+    """
+    name, _, arch = name_arch.rpartition('.')
+    epoch, _, version_release = version.rpartition(':')
+    epoch = epoch or '0'
+    upstream_version = version_release.split('-')[0]
+    return {
+        name,
+        name_arch,
+        f"{name}-{upstream_version}",
+        f"{name}-{version_release}",
+        f"{name}-{version_release}.{arch}",
+        f"{name}-{epoch}:{version_release}.{arch}"
+    }
+
+def get_user_repo_available(package_specs):
+    """
+    Find which package specs are available in user repos with one dnf list per chunk.
+
+    Specs containing glob characters cannot be matched against the dnf list output
+    and are checked individually.
+
+    Args:
+        package_specs: List of package specs.
+
+    Returns:
+        set: The package specs available in user repos.
+    """
+    glob_specs = [spec for spec in package_specs if any(char in spec for char in '*?[')]
+    plain_specs = [spec for spec in package_specs if spec not in glob_specs]
+
+    available = set()
+    for chunk in chunk_list(plain_specs):
+        result = subprocess.run(['dnf', '-q', 'list', 'available', '--disablerepo=omnia_repo*'] + chunk,
+                stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        # Long names may wrap, so entries are read as a stream of name.arch, version, repo triples
+        tokens = []
+        for line in result.stdout.splitlines():
+            if line.strip() and not line.startswith('Available Packages'):
+                tokens.extend(line.split())
+        spec_forms = set()
+        for i in range(0, len(tokens) - 2, 3):
+            spec_forms.update(get_package_spec_forms(tokens[i], tokens[i + 1]))
+        available.update(spec for spec in chunk if spec in spec_forms)
+
+    for spec in glob_specs:
+        result = subprocess.run(['dnf', 'list', 'available', spec, '--disablerepo=omnia_repo*'],
+                stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        if result.returncode == 0:
+            available.add(spec)
+    return available
+
+def download_rpms(package_specs, rpm_directory):
+    """
+    Download rpm packages with one dnf download per chunk, skipping those fetched earlier in this run.
+
+    Args:
+        package_specs: List of package specs.
+        rpm_directory: Destination directory.
+
+    Raises:
+        subprocess.CalledProcessError: If a dnf download fails.
+    """
+    with downloaded_rpms_lock:
+        already_downloaded = downloaded_rpms.setdefault(rpm_directory, set())
+        pending = [spec for spec in dict.fromkeys(package_specs) if spec not in already_downloaded]
+    if not pending:
+        return
+
+    os.makedirs(rpm_directory, exist_ok=True)
+    for chunk in chunk_list(pending):
+        subprocess.run(['dnf', 'download', '--arch=x86_64,noarch',
+                f'--destdir={rpm_directory}'] + chunk, check=True)
+        with downloaded_rpms_lock:
+            already_downloaded.update(chunk)
+
+def process_rpm_packages_batch(packages, repo_store_path, status_file_path, cluster_os_type, cluster_os_version, repo_config, version_variables, cluster_name):
+    """
+    Process all rpm packages of a software stack together.
+
+    The dependency closure of the stack is resolved once, checked against user repos in
+    one query when repo_config is partial, and downloaded in chunked dnf invocations.
+    If a batched step fails, the packages fall back to process_rpm_package so that
+    statuses are reported per package.
+
+    Args:
+        packages: List of package information dictionaries.
+        repo_store_path: Path to the repository store.
+        status_file_path: Path to the status file.
+        cluster_os_type: Cluster OS type.
+        cluster_os_version: Cluster OS version.
+        repo_config: Repository configuration.
+        version_variables: Variables for rendering version template.
+        cluster_name: The software stack the packages belong to.
+    """
+    rpm_directory = get_rpm_directory(repo_store_path, cluster_os_type, cluster_os_version,
+            version_variables, cluster_name)
+
+    batch_packages = []
+    for package in packages:
+        package_template = Template(package.get('package', None))  # Use Jinja2 Template for package
+        package_name = shlex.quote(package_template.render(**version_variables)).strip("'\"")
+        if package['repo_name'] in skip_repos:
+            print(f"Skipping RPM  {package_name} from repo {package['repo_name']} based on repo_config: {repo_config}.")
+            update_status(package_name, package['type'], "Skipped", status_file_path)
+        elif repo_config == 'never' and cluster_name not in omnia_always:
+            print(f"RPM Package {package_name} wont be downloaded when repo_config is never")
+            update_status(package_name, package['type'], "Skipped", status_file_path)
+        else:
+            batch_packages.append((package, package_name))
+
+    if not batch_packages:
+        return
+
+    package_names = list(dict.fromkeys(package_name for _, package_name in batch_packages))
+    print(f"Processing RPM batch for {cluster_name}: {package_names}, Repo Config: {repo_config}")
+
+    statuses = {package_name: "Success" for package_name in package_names}
+    try:
+        if repo_config == 'always' or cluster_name in omnia_always:
+            dependencies = resolve_dependencies(package_names)
+            print(f"Dependencies of {cluster_name}: {dependencies}")
+            download_rpms(package_names + dependencies, rpm_directory)
+
+        elif repo_config == 'partial':
+            user_available = get_user_repo_available(package_names)
+            for package_name in user_available:
+                print(f"Package {package_name} is available in user repos. No need to download.")
+                statuses[package_name] = "Skipped"
+            dependencies = resolve_dependencies(package_names)
+            user_available_dependencies = get_user_repo_available(dependencies)
+            missing = [package_name for package_name in package_names if package_name not in user_available]
+            missing += [dep for dep in dependencies if dep not in user_available_dependencies]
+            print(f"Packages of {cluster_name} not available in user repos: {missing}")
+            download_rpms(missing, rpm_directory)
+
+    except subprocess.CalledProcessError as err:
+        print(f"Batch processing of RPM packages for {cluster_name} failed: {err}. "
+                "Processing packages individually.")
+        for package, _ in batch_packages:
+            process_rpm_package(package, repo_store_path, status_file_path, cluster_os_type,
+                    cluster_os_version, repo_config, version_variables, cluster_name)
+        return
+
+    for package, package_name in batch_packages:
+        if statuses[package_name] == "Success":
+            print(f"RPM Package {package_name} downloaded successfully.")
+        update_status(package_name, package['type'], statuses[package_name], status_file_path)
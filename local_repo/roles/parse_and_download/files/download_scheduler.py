@@ -0,0 +1,150 @@
+# Copyright 2025 Dell Inc. or its subsidiaries. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Module to schedule package downloads on per package type worker pools.
+"""
+
+import os
+import json
+from concurrent.futures import ThreadPoolExecutor, wait
+
+# Worker count used for package types without an explicit entry
+default_workers = 4
+
+# dnf and apt hold locks on their metadata caches, so rpm and deb packages
+# are downloaded one at a time unless configured otherwise.
+default_concurrency = {
+    'rpm': 1,
+    'deb': 1,
+    'image': 4,
+    'default': default_workers
+}
+
+def get_download_concurrency():
+    """
+    Read the per package type concurrency from the DOWNLOAD_CONCURRENCY environment variable.
+
+    The variable holds a JSON object mapping package type to worker count,
+    e.g. {"rpm": 1, "image": 4, "default": 8}. Missing or invalid entries
+    fall back to default_concurrency.
+
+    Returns:
+        dict: Package type to worker count mapping.
+    """
+    concurrency = dict(default_concurrency)
+    concurrency_env = os.environ.get('DOWNLOAD_CONCURRENCY')
+    if not concurrency_env:
+        return concurrency
+
+    try:
+        user_concurrency = json.loads(concurrency_env)
+    except ValueError as err:
+        print(f"Ignoring invalid DOWNLOAD_CONCURRENCY value {concurrency_env}: {err}")
+        return concurrency
+
+    if not isinstance(user_concurrency, dict):
+        print(f"Ignoring invalid DOWNLOAD_CONCURRENCY value {concurrency_env}")
+        return concurrency
+
+    for package_type, workers in user_concurrency.items():
+        try:
+            workers = int(workers)
+        except (TypeError, ValueError):
+            print(f"Ignoring invalid worker count {workers} for package type {package_type}")
+            continue
+        if workers > 0:
+            concurrency[package_type] = workers
+    return concurrency
+
+
+class DownloadScheduler:
+    """
+    Dispatch download jobs to one worker pool (lane) per package type.
+
+    Each lane is sized from the concurrency mapping, so registry image pulls,
+    package manager downloads and plain URL downloads do not queue behind each other.
+    """
+
+    def __init__(self, concurrency=None):
+        """
+        Args:
+            concurrency: Package type to worker count mapping.
+        """
+        self.concurrency = concurrency if concurrency is not None else get_download_concurrency()
+        self.lanes = {}
+        self.jobs = []
+
+    def get_workers(self, package_type):
+        """
+        Return the worker count of the lane for a package type.
+
+        Args:
+            package_type: The package type.
+        """
+        return self.concurrency.get(package_type,
+                self.concurrency.get('default', default_workers))
+
+    def get_lane(self, package_type):
+        """
+        Return the worker pool for a package type, creating it on first use.
+
+        Args:
+            package_type: The package type.
+        """
+        lane = self.lanes.get(package_type)
+        if lane is None:
+            lane = ThreadPoolExecutor(max_workers=self.get_workers(package_type),
+                    thread_name_prefix=f"download_{package_type}")
+            self.lanes[package_type] = lane
+        return lane
+
+    def submit(self, package_name, package_type, func, *args):
+        """
+        Queue a download job on the lane of its package type.
+
+        Args:
+            package_name: The package name, used for error reporting.
+            package_type: The package type.
+            func: The function processing the package.
+            args: Arguments passed to func.
+        """
+        future = self.get_lane(package_type).submit(func, *args)
+        self.jobs.append((package_name, package_type, future))
+        return future
+
+    def wait(self):
+        """
+        Wait for every queued job and shut the lanes down.
+
+        Raises:
+            Exception: The first exception raised by a job, after all jobs finished.
+        """
+        wait([future for _, _, future in self.jobs])
+        for lane in self.lanes.values():
+            lane.shutdown(wait=True)
+        self.lanes = {}
+
+        first_error = None
+        for package_name, package_type, future in self.jobs:
+            error = future.exception()
+            if error is not None:
+                print(f"Error: Processing of {package_type} package {package_name} "
+                        f"raised {error!r}")
+                if first_error is None:
+                    first_error = error
+        self.jobs = []
+
+        if first_error is not None:
+            raise first_error
@@ -0,0 +1,180 @@
+# Copyright 2025 Dell Inc. or its subsidiaries. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Module to mirror git repositories into shallow bare repositories.
+
+Every git package keeps a bare mirror under <repo_store_path>/cluster/git/.mirrors.
+The requested ref is resolved with git ls-remote, fetched with depth 1 only when the
+mirror lacks its commit, and exported with git archive, so neither a full history
+nor a .git directory ends up in the tarball.
+"""
+
+import os
+import re
+import shutil
+import subprocess
+
+mirrors_directory_name = '.mirrors'
+mirror_ref = 'refs/omnia/mirrored'
+
+commit_pattern = re.compile(r'^[0-9a-f]{40}$')
+
+def run_git(args, git_dir=None, cwd=None):
+    """
+    Run a git command and return its standard output.
+
+    Args:
+        args: Arguments passed to git.
+        git_dir: Repository the command runs in, if any.
+        cwd: Working directory of the command.
+
+    Raises:
+        subprocess.CalledProcessError: If the command fails.
+    """
+    command = ['git']
+    if git_dir is not None:
+        command += ['--git-dir', git_dir]
+    result = subprocess.run(command + args, check=True, cwd=cwd,
+            stdout=subprocess.PIPE, text=True)
+    return result.stdout.strip()
+
+def get_mirror_path(git_modules_directory, package_name):
+    """
+    Return the path of the bare mirror of a git package.
+
+    Args:
+        git_modules_directory: Directory holding the git packages.
+        package_name: The package name.
+    """
+    return os.path.join(git_modules_directory, mirrors_directory_name, f"{package_name}.git")
+
+def init_mirror(mirror_path, url):
+    """
+    Create the bare mirror if it does not exist and point its origin at url.
+
+    Args:
+        mirror_path: Path to the bare mirror.
+        url: The URL of the remote repository.
+    """
+    if not os.path.isdir(mirror_path):
+        os.makedirs(os.path.dirname(mirror_path), exist_ok=True)
+        run_git(['init', '--quiet', '--bare', mirror_path])
+        run_git(['remote', 'add', 'origin', url], git_dir=mirror_path)
+    elif run_git(['config', '--get', 'remote.origin.url'], git_dir=mirror_path) != url:
+        run_git(['remote', 'set-url', 'origin', url], git_dir=mirror_path)
+
+def resolve_remote_commit(url, version):
+    """
+    Resolve a branch, tag or commit of a remote repository to a commit id without fetching.
+
+    Args:
+        url: The URL of the remote repository.
+        version: Branch, tag or full commit id.
+
+    Returns:
+        str: The commit id, or None if the remote does not advertise the ref.
+
+    Raises:
+        subprocess.CalledProcessError: If the remote cannot be reached.
+    """
+    if commit_pattern.match(version):
+        return version
+    refs = {}
+    for line in run_git(['ls-remote', url, version, f"{version}^{{}}"]).splitlines():
+        commit, ref = line.split('\t', 1)
+        refs[ref] = commit
+    # Peeled annotated tags point at the commit, the tag object itself does not
+    for ref in [f"refs/tags/{version}^{{}}", f"refs/tags/{version}", f"refs/heads/{version}", version]:
+        if ref in refs:
+            return refs[ref]
+    return None
+
+def has_commit(mirror_path, commit):
+    """
+    Check whether the mirror already holds a commit.
+
+    Args:
+        mirror_path: Path to the bare mirror.
+        commit: The commit id.
+    """
+    result = subprocess.run(['git', '--git-dir', mirror_path, 'cat-file', '-e', f"{commit}^{{commit}}"],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False)
+    return result.returncode == 0
+
+def fetch_commit(mirror_path, version, commit=None):
+    """
+    Fetch a ref into the mirror with depth 1, unless the mirror already holds its commit.
+
+    Args:
+        mirror_path: Path to the bare mirror.
+        version: Branch, tag or commit id to fetch.
+        commit: The commit id resolved from the remote, if known.
+
+    Returns:
+        str: The fetched commit id.
+    """
+    if commit is None or not has_commit(mirror_path, commit):
+        run_git(['fetch', '--quiet', '--depth', '1', '--no-tags', 'origin', commit or version],
+                git_dir=mirror_path)
+        commit = run_git(['rev-parse', 'FETCH_HEAD^{commit}'], git_dir=mirror_path)
+    # Keep the commit referenced so later fetches negotiate against it
+    run_git(['update-ref', mirror_ref, commit], git_dir=mirror_path)
+    return commit
+
+def archive_commit(mirror_path, commit, prefix, tarball_path):
+    """
+    Write the tree of a commit to a gzip tarball, atomically replacing tarball_path.
+
+    Args:
+        mirror_path: Path to the bare mirror.
+        commit: The commit id.
+        prefix: Top level directory of the archive.
+        tarball_path: Path of the tarball.
+    """
+    tmp_tarball_path = f"{tarball_path}.tmp"
+    run_git(['archive', '--format=tar.gz', f"--prefix={prefix}/", '-o', tmp_tarball_path, commit],
+            git_dir=mirror_path)
+    os.replace(tmp_tarball_path, tarball_path)
+
+def get_checkout_commit(checkout_directory):
+    """
+    Return the commit checked out in a directory, None if it is not a git checkout.
+
+    Args:
+        checkout_directory: The directory.
+    """
+    if not os.path.isdir(os.path.join(checkout_directory, '.git')):
+        return None
+    try:
+        return run_git(['rev-parse', 'HEAD'], cwd=checkout_directory)
+    except subprocess.CalledProcessError:
+        return None
+
+def checkout_commit(mirror_path, commit, checkout_directory):
+    """
+    Replace checkout_directory with a depth 1 checkout of a commit of the mirror.
+
+    Args:
+        mirror_path: Path to the bare mirror.
+        commit: The commit id.
+        checkout_directory: Directory of the working tree.
+    """
+    tmp_checkout_directory = f"{checkout_directory}.tmp"
+    shutil.rmtree(tmp_checkout_directory, ignore_errors=True)
+    run_git(['init', '--quiet', tmp_checkout_directory])
+    run_git(['fetch', '--quiet', '--depth', '1', mirror_path, commit], cwd=tmp_checkout_directory)
+    run_git(['checkout', '--quiet', '--detach', 'FETCH_HEAD'], cwd=tmp_checkout_directory)
+    shutil.rmtree(checkout_directory, ignore_errors=True)
+    os.rename(tmp_checkout_directory, checkout_directory)
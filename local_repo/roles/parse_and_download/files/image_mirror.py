@@ -0,0 +1,409 @@
+# Copyright 2025 Dell Inc. or its subsidiaries. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Module to check image manifests and mirror images between registries over the
+OCI distribution API with a pooled HTTP session.
+
+Images are copied blob by blob from the upstream registry to the local registry;
+blobs the local registry already has are not transferred again. A tag of a
+multi-platform image is copied for the platforms of IMAGE_MIRROR_PLATFORMS, the
+platform of the host by default, like a nerdctl pull. An image pinned by digest is
+copied with every platform, so the index keeps its upstream digest.
+"""
+
+import os
+import re
+import json
+import platform
+import threading
+from urllib.parse import urljoin
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.adapters import HTTPAdapter
+
+index_media_types = [
+    "application/vnd.oci.image.index.v1+json",
+    "application/vnd.docker.distribution.manifest.list.v2+json"
+]
+manifest_media_types = [
+    "application/vnd.oci.image.manifest.v1+json",
+    "application/vnd.docker.distribution.manifest.v2+json"
+]
+manifest_accept = ", ".join(index_media_types + manifest_media_types)
+
+docker_hub_hosts = ['docker.io', 'index.docker.io']
+docker_hub_registry = 'registry-1.docker.io'
+
+# Architectures of the hosts as named by the image platforms
+machine_architectures = {'x86_64': 'amd64', 'aarch64': 'arm64', 'ppc64le': 'ppc64le', 's390x': 's390x'}
+
+def get_mirror_platforms():
+    """
+    Return the os/architecture platforms mirrored from the tags of multi-platform images,
+    read from IMAGE_MIRROR_PLATFORMS, e.g. "linux/amd64,linux/arm64". None mirrors every platform.
+    """
+    value = os.environ.get('IMAGE_MIRROR_PLATFORMS', '').strip()
+    if value.lower() == 'all':
+        return None
+    if value:
+        return [item.strip() for item in value.split(',') if item.strip()]
+    machine = platform.machine().lower()
+    return [f"linux/{machine_architectures.get(machine, machine)}"]
+
+mirror_platforms = get_mirror_platforms()
+
+# Number of blobs of one image transferred concurrently
+blob_workers = 4
+# Bytes read from the upstream registry per write to the local registry
+blob_read_size = 1024 * 1024
+http_pool_size = 32
+request_timeout = 60
+
+session_lock = threading.Lock()
+registry_session = None
+
+tokens = {}
+tokens_lock = threading.Lock()
+
+manifest_status = {}
+manifest_status_lock = threading.Lock()
+
+def get_registry_session():
+    """
+    Return the HTTP session shared by all registry requests, creating it on first use.
+    """
+    global registry_session
+    with session_lock:
+        if registry_session is None:
+            registry_session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=http_pool_size, pool_maxsize=http_pool_size)
+            registry_session.mount('https://', adapter)
+            registry_session.mount('http://', adapter)
+        return registry_session
+
+def parse_image_name(image_name):
+    """
+    Split an image name into its registry host and repository.
+
+    Args:
+        image_name: The image name, e.g. docker.io/library/busybox.
+
+    Returns:
+        tuple: (registry_host, repository)
+    """
+    parts = image_name.split('/', 1)
+    if len(parts) == 2 and ('.' in parts[0] or ':' in parts[0] or parts[0] == 'localhost'):
+        registry_host, repository = parts
+    else:
+        registry_host, repository = 'docker.io', image_name
+    if registry_host in docker_hub_hosts:
+        registry_host = docker_hub_registry
+        if '/' not in repository:
+            repository = f"library/{repository}"
+    return registry_host, repository
+
+def get_bearer_token(www_authenticate, verify):
+    """
+    Fetch an anonymous bearer token for the challenge returned by a registry.
+
+    Args:
+        www_authenticate: The WWW-Authenticate header of a 401 response.
+        verify: Certificate verification passed to requests.
+
+    Returns:
+        str: The token, or None if the challenge is not a bearer challenge.
+    """
+    if not www_authenticate.lower().startswith('bearer '):
+        return None
+    params = dict(re.findall(r'(\w+)="([^"]*)"', www_authenticate))
+    realm = params.pop('realm', None)
+    if realm is None:
+        return None
+    response = get_registry_session().get(realm, params=params, verify=verify, timeout=request_timeout)
+    response.raise_for_status()
+    token_data = response.json()
+    return token_data.get('token') or token_data.get('access_token')
+
+def registry_request(method, registry_host, repository, path, verify=True, **kwargs):
+    """
+    Send a request to a registry, answering bearer authentication challenges.
+
+    Args:
+        method: HTTP method.
+        registry_host: The registry host.
+        repository: The repository, used to scope the token.
+        path: Path below /v2/<repository>/, or an absolute URL.
+        verify: Certificate verification passed to requests.
+        kwargs: Arguments passed to requests.
+
+    Returns:
+        requests.Response: The response.
+    """
+    url = path if path.startswith('http') else f"https://{registry_host}/v2/{repository}/{path}"
+    headers = kwargs.pop('headers', {})
+    token_key = (registry_host, repository, method in ['GET', 'HEAD'])
+    with tokens_lock:
+        token = tokens.get(token_key)
+    if token:
+        headers['Authorization'] = f"Bearer {token}"
+
+    session = get_registry_session()
+    response = session.request(method, url, headers=headers, verify=verify,
+            timeout=request_timeout, **kwargs)
+    if response.status_code == 401 and 'WWW-Authenticate' in response.headers:
+        token = get_bearer_token(response.headers['WWW-Authenticate'], verify)
+        if token:
+            with tokens_lock:
+                tokens[token_key] = token
+            headers['Authorization'] = f"Bearer {token}"
+            response = session.request(method, url, headers=headers, verify=verify,
+                    timeout=request_timeout, **kwargs)
+    return response
+
+def manifest_exists(registry_host, repository, reference, verify=True):
+    """
+    Check whether a registry has a manifest, remembering the answer for this run.
+
+    Args:
+        registry_host: The registry host.
+        repository: The repository.
+        reference: Tag or digest of the manifest.
+        verify: Certificate verification passed to requests.
+    """
+    key = (registry_host, repository, reference)
+    with manifest_status_lock:
+        if key in manifest_status:
+            return manifest_status[key]
+    response = registry_request('HEAD', registry_host, repository, f"manifests/{reference}",
+            verify=verify, headers={'Accept': manifest_accept})
+    exists = response.status_code == 200
+    set_manifest_status(registry_host, repository, reference, exists)
+    return exists
+
+def get_manifest_status(registry_host, repository, reference):
+    """
+    Return the remembered existence of a manifest, None if it was not checked in this run.
+
+    Args:
+        registry_host: The registry host.
+        repository: The repository.
+        reference: Tag or digest of the manifest.
+    """
+    with manifest_status_lock:
+        return manifest_status.get((registry_host, repository, reference))
+
+def set_manifest_status(registry_host, repository, reference, exists):
+    """
+    Record whether a registry has a manifest.
+
+    Args:
+        registry_host: The registry host.
+        repository: The repository.
+        reference: Tag or digest of the manifest.
+        exists: True if the manifest exists.
+    """
+    with manifest_status_lock:
+        manifest_status[(registry_host, repository, reference)] = exists
+
+def check_manifests(manifests, workers=http_pool_size):
+    """
+    Check a batch of manifests concurrently.
+
+    Args:
+        manifests: List of (registry_host, repository, reference, verify) tuples.
+        workers: Number of concurrent checks.
+
+    Returns:
+        dict: (registry_host, repository, reference) to existence mapping.
+    """
+    def check(manifest):
+        registry_host, repository, reference, verify = manifest
+        try:
+            return manifest_exists(registry_host, repository, reference, verify)
+        except requests.RequestException as err:
+            print(f"Unable to check manifest {registry_host}/{repository}:{reference}: {err}")
+            return False
+
+    manifests = list(dict.fromkeys(manifests))
+    if not manifests:
+        return {}
+    with ThreadPoolExecutor(max_workers=min(workers, len(manifests))) as executor:
+        results = list(executor.map(check, manifests))
+    return {manifest[:3]: exists for manifest, exists in zip(manifests, results)}
+
+def get_manifest(registry_host, repository, reference):
+    """
+    Fetch a manifest or a multi-platform index as published by the registry.
+
+    Args:
+        registry_host: The registry host.
+        repository: The repository.
+        reference: Tag or digest of the manifest.
+
+    Returns:
+        tuple: (manifest bytes, media type)
+    """
+    response = registry_request('GET', registry_host, repository, f"manifests/{reference}",
+            headers={'Accept': manifest_accept})
+    response.raise_for_status()
+    manifest = response.json()
+    media_type = manifest.get('mediaType') or response.headers.get('Content-Type', '').split(';')[0]
+    if media_type not in index_media_types + manifest_media_types:
+        raise ValueError(f"Unsupported manifest type {media_type} for {registry_host}/{repository}:{reference}")
+    return response.content, media_type
+
+class SizedBlobStream:
+    """
+    Iterable over the body of a blob download which also reports the blob size,
+    so requests sends the upload with a Content-Length header and without chunked encoding.
+    """
+
+    def __init__(self, response, size):
+        self.response = response
+        self.size = size
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        return self.response.raw.stream(blob_read_size, decode_content=False)
+
+def copy_blob(source_host, source_repository, target_host, target_repository, blob, target_verify):
+    """
+    Copy a blob to the target registry unless it is already there.
+
+    Args:
+        source_host: The upstream registry host.
+        source_repository: The upstream repository.
+        target_host: The local registry host.
+        target_repository: The local repository.
+        blob: The blob descriptor from the manifest.
+        target_verify: Certificate verification for the local registry.
+
+    Returns:
+        bool: True if the blob was transferred, False if it was already present.
+    """
+    digest = blob['digest']
+    response = registry_request('HEAD', target_host, target_repository, f"blobs/{digest}",
+            verify=target_verify)
+    if response.status_code == 200:
+        return False
+
+    source_response = registry_request('GET', source_host, source_repository, f"blobs/{digest}",
+            stream=True)
+    source_response.raise_for_status()
+    try:
+        upload_response = registry_request('POST', target_host, target_repository, "blobs/uploads/",
+                verify=target_verify)
+        upload_response.raise_for_status()
+        location = urljoin(f"https://{target_host}", upload_response.headers['Location'])
+        separator = '&' if '?' in location else '?'
+        put_response = registry_request('PUT', target_host, target_repository,
+                f"{location}{separator}digest={digest}", verify=target_verify,
+                headers={'Content-Type': 'application/octet-stream'},
+                data=SizedBlobStream(source_response, blob['size']))
+        put_response.raise_for_status()
+    finally:
+        source_response.close()
+    return True
+
+def select_platform_manifests(manifest, platforms):
+    """
+    Return the entries of an index for the given os/architecture platforms.
+
+    Args:
+        manifest: The parsed index.
+        platforms: List of platforms, e.g. ["linux/amd64"].
+    """
+    return [entry for entry in manifest.get('manifests', [])
+            if f"{entry.get('platform', {}).get('os')}/{entry.get('platform', {}).get('architecture')}"
+            in platforms]
+
+def copy_manifest(source_host, source_repository, target_host, target_repository, reference,
+        target_reference, target_verify, platforms=None):
+    """
+    Copy a manifest and its blobs to the local registry. An index is copied with all
+    the manifests it lists, which are pushed by digest before the index itself.
+    With platforms, only the manifests of those platforms are copied from an index. A single
+    one is pushed as target_reference, several are pushed as an index listing only them.
+
+    Args:
+        source_host: The upstream registry host.
+        source_repository: The upstream repository.
+        target_host: The local registry host.
+        target_repository: The local repository.
+        reference: Tag or digest of the upstream manifest.
+        target_reference: Tag or digest to push the manifest as.
+        target_verify: Certificate verification for the local registry.
+        platforms: List of os/architecture platforms to copy, None for every platform.
+
+    Returns:
+        tuple: (number of blobs transferred, number of blobs referenced)
+    """
+    manifest_bytes, media_type = get_manifest(source_host, source_repository, reference)
+    manifest = json.loads(manifest_bytes)
+
+    copied, total = 0, 0
+    if media_type in index_media_types:
+        entries = select_platform_manifests(manifest, platforms) if platforms is not None else []
+        if len(entries) == 1:
+            return copy_manifest(source_host, source_repository, target_host, target_repository,
+                    entries[0]['digest'], target_reference, target_verify)
+        if entries:
+            manifest['manifests'] = entries
+            manifest_bytes = json.dumps(manifest).encode()
+        elif platforms is not None:
+            print(f"No {', '.join(platforms)} manifest in {source_host}/{source_repository}:{reference}, "
+                    "copying every platform.")
+        for entry in manifest.get('manifests', []):
+            entry_copied, entry_total = copy_manifest(source_host, source_repository, target_host,
+                    target_repository, entry['digest'], entry['digest'], target_verify)
+            copied += entry_copied
+            total += entry_total
+    else:
+        blobs = [manifest['config']] + manifest.get('layers', [])
+        with ThreadPoolExecutor(max_workers=blob_workers) as executor:
+            copied = sum(executor.map(lambda blob: copy_blob(source_host, source_repository,
+                    target_host, target_repository, blob, target_verify), blobs))
+        total = len(blobs)
+
+    # Unless platforms were selected, the manifest bytes are pushed unchanged,
+    # so the local digest matches the upstream one
+    response = registry_request('PUT', target_host, target_repository, f"manifests/{target_reference}",
+            verify=target_verify, headers={'Content-Type': media_type}, data=manifest_bytes)
+    response.raise_for_status()
+    return copied, total
+
+def copy_image(image_name, source_reference, target_host, target_reference, target_verify):
+    """
+    Copy an image from its upstream registry to the local registry.
+
+    Args:
+        image_name: The image name, e.g. docker.io/library/busybox.
+        source_reference: Tag or sha256 digest of the upstream image, a digest is copied with every platform.
+        target_host: The local registry host.
+        target_reference: Tag to push the image as.
+        target_verify: Certificate verification for the local registry.
+    """
+    source_host, source_repository = parse_image_name(image_name)
+    target_repository = image_name.split('/', 1)[-1]
+
+    # A digest names the whole index, a tag is mirrored for the configured platforms only
+    platforms = None if source_reference.startswith('sha256:') else mirror_platforms
+    copied, total = copy_manifest(source_host, source_repository, target_host, target_repository,
+            source_reference, target_reference, target_verify, platforms)
+    print(f"Image {image_name}@{source_reference}: {copied} of {total} blobs transferred, "
+            f"{total - copied} already present in {target_host}.")
+    set_manifest_status(target_host, target_repository, target_reference, True)
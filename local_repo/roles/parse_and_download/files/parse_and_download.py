@@ -24,6 +24,9 @@ import download_common
 import download_image
 import download_rpm
 import download_deb
+import download_plan
+from download_scheduler import DownloadScheduler
+from status_store import close_status_stores
 
 
 def load_user_json(file_path):
@@ -75,7 +78,8 @@ def load_software_config_json(software_names, cluster_os_type, cluster_os_versio
 # Example function to process a package
 def process_package(package, repo_store_path,status_file_path,cluster_os_type,
         cluster_os_version, repo_config, version_variables,
-        nerdctl_registry_host, user_registries, cluster_name, software_names, openssl_cert_path):
+        nerdctl_registry_host, user_registries, cluster_name, software_names, openssl_cert_path,
+        dry_run=False):
     """
     Function to process a package
     Args:
@@ -87,22 +91,24 @@ def process_package(package, repo_store_path,status_file_path,cluster_os_type,
         repo_config: Repository configuration.
         version_variables: Variables for rendering version template.
         nerdctl_registry_host: Nerdctl registry host.
+        dry_run: Plan the package instead of downloading it.
     """
     package_name = package['package']
     package_type = package['type']
-    print(f"Processing Package: {package_name}, Type: {package_type}")
+    if not dry_run:
+        print(f"Processing Package: {package_name}, Type: {package_type}")
 
     # Type-specific processing based on the extracted type
-    process_by_package_type(package_name, package_type, package,
+    return process_by_package_type(package_name, package_type, package,
             repo_store_path, status_file_path, cluster_os_type, cluster_os_version,
             repo_config, version_variables, nerdctl_registry_host,
-            user_registries, cluster_name, software_names, openssl_cert_path)
+            user_registries, cluster_name, software_names, openssl_cert_path, dry_run)
 
 # Type-specific processing function
 def process_by_package_type(package_name, package_type, package,
         repo_store_path, status_file_path, cluster_os_type, cluster_os_version,
         repo_config, version_variables, nerdctl_registry_host,
-        user_registries, cluster_name, software_names, openssl_cert_path):
+        user_registries, cluster_name, software_names, openssl_cert_path, dry_run=False):
     """
     Function to process based on package type
     Args:
@@ -117,39 +123,47 @@ def process_by_package_type(package_name, package_type, package,
         version_variables: Variables for rendering version template.
         nerdctl_registry_host: Nerdctl registry host.
         user_registries: External registries hosted by user.
+        dry_run: Dispatch to download_plan, which returns a plan entry instead of downloading.
     """
+    if dry_run:
+        rpm_backend = deb_backend = common_backend = image_backend = download_plan
+    else:
+        rpm_backend, deb_backend = download_rpm, download_deb
+        common_backend, image_backend = download_common, download_image
+
     if package_type == 'rpm' and cluster_os_type in ['rhel','rocky']:
-        download_rpm.process_rpm_package(package, repo_store_path,
+        return rpm_backend.process_rpm_package(package, repo_store_path,
                 status_file_path, cluster_os_type, cluster_os_version,
                 repo_config, version_variables, cluster_name)
     elif package_type == 'deb' and cluster_os_type == 'ubuntu':
-        download_deb.process_deb_package(package, repo_store_path,
+        return deb_backend.process_deb_package(package, repo_store_path,
                 status_file_path, cluster_os_type, cluster_os_version,
                 repo_config, version_variables, cluster_name)
     elif package_type == 'pip_module':
-        download_common.process_pip_package(package, repo_store_path, status_file_path)
+        return common_backend.process_pip_package(package, repo_store_path, status_file_path)
     elif package_type == 'git':
-        download_common.process_git_package(package, repo_store_path, status_file_path)
+        return common_backend.process_git_package(package, repo_store_path, status_file_path)
     elif package_type == 'tarball':
-        download_common.process_tarball_package(package, repo_store_path,
+        return common_backend.process_tarball_package(package, repo_store_path,
                 status_file_path, version_variables)
     elif package_type == 'manifest':
-        download_common.process_manifest_package(package, repo_store_path, status_file_path)
+        return common_backend.process_manifest_package(package, repo_store_path, status_file_path)
     elif package_type == 'shell':
-        download_common.process_shell_package(package, repo_store_path, status_file_path)
+        return common_backend.process_shell_package(package, repo_store_path, status_file_path)
     elif package_type == 'image':
-        download_image.process_image_package(package, repo_config,
+        return image_backend.process_image_package(package, repo_config,
                 nerdctl_registry_host, status_file_path,
                 version_variables, user_registries, software_names, openssl_cert_path)
     elif package_type == 'ansible_galaxy_collection':
-        download_common.process_ansible_galaxy_collection(package,
+        return common_backend.process_ansible_galaxy_collection(package,
                 repo_store_path, status_file_path)
     elif package_type == 'iso':
-        download_common.process_iso_package(package, repo_store_path,
+        return common_backend.process_iso_package(package, repo_store_path,
                 status_file_path, cluster_os_type, cluster_os_version,
                 repo_config, version_variables)
     else:
         print(f"Unknown package type: {package_type} for package {package_name}")
+    return None
 
 
 
@@ -290,15 +304,73 @@ def main():
     # Load software configuration JSON files
     software_configs = load_software_config_json(software_names,
             cluster_os_type, cluster_os_version, user_json_path)
+    rpm_batch_download = os.environ.get('RPM_BATCH_DOWNLOAD', 'true').lower() == 'true'
+    dry_run = os.environ.get('DRY_RUN', 'false').lower() == 'true'
+    plan_file_path = os.environ.get('PLAN_FILE_PATH',
+            os.path.join(os.path.dirname(status_file_path), f"download_plan_{software_name}.csv"))
+    # Expected sizes of missing artifacts are only looked up when the plan is reported
+    download_plan.fetch_remote_sizes = dry_run
+
+    # Check all image manifests up front so present images are skipped without registry round-trips
+    image_packages = [package for cluster_data in software_configs.values()
+            for cluster_name, cluster_info in cluster_data.items()
+            if 'cluster' in cluster_info and cluster_name in subgroup_names
+            for package in cluster_info['cluster'] if package['type'] == 'image']
+    if image_packages:
+        download_image.precheck_image_packages(image_packages, repo_config,
+                nerdctl_registry_host, version_variables, user_registries,
+                software_names, openssl_cert_path)
+
+    # Plan every package first; packages that need no work are recorded without subprocess calls
+    plan = []
+    stack_packages = {}
     for cluster_type, cluster_data in software_configs.items():
         for cluster_name, cluster_info in cluster_data.items():
             if 'cluster' in cluster_info and cluster_name in subgroup_names:
-                print(f"Processing software stack: {cluster_type}")
+                pending = []
                 for package in cluster_info['cluster']:
-                    process_package(package, repo_store_path, status_file_path,
-                            cluster_os_type,cluster_os_version, repo_config, version_variables,
-                            nerdctl_registry_host, user_registries, cluster_name, software_names, openssl_cert_path)
-                print()
+                    entry = process_package(package, repo_store_path, status_file_path,
+                            cluster_os_type, cluster_os_version, repo_config, version_variables,
+                            nerdctl_registry_host, user_registries, cluster_name, software_names,
+                            openssl_cert_path, dry_run=True)
+                    if entry is not None:
+                        plan.append(entry)
+                    if entry is not None and entry['status'] is not None:
+                        if not dry_run:
+                            print(f"Package {entry['package']} needs no download: {entry['state']}")
+                            common_utility.update_status(entry['package'], entry['type'],
+                                    entry['status'], status_file_path)
+                    else:
+                        pending.append(package)
+                stack_packages[(cluster_type, cluster_name)] = pending
+
+    if dry_run:
+        download_plan.write_plan(plan, plan_file_path)
+        return
+
+    scheduler = DownloadScheduler()
+    for (cluster_type, cluster_name), packages in stack_packages.items():
+        print(f"Queueing software stack: {cluster_type}")
+        if rpm_batch_download and cluster_os_type in ['rhel', 'rocky']:
+            rpm_packages = [package for package in packages if package['type'] == 'rpm']
+            packages = [package for package in packages if package['type'] != 'rpm']
+            if rpm_packages:
+                scheduler.submit(f"{cluster_name} rpm batch", 'rpm',
+                        download_rpm.process_rpm_packages_batch, rpm_packages,
+                        repo_store_path, status_file_path, cluster_os_type,
+                        cluster_os_version, repo_config, version_variables, cluster_name)
+        for package in packages:
+            scheduler.submit(package.get('package'), package.get('type'),
+                    process_package, package, repo_store_path, status_file_path,
+                    cluster_os_type,cluster_os_version, repo_config, version_variables,
+                    nerdctl_registry_host, user_registries, cluster_name, software_names, openssl_cert_path)
+
+    # Repository metadata is generated once all the downloads have completed
+    try:
+        scheduler.wait()
+    finally:
+        close_status_stores()
+    print()
 
     if cluster_os_type == 'rhel' or cluster_os_type == 'rocky':
         common_utility.run_createrepo_on_rhel_directories(repo_store_path,
@@ -0,0 +1,254 @@
+# Copyright 2025 Dell Inc. or its subsidiaries. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Module providing the package status store behind download_package_status.csv.
+
+Status updates are appended to a journal next to the status file and kept in an
+in-memory index keyed by (package, type). The CSV consumed by the Ansible tasks is
+rewritten atomically from the index every compaction_interval updates, at most
+compaction_seconds after an update and when the store is closed, after which the
+journal is truncated.
+"""
+
+import os
+import time
+import fcntl
+import threading
+
+status_header = "package,type,status"
+
+# Number of journal entries after which the CSV view is rewritten
+compaction_interval = 100
+# Seconds after which an update is visible in the CSV view the users watch
+compaction_seconds = 5
+
+store_instances = {}
+store_instances_lock = threading.Lock()
+
+def get_status_store(status_file_path):
+    """
+    Return the status store of a status file, loading it on first use.
+
+    Args:
+        status_file_path: The path to the status file.
+    """
+    with store_instances_lock:
+        store = store_instances.get(status_file_path)
+        if store is None:
+            store = StatusStore(status_file_path)
+            store_instances[status_file_path] = store
+        return store
+
+def close_status_stores():
+    """
+    Write the CSV view of every open status store and remove their journals.
+    """
+    with store_instances_lock:
+        for store in store_instances.values():
+            store.close()
+        store_instances.clear()
+
+
+class StatusStore:
+    """
+    Append-only, lock protected journal of package statuses with a CSV view.
+    """
+
+    def __init__(self, status_file_path):
+        """
+        Args:
+            status_file_path: The path to the status file.
+        """
+        self.status_file_path = status_file_path
+        self.journal_path = f"{status_file_path}.journal"
+        self.lock_path = f"{status_file_path}.lock"
+        self.lock = threading.Lock()
+        self.has_header = False
+        self.statuses = {}
+        self.pending = 0
+        self.last_compaction_time = time.monotonic()
+        self.compaction_timer = None
+        with self.lock, self.file_lock():
+            self.load()
+
+    def file_lock(self):
+        """
+        Return a context manager holding an exclusive lock shared with other processes.
+        """
+        return FileLock(self.lock_path)
+
+    @staticmethod
+    def parse_line(line):
+        """
+        Split a status line into its (package, type) key and status.
+
+        Package names may contain commas, so the type and status are taken from the right.
+
+        Args:
+            line: A package,type,status line.
+        """
+        parts = line.rstrip('\n').rsplit(',', 2)
+        if len(parts) != 3:
+            return None, None
+        return (parts[0], parts[1]), parts[2]
+
+    def load(self):
+        """
+        Build the index from the CSV view and replay a journal left by an interrupted run.
+        """
+        try:
+            with open(self.status_file_path, 'r', encoding='utf-8') as status_file:
+                lines = status_file.readlines()
+        except FileNotFoundError:
+            lines = []
+
+        if lines and lines[0].strip() == status_header:
+            self.has_header = True
+            lines = lines[1:]
+
+        try:
+            with open(self.journal_path, 'r', encoding='utf-8') as journal_file:
+                journal_lines = journal_file.readlines()
+        except FileNotFoundError:
+            journal_lines = []
+
+        for line in lines + journal_lines:
+            key, status = self.parse_line(line)
+            if key is not None:
+                self.statuses[key] = status
+        self.pending = len(journal_lines)
+
+    def update(self, package_name, package_type, status):
+        """
+        Record the status of a package.
+
+        Args:
+            package_name: The name of the package.
+            package_type: The type of the package.
+            status: The status of the package.
+        """
+        with self.lock, self.file_lock():
+            with open(self.journal_path, 'a', encoding='utf-8') as journal_file:
+                journal_file.write(f"{package_name},{package_type},{status}\n")
+                journal_file.flush()
+                os.fsync(journal_file.fileno())
+            self.statuses[(package_name, package_type)] = status
+            self.pending += 1
+            delay = self.last_compaction_time + compaction_seconds - time.monotonic()
+            if self.pending >= compaction_interval or delay <= 0:
+                self.compact()
+            elif self.compaction_timer is None:
+                # Updates within the delay are written to the CSV view together
+                self.compaction_timer = threading.Timer(delay, self.compact_pending)
+                self.compaction_timer.daemon = True
+                self.compaction_timer.start()
+
+    def compact_pending(self):
+        """
+        Rewrite the status file if updates were journaled since the last compaction.
+        """
+        with self.lock, self.file_lock():
+            self.compaction_timer = None
+            if self.pending:
+                self.compact()
+
+    def get_status(self, package_name, package_type):
+        """
+        Return the recorded status of a package, None if it has no status yet.
+
+        Args:
+            package_name: The name of the package.
+            package_type: The type of the package.
+        """
+        with self.lock:
+            return self.statuses.get((package_name, package_type))
+
+    def get_rows(self):
+        """
+        Return the recorded statuses as (package, type, status) tuples in first recorded order.
+        """
+        with self.lock:
+            return [(package_name, package_type, status)
+                    for (package_name, package_type), status in self.statuses.items()]
+
+    def get_csv_view(self):
+        """
+        Return the content of the status file the Ansible tasks read.
+        """
+        with self.lock:
+            return self.get_csv_view_unlocked()
+
+    def compact(self):
+        """
+        Atomically rewrite the status file from the index and truncate the journal,
+        caller must hold both locks.
+        """
+        tmp_status_file_path = f"{self.status_file_path}.tmp"
+        with open(tmp_status_file_path, 'w', encoding='utf-8') as status_file:
+            status_file.write(self.get_csv_view_unlocked())
+            status_file.flush()
+            os.fsync(status_file.fileno())
+        if os.path.exists(self.status_file_path):
+            os.chmod(tmp_status_file_path, os.stat(self.status_file_path).st_mode & 0o777)
+        os.replace(tmp_status_file_path, self.status_file_path)
+        open(self.journal_path, 'w', encoding='utf-8').close()
+        self.pending = 0
+        self.last_compaction_time = time.monotonic()
+
+    def get_csv_view_unlocked(self):
+        """
+        Return the CSV view without taking the thread lock, caller must hold it.
+        """
+        lines = [f"{package_name},{package_type},{status}\n"
+                 for (package_name, package_type), status in self.statuses.items()]
+        if self.has_header:
+            lines.insert(0, f"{status_header}\n")
+        return ''.join(lines)
+
+    def close(self):
+        """
+        Write the final CSV view and remove the journal.
+        """
+        with self.lock, self.file_lock():
+            if self.compaction_timer is not None:
+                self.compaction_timer.cancel()
+                self.compaction_timer = None
+            self.compact()
+            if os.path.exists(self.journal_path):
+                os.remove(self.journal_path)
+
+
+class FileLock:
+    """
+    Exclusive flock on a lock file, usable as a context manager.
+    """
+
+    def __init__(self, lock_path):
+        """
+        Args:
+            lock_path: Path to the lock file.
+        """
+        self.lock_path = lock_path
+        self.lock_file = None
+
+    def __enter__(self):
+        self.lock_file = open(self.lock_path, 'a', encoding='utf-8')
+        fcntl.flock(self.lock_file, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        fcntl.flock(self.lock_file, fcntl.LOCK_UN)
+        self.lock_file.close()
+        self.lock_file = None
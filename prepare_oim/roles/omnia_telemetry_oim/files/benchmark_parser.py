@@ -0,0 +1,125 @@
+# Copyright 2025 Dell Inc. or its subsidiaries. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+'''
+Benchmark of the csv parsing of the telemetry collector.
+It compares the pandas DataFrame parsing used before with the parsing of the
+gpu_backend nvidia-smi and rocm-smi backends, which the collectors run once per cycle.
+The backends parse canned outputs instead of running the commands. Each parser runs
+in its own process, and the import time, the cpu time of one collection cycle and
+the resident memory are reported.
+
+Usage: python3 benchmark_parser.py [--gpus 8] [--cycles 2000]
+'''
+
+import sys
+import time
+import argparse
+import resource
+import subprocess
+
+variants = ["pandas", "gpu_backend"]
+
+def get_nvidia_smi_output(gpu_count):
+    '''
+    This method returns nvidia-smi --query-gpu csv output for gpu_count gpus.
+    '''
+    lines = ["name, driver_version, pci.bus_id, power.management, power.limit [W], "
+             "power.draw [W], temperature.gpu, utilization.gpu [%]"]
+    for index in range(gpu_count):
+        lines.append(f"NVIDIA A100-SXM4-80GB, 535.104.05, 00000000:{index + 16:02X}:00.0, "
+                     f"Enabled, 400.00, {60 + index}.52, {30 + index}, {index * 10 % 100}")
+    return "\n".join(lines)
+
+def get_rocm_smi_output(gpu_count):
+    '''
+    This method returns rocm-smi -t -u -P -M --showbus --csv output for gpu_count gpus.
+    '''
+    lines = ["device,Temperature (Sensor edge) (C),Temperature (Sensor junction) (C),"
+             "Temperature (Sensor memory) (C),GPU use (%),Average Graphics Package Power (W),"
+             "Max Graphics Package Power (W),PCI Bus"]
+    for index in range(gpu_count):
+        lines.append(f"card{index},{35 + index}.0,{40 + index}.0,N/A,{index * 10 % 100},"
+                     f"{90 + index}.0,300.0,0000:{index + 16:02X}:00.0")
+    return "\n".join(lines)
+
+def run_variant(variant, gpu_count, cycles):
+    '''
+    This method parses the outputs of one collection cycle cycles times with one parser
+    and prints import seconds, cpu seconds per cycle and max resident memory in kB.
+    '''
+    import_start = time.perf_counter()
+    nvidia_smi_output = get_nvidia_smi_output(gpu_count)
+    rocm_smi_output = get_rocm_smi_output(gpu_count)
+    if variant == "pandas":
+        from io import StringIO
+        import pandas as pd
+
+        def parse_cycle():
+            for command_output in (nvidia_smi_output, rocm_smi_output):
+                dataframe = pd.read_csv(StringIO(command_output), sep=",", header=0)
+                dataframe.columns = dataframe.columns.str.strip()
+                for column_name in dataframe.columns:
+                    dataframe[column_name].tolist()
+    else:
+        import invoke_commands
+        import gpu_backend
+
+        # The backends get the canned outputs instead of running nvidia-smi and rocm-smi
+        invoke_commands.call_command = lambda command, *args, **kwargs: nvidia_smi_output
+        invoke_commands.run_command = lambda command, *args, **kwargs: rocm_smi_output
+        nvidia_backend = gpu_backend.NvidiaSmiBackend()
+        amd_backend = gpu_backend.RocmSmiBackend()
+
+        def parse_cycle():
+            nvidia_backend.collect()
+            amd_backend.collect()
+    import_seconds = time.perf_counter() - import_start
+
+    cpu_start = time.process_time()
+    for _ in range(cycles):
+        parse_cycle()
+    cycle_seconds = (time.process_time() - cpu_start) / cycles
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"{import_seconds} {cycle_seconds} {max_rss}")
+
+def main():
+    '''
+    Run every parser in a fresh process and print the comparison.
+    '''
+    parser = argparse.ArgumentParser(description="Benchmark the telemetry csv parsing")
+    parser.add_argument("--gpus", type=int, default=8, help="gpus in the parsed outputs")
+    parser.add_argument("--cycles", type=int, default=2000, help="collection cycles to parse")
+    parser.add_argument("--variant", choices=variants, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.variant:
+        run_variant(args.variant, args.gpus, args.cycles)
+        return
+
+    print(f"{'parser':<16}{'import (ms)':>14}{'cpu/cycle (us)':>16}{'max rss (MB)':>14}")
+    for variant in variants:
+        result = subprocess.run([sys.executable, __file__, "--variant", variant,
+                                 "--gpus", str(args.gpus), "--cycles", str(args.cycles)],
+                                stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                universal_newlines=True, check=False)
+        if result.returncode != 0:
+            print(f"{variant:<16}failed: {result.stderr.strip().splitlines()[-1]}")
+            continue
+        import_seconds, cycle_seconds, max_rss = result.stdout.split()
+        print(f"{variant:<16}{float(import_seconds) * 1000:>14.1f}"
+              f"{float(cycle_seconds) * 1000000:>16.1f}{int(max_rss) / 1024:>14.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -16,11 +16,16 @@
 Module to initiate omnia telemetry data collection
 '''
 import time
-import sys
+import math
 import signal
+import threading
 import common_logging
 import utility
 import prerequisite
+import gpu_backend
+from probe_scheduler import ProbeScheduler
+from metric_change_filter import MetricChangeFilter, default_heartbeat_interval
+import dbupdate
 from dbupdate import DatabaseClient
 from regular_metric_collector import RegularMetricCollector
 from gpu_metric_collector import GPUMetricCollector
@@ -31,13 +36,152 @@ REGULAR_METRIC_COLLECTOR_OBJ = None
 HEALTH_METRIC_COLLECTOR_OBJ = None
 GPU_METRIC_COLLECTOR_OBJ = None
 DBCLIENT_OBJ = None
+PROBE_SCHEDULER_OBJ = None
+# Set by the sigterm handler, the main loop stops and cleans up at the end of its cycle
+STOP_EVENT = threading.Event()
+
+# telemetry.ini keys holding the collection interval of each probe, probes not listed
+# are collected every omnia_telemetry_collection_interval seconds
+probe_interval_keys = {
+    "regular:blocked_process": "memory_collection_interval",
+    "regular:cpu_info": "memory_collection_interval",
+    "regular:hardware_corrupted_memory": "memory_collection_interval",
+    "regular:virtual_memory_info": "memory_collection_interval",
+    "regular:packet_errors": "network_collection_interval",
+    "regular:smart": "smart_collection_interval",
+    "health:smart": "smart_collection_interval",
+    "regular:slurm": "slurm_collection_interval",
+    "health:kubernetes_pods": "kubernetes_collection_interval",
+    "health:kubernetes_nodes": "kubernetes_collection_interval",
+    "health:kubernetes_components": "kubernetes_collection_interval",
+    "health:nvidia": "gpu_health_collection_interval",
+    "health:amd": "gpu_health_collection_interval",
+    "health:amd_proc_acc": "gpu_health_collection_interval",
+    "health:gaudi": "gpu_health_collection_interval",
+    "health:gpu": "gpu_health_collection_interval",
+    "gpu:nvidia": "gpu_collection_interval",
+    "gpu:amd": "gpu_collection_interval",
+    "gpu:amd_proc_acc": "gpu_collection_interval",
+    "gpu:gaudi": "gpu_collection_interval",
+    "gpu:none": "gpu_collection_interval"
+}
+
+class TimerWheel:
+    '''
+    Hashed timer wheel deciding which probes are due in a collection tick.
+    Every slot covers one tick; a probe due further away than one turn of the
+    wheel waits in its slot for the remaining number of rounds.
+    '''
+
+    def __init__(self, tick, max_interval):
+        self.tick = tick
+        self.slots = [[] for _ in range(max(max_interval // tick, 1))]
+        self.position = 0
+        self.intervals = {}
+
+    def schedule(self, name, interval):
+        '''
+        Schedule a probe to be due every interval seconds, starting one interval from now.
+        '''
+        self.intervals[name] = interval
+        self.insert(name, max(interval // self.tick, 1))
+
+    def insert(self, name, ticks):
+        '''
+        Place a probe in the slot ticks away from the current position.
+        '''
+        self.slots[(self.position + ticks) % len(self.slots)].append([name, (ticks - 1) // len(self.slots)])
+
+    def is_scheduled(self, name):
+        '''
+        Check whether a probe has been scheduled.
+        '''
+        return name in self.intervals
+
+    def advance(self):
+        '''
+        Move the wheel by one tick and return the names of the probes due now,
+        rescheduling them for their next interval.
+        '''
+        self.position = (self.position + 1) % len(self.slots)
+        slot = self.slots[self.position]
+        self.slots[self.position] = []
+        due = set()
+        for name, rounds in slot:
+            if rounds > 0:
+                self.slots[self.position].append([name, rounds - 1])
+            else:
+                due.add(name)
+        for name in due:
+            self.insert(name, max(self.intervals[name] // self.tick, 1))
+        return due
+
+def get_probe_intervals():
+    '''
+    Read the collection interval of every probe group from telemetry.ini.
+    Groups without a positive interval use omnia_telemetry_collection_interval.
+    '''
+    default_interval = int(utility.dict_telemetry_ini["omnia_telemetry_collection_interval"])
+    probe_intervals = {"default": default_interval}
+    for interval_key in set(probe_interval_keys.values()):
+        try:
+            interval = int(utility.dict_telemetry_ini.get(interval_key) or default_interval)
+        except ValueError:
+            common_logging.log_error("collector:get_probe_intervals",
+                                     f"Invalid {interval_key}, using {default_interval} seconds")
+            interval = default_interval
+        probe_intervals[interval_key] = interval if interval > 0 else default_interval
+    return probe_intervals
+
+def get_health_check_heartbeat_interval():
+    '''
+    Read the seconds after which an unchanged health check metric is reported again,
+    0 reports every health check metric in every interval.
+    '''
+    try:
+        return int(utility.dict_telemetry_ini.get("health_check_heartbeat_interval") or
+                   default_heartbeat_interval)
+    except ValueError:
+        common_logging.log_error("collector:get_health_check_heartbeat_interval",
+                                 f"Invalid health_check_heartbeat_interval, using {default_heartbeat_interval} seconds")
+        return default_heartbeat_interval
+
+def get_db_client_settings():
+    '''
+    Read the batching and spool bounds of the database client from telemetry.ini,
+    keys which are missing or invalid use the defaults of dbupdate.
+    '''
+    settings = {}
+    for ini_key, setting, default in (("db_batch_max_rows", "batch_max_rows", dbupdate.default_batch_max_rows),
+                                      ("db_batch_max_age", "batch_max_age", dbupdate.default_batch_max_age),
+                                      ("db_spool_max_mb", "spool_max_bytes",
+                                       dbupdate.default_spool_max_bytes // (1024 * 1024))):
+        try:
+            value = int(utility.dict_telemetry_ini.get(ini_key) or default)
+        except ValueError:
+            common_logging.log_error("collector:get_db_client_settings",
+                                     f"Invalid {ini_key}, using {default}")
+            value = default
+        settings[setting] = max(value, 0)
+    settings["spool_max_bytes"] *= 1024 * 1024
+    return settings
+
+def get_probe_interval(name, probe_intervals):
+    '''
+    Return the collection interval of a probe.
+    '''
+    return probe_intervals[probe_interval_keys.get(name, "default")]
 
 def cleanup():
     '''
     Cleanup operations to be executed during graceful shutdown.
     '''
     global REGULAR_METRIC_COLLECTOR_OBJ, HEALTH_METRIC_COLLECTOR_OBJ, GPU_METRIC_COLLECTOR_OBJ
-    global DBCLIENT_OBJ
+    global DBCLIENT_OBJ, PROBE_SCHEDULER_OBJ
+
+    # Stop the probe threads without waiting for probes still running
+    if PROBE_SCHEDULER_OBJ:
+        PROBE_SCHEDULER_OBJ.shutdown()
 
     # Delete the metric collector objects if they exist
     if REGULAR_METRIC_COLLECTOR_OBJ:
@@ -47,8 +191,13 @@ def cleanup():
     if GPU_METRIC_COLLECTOR_OBJ:
         del GPU_METRIC_COLLECTOR_OBJ
 
-    # Close any open database connections
+    # Release the gpu vendor libraries
+    gpu_backend.close_backends()
+
+    # Write the buffered rows, or keep them in the spool for the next start
+    # and close any open database connections
     if DBCLIENT_OBJ:
+        DBCLIENT_OBJ.flush()
         DBCLIENT_OBJ.db_close()
 
     # Close syslog
@@ -56,27 +205,36 @@ def cleanup():
 
 def handle_sigterm(signum, frame):
     '''
-    sigterm handler for restart,stop omnia telemetry service
+    sigterm handler for restart,stop omnia telemetry service.
+    The handler only stops the main loop, which flushes the rows outside of
+    any flush the signal interrupted.
+    '''
+    STOP_EVENT.set()
+
+def handle_sighup(signum, frame):
+    '''
+    sighup handler to detect the installed components again, e.g. after a hardware change
     '''
-    cleanup()
-    sys.exit(0)
+    prerequisite.invalidate_component_cache()
 
 def main():
     '''
     Module main to initiate the telemetry data collection functionality
     '''
     global REGULAR_METRIC_COLLECTOR_OBJ, HEALTH_METRIC_COLLECTOR_OBJ, GPU_METRIC_COLLECTOR_OBJ
-    global DBCLIENT_OBJ
+    global DBCLIENT_OBJ, PROBE_SCHEDULER_OBJ
 
     common_logging.setup_syslog('omnia_telemetry')
 
     # Register signal handler for SIGTERM
     signal.signal(signal.SIGTERM, handle_sigterm)
+    # Register signal handler for SIGHUP
+    signal.signal(signal.SIGHUP, handle_sighup)
 
     # Copy telemetry ini to dictionary dict_telemetry_ini
     if utility.set_telemetry_ini_values() is True:
         # Sleep for fuzzy_offset value
-        time.sleep(utility.generate_random_fuzzy_offset(int(utility.dict_telemetry_ini["fuzzy_offset"])))
+        STOP_EVENT.wait(utility.generate_random_fuzzy_offset(int(utility.dict_telemetry_ini["fuzzy_offset"])))
 
         # Create objects for different telemetry groups
         if utility.dict_telemetry_ini["collect_regular_metrics"] == "true":
@@ -87,30 +245,60 @@ def main():
             GPU_METRIC_COLLECTOR_OBJ = GPUMetricCollector()
 
         # Create object for database client
-        DBCLIENT_OBJ = DatabaseClient()
+        DBCLIENT_OBJ = DatabaseClient(**get_db_client_settings())
 
-        while True:
+        # Probes of all metric groups run concurrently and must complete within their own
+        # interval, the commands they run are bounded by metric_collection_timeout.
+        # A cycle waits one tick for its probes, results of slower probes are stored
+        # with a later cycle.
+        PROBE_SCHEDULER_OBJ = ProbeScheduler()
+        probe_intervals = get_probe_intervals()
+        timer_wheel = TimerWheel(math.gcd(*probe_intervals.values()), max(probe_intervals.values()))
+        next_tick_time = time.monotonic()
+        # Health check states rarely change, only transitions and heartbeats are stored
+        health_change_filter = MetricChangeFilter(get_health_check_heartbeat_interval())
+
+        while not STOP_EVENT.is_set():
             prerequisite.check_component_existence()
             combined_result_dict = {"Regular Metric": {}, "Health Check Metric": {}, "GPU Metric": {}}
             combined_unit_dict = {"Regular Metric Unit": {}, "GPU Metric Unit": {}}
 
+            probes = []
+            if utility.dict_telemetry_ini["collect_regular_metrics"] == "true":
+                probes += REGULAR_METRIC_COLLECTOR_OBJ.get_probes(utility.dict_telemetry_ini["group_info"])
+            if utility.dict_telemetry_ini["collect_health_check_metrics"] == "true":
+                probes += HEALTH_METRIC_COLLECTOR_OBJ.get_probes(utility.dict_telemetry_ini["group_info"])
+            if utility.dict_telemetry_ini["collect_gpu_metrics"] == "true":
+                probes += GPU_METRIC_COLLECTOR_OBJ.get_probes(utility.dict_telemetry_ini["group_info"])
+
+            # Run only the probes due in this tick, probes seen for the first time run right away
+            due_probes = timer_wheel.advance()
+            for name, _ in probes:
+                if not timer_wheel.is_scheduled(name):
+                    timer_wheel.schedule(name, get_probe_interval(name, probe_intervals))
+                    due_probes.add(name)
+            PROBE_SCHEDULER_OBJ.run([probe for probe in probes if probe[0] in due_probes],
+                                    {name: timer_wheel.intervals[name] for name in due_probes},
+                                    timer_wheel.tick)
+
+            # Copy the outputs, a probe which missed its deadline may still update them
             if utility.dict_telemetry_ini["collect_regular_metrics"] == "true":
-                REGULAR_METRIC_COLLECTOR_OBJ.metric_collector(utility.dict_telemetry_ini["group_info"])
-                combined_result_dict["Regular Metric"] = REGULAR_METRIC_COLLECTOR_OBJ.regular_metric_output_dict
-                combined_unit_dict["Regular Metric Unit"] = REGULAR_METRIC_COLLECTOR_OBJ.regular_unit
+                combined_result_dict["Regular Metric"] = dict(REGULAR_METRIC_COLLECTOR_OBJ.regular_metric_output_dict)
+                combined_unit_dict["Regular Metric Unit"] = dict(REGULAR_METRIC_COLLECTOR_OBJ.regular_unit)
 
             if utility.dict_telemetry_ini["collect_health_check_metrics"] == "true":
-                HEALTH_METRIC_COLLECTOR_OBJ.metric_collector(utility.dict_telemetry_ini["group_info"])
-                combined_result_dict["Health Check Metric"] = HEALTH_METRIC_COLLECTOR_OBJ.health_check_metric_output_dict
+                combined_result_dict["Health Check Metric"] = health_change_filter.filter(
+                    dict(HEALTH_METRIC_COLLECTOR_OBJ.health_check_metric_output_dict))
 
             if utility.dict_telemetry_ini["collect_gpu_metrics"] == "true":
-                GPU_METRIC_COLLECTOR_OBJ.metric_collector(utility.dict_telemetry_ini["group_info"])
-                combined_result_dict["GPU Metric"] = GPU_METRIC_COLLECTOR_OBJ.gpu_metric_output_dict
-                combined_unit_dict["GPU Metric Unit"] = GPU_METRIC_COLLECTOR_OBJ.gpu_unit
+                combined_result_dict["GPU Metric"] = dict(GPU_METRIC_COLLECTOR_OBJ.gpu_metric_output_dict)
+                combined_unit_dict["GPU Metric Unit"] = dict(GPU_METRIC_COLLECTOR_OBJ.gpu_unit)
             # DB Update
             DBCLIENT_OBJ.update_db(combined_result_dict, combined_unit_dict, prerequisite.get_system_name(),utility.get_system_hostname())
-            # sleep for omnia_telemetry_collection_interval time
-            time.sleep(int(utility.dict_telemetry_ini["omnia_telemetry_collection_interval"]))
+            # sleep until the next tick
+            next_tick_time += timer_wheel.tick
+            STOP_EVENT.wait(max(next_tick_time - time.monotonic(), 0))
+        cleanup()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
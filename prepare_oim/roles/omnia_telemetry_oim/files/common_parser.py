@@ -19,11 +19,12 @@
 '''
 
 import re
+import csv
+import math
 import json
 import configparser
 from io import StringIO
 import yaml
-import pandas as pd
 import common_logging
 
 def query_from_txt(input_txt,pattern):
@@ -44,32 +45,49 @@ def query_from_txt(input_txt,pattern):
     else:
         return None
 
-#dataframe parser
-def get_df_format(command_input):
+# Values the smi tools report for fields a device does not support
+csv_na_values = {"", "N/A", "[N/A]", "NA", "nan", "NaN", "[Not Supported]", "Not Supported"}
+
+def to_number(value):
     '''
-    i/p: gets csv format output of any command as input and the column name whose data is required
-    o/p: convert df to dict of list and return.
+    i/p: a value of a command output
+    o/p: the value as int or float, None when it is not a number, e.g. N/A or [Not Supported]
     '''
+    if value is None or isinstance(value, (int, float)):
+        return value
+    value = str(value).strip()
+    if value in csv_na_values:
+        return None
+    if value.isdigit() or (value[:1] == "-" and value[1:].isdigit()):
+        return int(value)
     try:
-        csv_string = StringIO(command_input)
-        dataframe = pd.read_csv(csv_string, sep=",", header=0)
-        dataframe.columns = dataframe.columns.str.strip()
-        return dataframe
-    except Exception as err:
-        common_logging.log_error("common_parser:get_df_format",
-                                 "could not convert csv to dataframe." + str(err))
+        number = float(value)
+    except ValueError:
         return None
+    return None if math.isnan(number) else number
 
-def get_col_from_df(dataframe, col_name):
+#csv column parser
+def get_csv_columns(command_input):
     '''
-    i/p: gets dataframe and column name as input
-    o/p: extract column data from dataframe into a list and return
+    i/p: gets csv format output of any command with a header row as input
+    o/p: dictionary with the stripped header as key and the list of stripped values
+         of that column as value, None if the output could not be parsed.
     '''
     try:
-        return dataframe[col_name].tolist()
+        rows = list(csv.reader(StringIO(command_input)))
+        if not rows:
+            return None
+        headers = [header.strip() for header in rows[0]]
+        columns = {header: [] for header in headers}
+        for row in rows[1:]:
+            if not row:
+                continue
+            for index, header in enumerate(headers):
+                columns[header].append(row[index].strip() if index < len(row) else None)
+        return columns
     except Exception as err:
-        common_logging.log_error("common_parser:get_col_from_df",
-                                 "could not fetch required column from dataframe." + str(err))
+        common_logging.log_error("common_parser:get_csv_columns",
+                                 "could not parse csv output." + str(err))
         return None
 
 def parse_yaml_file(filedata):
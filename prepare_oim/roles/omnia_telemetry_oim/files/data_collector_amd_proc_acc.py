@@ -13,83 +13,37 @@
 # limitations under the License.
 
 '''
-Module to gather amd gpu metrics
+Module to gather amd processing accelerator metrics
 '''
 
-import common_parser
-import invoke_commands
-import common_logging
+import data_collector_amd_gpu
 
 # --------------------------------AMD GPU metric collection---------------------------------
 
-rocm_bin_path = "/opt/rocm/bin/"
+# Temperature sensors reported for amd processing accelerators
+amd_proc_acc_temperature_sensors = ["junction", "memory"]
 
-def get_amd_gpu_temp():
+def get_amd_gpu_temp(amd_metrics_output):
     '''
-    This method collects amd gpu temp from rocm query output
-    and stores it in gpu metric dictionary
+    This method collects amd processing accelerator temp from amd gpu sample
     '''
-    amd_metrics_query = rocm_bin_path + "rocm-smi -t --csv"
-    command_result = invoke_commands.run_command(amd_metrics_query)
-    if command_result is not None:
-        gpu_temp = {}
-        command_result_df = common_parser.get_df_format(command_result)
-        try:
-            gpu_temp['sensor_junction'] = common_parser.get_col_from_df(command_result_df,
-                                                             'Temperature (Sensor junction) (C)')
-        except Exception as err:
-            gpu_temp['sensor_junction'] = None
-            common_logging.log_error("data_collector_amd_proc_acc:get_amd_gpu_temp",
-                                "could not parse sensor_junction temp from rocm-smi" + str(err))
-        try:
-            gpu_temp['sensor_memory'] = common_parser.get_col_from_df(command_result_df,
-                                                                 'Temperature (Sensor memory) (C)')
-        except Exception as err:
-            gpu_temp['sensor_memory'] = None
-            common_logging.log_error("data_collector_amd_proc_acc:get_amd_gpu_temp",
-                                   "could not parse sensor_memory temp from rocm-smi" + str(err))
-        return gpu_temp
-
-    common_logging.log_error("data_collector_amd_proc_acc:get_amd_gpu_temp",
-                             "rocm-smi command did not give output for gpu temperature metrics.")
-    return None
+    return data_collector_amd_gpu.get_amd_gpu_temp(amd_metrics_output,
+                                                   amd_proc_acc_temperature_sensors)
 
 # -------------------------------AMD GPU health metric collection-------------------------------
 
-def get_gpu_health_power():
+def get_gpu_health_power(amd_metrics_output):
     '''
-    This method collects amd gpu power health from rocm query output
+    This method collects amd processing accelerator max and current socket power from amd gpu sample
     '''
-    amd_metrics_query = rocm_bin_path + "rocm-smi -P -M --csv"
-    command_result = invoke_commands.run_command(amd_metrics_query)
-    if command_result is not None:
-        try:
-            command_result_df = common_parser.get_df_format(command_result)
-            gpu_util_list_max = common_parser.get_col_from_df(command_result_df,
-                                                              'Max Graphics Package Power (W)')
-            gpu_util_list_avg = common_parser.get_col_from_df(command_result_df,
-                                                              'Current Socket Graphics Package Power (W)')
-            return gpu_util_list_max,gpu_util_list_avg
-        except Exception as err:
-            common_logging.log_error("data_collector_amd_proc_acc:get_gpu_health_power",
-                                     "could not parse gpu power health from rocm-smi. "+str(err))
-            return None,None
+    if amd_metrics_output is not None:
+        return amd_metrics_output["power_limit"], amd_metrics_output["power_current"]
     return None,None
 
-def get_gpu_health_thermal():
+def get_gpu_health_thermal(amd_metrics_output):
     '''
-    This method collects amd gpu thermal health from rocm query output
+    This method collects amd processing accelerator junction temperature from amd gpu sample
     '''
-    amd_metrics_query = rocm_bin_path + "rocm-smi -t --csv"
-    command_result = invoke_commands.run_command(amd_metrics_query)
-    if command_result is not None:
-        command_result_df = common_parser.get_df_format(command_result)
-        try:
-            gpu_temp = common_parser.get_col_from_df(command_result_df,
-                                                                'Temperature (Sensor junction) (C)')
-            return gpu_temp
-        except Exception as err:
-            common_logging.log_error("data_collector_amd_proc_acc:get_gpu_health_thermal",
-                                     "could not parse sensor_edge temp from rocm-smi. " + str(err))
-        return None
+    if amd_metrics_output is not None:
+        return amd_metrics_output["temperature"].get("junction")
     return None
@@ -17,120 +17,125 @@
 Module to gather gaudi metrics
 '''
 import shlex
+import gpu_backend
 import common_parser
 import invoke_commands
 import common_logging
-
-def get_col_data(cmd_output, column):
-    if cmd_output is None:
-        return None
-    return common_parser.get_col_from_df(cmd_output, column)
+import probe_scheduler
 
 # --------------------------------Gaudi metric collection---------------------------------
 def get_gaudi_metrics_output():
     '''
-    This method collects command output for hl-smi command for gaudi metrics
-    :return: gaudi query output
+    This method samples all gaudi fields through the gaudi backend
+    :return: gaudi sample
     '''
-    gaudi_metrics_query = "hl-smi --query-aip=Name,driver_version,bus_id,power.draw,temperature.aip,utilization.aip --format=csv,nounits"
-    command_result = invoke_commands.call_command(gaudi_metrics_query)
-    if command_result is None:
+    sample = gpu_backend.get_backend("gaudi").sample()
+    if sample is None:
         common_logging.log_error("data_collector_gaudi:get_gaudi_metrics_output",
-                                 "hl-smi command did not give output for gaudi metrics.")
-        return None
-    return common_parser.get_df_format(command_result)
+                                 "gaudi backend did not give output for gaudi metrics.")
+    return sample
 
 def get_gaudi_temp(gaudi_metrics_cmd_output):
     '''
-    This method collects gaudi temp from gaudi query output
-    :param gaudi_metrics_cmd_output: gaudi query output
+    This method collects gaudi temp from gaudi sample
+    :param gaudi_metrics_cmd_output: gaudi sample
     '''
-    return get_col_data(gaudi_metrics_cmd_output, 'temperature.aip [C]')
+    if gaudi_metrics_cmd_output is None:
+        return None
+    return gaudi_metrics_cmd_output["temperature"].get("aip")
 
 def get_gaudi_utilization(gaudi_metrics_cmd_output):
     '''
-    This method collects gaudi utilization from gaudi query output
-    :param gaudi_metrics_cmd_output: gaudi query output
+    This method collects gaudi utilization from gaudi sample
+    :param gaudi_metrics_cmd_output: gaudi sample
     '''
-    return get_col_data(gaudi_metrics_cmd_output, 'utilization.aip [%]')
+    if gaudi_metrics_cmd_output is None:
+        return None
+    return gaudi_metrics_cmd_output["utilization"]
 
 def get_gaudi_avg_utilization(gaudi_metrics_cmd_output):
     '''
     This method calculates average gaudi utilization on the node
-    :param gaudi_metrics_cmd_output: gaudi query output
+    :param gaudi_metrics_cmd_output: gaudi sample
     '''
-    gaudi_util_list = get_col_data(gaudi_metrics_cmd_output, 'utilization.aip [%]')
-    if gaudi_util_list is not None and len(gaudi_util_list) != 0:
-        return sum(gaudi_util_list)/len(gaudi_util_list)
+    gaudi_util_list = get_gaudi_utilization(gaudi_metrics_cmd_output)
+    if gaudi_util_list is not None:
+        gaudi_util_list = [item for item in gaudi_util_list if item is not None]
+        if len(gaudi_util_list) != 0:
+            return sum(gaudi_util_list)/len(gaudi_util_list)
     return None
 
 
 # ------------------------------- Gaudi health metric collection-------------------------------
 def get_gpu_health_driver(gaudi_metrics_cmd_output):
     '''
-    This method collects gaudi driver health from gaudi query output
+    This method collects gaudi driver health from gaudi sample
     '''
-    return get_col_data(gaudi_metrics_cmd_output, 'driver_version')
+    if gaudi_metrics_cmd_output is None:
+        return None
+    return gaudi_metrics_cmd_output["driver_version"]
 
 def get_gpu_health_pcie(gaudi_metrics_cmd_output):
     '''
-    This method collects gaudi pcie from gaudi query output
+    This method collects gaudi pcie from gaudi sample
     '''
-    return get_col_data(gaudi_metrics_cmd_output, 'bus_id')
+    if gaudi_metrics_cmd_output is None:
+        return None
+    return gaudi_metrics_cmd_output["bus_id"]
+
+def get_gaudi_power_limit(pci):
+    '''
+    This method collects the power limit of the gaudi at a pci bus id
+    '''
+    pci = shlex.quote(pci).strip("'\"")
+    cmd = ["hl-smi", "-q", "-d", "POWER", "-i", pci]
+    '''
+    grep "Power Limit" cannot work in the systemd process
+    so just find the first "Power Limit" and use the substring
+    Expected output should be like:
+    ================ HL-SMI LOG ================
+    ...
+    "                Power Limit             : 550 W\n"
+    ...
+    find the line and capture the value 550
+    '''
+    power_limit_output = invoke_commands.run_command(cmd)
+    if power_limit_output is None:
+        return None
+    prefix = "Power Limit"
+    num_idx = power_limit_output.find(prefix)
+    if num_idx == -1:
+        return None
+    power_limit_output = power_limit_output[num_idx:]
+    prefix = ": "
+    num_idx = power_limit_output.find(prefix)
+    if num_idx == -1:
+        return None
+    num_idx += len(prefix)
+    sub_str = power_limit_output[num_idx:]
+    unit_idx = sub_str.find(" W")
+    if unit_idx == -1:
+        return None
+    return common_parser.to_number(sub_str[:unit_idx])
 
 def get_gpu_health_power(gaudi_metrics_cmd_output):
     '''
-    This method collects gaudi power from gaudi query output
+    This method collects gaudi power limit and draw from gaudi sample
     '''
-    gaudi_power_draw_list = get_col_data(gaudi_metrics_cmd_output, 'power.draw [W]')
-    gaudi_pci_list = get_col_data(gaudi_metrics_cmd_output, 'bus_id')
-    if gaudi_power_draw_list is None:
+    if gaudi_metrics_cmd_output is None:
+        return None,None
+    gaudi_power_draw_list = gaudi_metrics_cmd_output["power_draw"]
+    gaudi_pci_list = [pci for pci in gaudi_metrics_cmd_output["bus_id"] if pci is not None]
+    if len(gaudi_pci_list) == 0:
         return None,None
-    if gaudi_pci_list is None:
+    # hl-smi reports the power limit of one gaudi per call, query them concurrently
+    gaudi_power_limit_list = probe_scheduler.map_concurrently(get_gaudi_power_limit, gaudi_pci_list)
+    if None in gaudi_power_limit_list:
         return None,None
-    gaudi_power_limit_list = []
-    for pci in gaudi_pci_list:
-        pci = shlex.quote(pci).strip("'\"")
-        cmd = ["hl-smi", "-q", "-d", "POWER", "-i", pci]
-        '''
-        grep "Power Limit" cannot work in the systemd process
-        so just find the first "Power Limit" and use the substring
-        Expected output should be like:
-        ================ HL-SMI LOG ================
-        ...
-        "                Power Limit             : 550 W\n"
-        ...
-        find the line and capture the value 550
-        '''
-        power_limit_output = invoke_commands.run_command(cmd)
-        if power_limit_output is None:
-            return None,None
-        prefix = "Power Limit"
-        num_idx = power_limit_output.find(prefix)
-        if num_idx == -1:
-            return None,None
-        power_limit_output = power_limit_output[num_idx:]
-        prefix = ": "
-        num_idx = power_limit_output.find(prefix)
-        if num_idx == -1:
-            return None,None
-        num_idx += len(prefix)
-        sub_str = power_limit_output[num_idx:]
-        unit_idx = sub_str.find(" W")
-        if unit_idx == -1:
-            return None,None
-        power_limit = sub_str[:unit_idx]
-        try:
-            float(power_limit)
-        except ValueError:
-            return None,None
-        gaudi_power_limit_list.append(power_limit)
-    if len(gaudi_power_limit_list) > 0:
-        return (gaudi_power_limit_list, gaudi_power_draw_list)
-    return None,None
+    return (gaudi_power_limit_list, gaudi_power_draw_list)
 
 def get_gpu_health_thermal(gaudi_metrics_cmd_output):
     '''
-    This method collects gaudi thermal from gaudi query output
+    This method collects gaudi thermal from gaudi sample
     '''
-    return get_col_data(gaudi_metrics_cmd_output, 'temperature.aip [C]')
+    return get_gaudi_temp(gaudi_metrics_cmd_output)
@@ -16,183 +16,104 @@
 Module to gather nvidia gpu metrics
 '''
 
-import common_parser
-import invoke_commands
+import gpu_backend
 import common_logging
 
 # --------------------------------NVIDIA GPU metric collection---------------------------------
-def get_nvidia_metrics_output():
-    '''
-    This method collects command output for nvidia-smi command for gpu metrics
-    :return: nvidia query output
-    '''
-    nvidia_metrics_query = "nvidia-smi --query-gpu=gpu_name,driver_version,pci.bus_id,power.management,power.limit,power.draw,temperature.gpu,utilization.gpu --format=csv,nounits"
-    command_result = invoke_commands.call_command(nvidia_metrics_query)
-    if command_result is not None:
-        command_result_df = common_parser.get_df_format(command_result)
-        return command_result_df
-    common_logging.log_error("data_collector_nvidia_gpu:get_nvidia_metrics_output",
-                             "nvidia-smi command did not give output for gpu metrics.")
-    return None
+def get_nvidia_metrics_output(with_links=False):
+    '''
+    This method samples all nvidia gpu fields through the nvidia gpu backend
+    :param with_links: also collect the nvlink status
+    :return: nvidia gpu sample
+    '''
+    sample = gpu_backend.get_backend("nvidia").sample(with_links)
+    if sample is None:
+        common_logging.log_error("data_collector_nvidia_gpu:get_nvidia_metrics_output",
+                                 "nvidia gpu backend did not give output for gpu metrics.")
+    return sample
 
 
 def get_nvidia_gpu_temp(nvidia_metrics_cmd_result):
     '''
-    This method collects nvidia gpu temp from nvidia query output
-    and stores it in gpu metric dictionary
-    :param nvidia_metrics_cmd_result: nvidia query output
-    :param gpu_metric_output_dict: dictionary with nvidia gpu temperature data added
+    This method collects nvidia gpu temp from nvidia gpu sample
+    :param nvidia_metrics_cmd_result: nvidia gpu sample
     '''
     if nvidia_metrics_cmd_result is not None:
-        try:
-            gpu_temp_list = common_parser.get_col_from_df(nvidia_metrics_cmd_result, 'temperature.gpu')
-            return gpu_temp_list
-        except Exception as err:
-            common_logging.log_error("data_collector_nvidia_gpu:get_nvidia_gpu_temp",
-                                     "could not parse gpu temperature from nvidia-smi"+str(err))
-            return None
+        return nvidia_metrics_cmd_result["temperature"].get("gpu")
     return None
 
 
 def get_nvidia_gpu_utilization(nvidia_metrics_cmd_result):
     '''
-    This method collects nvidia gpu utilization from nvidia query output
-    and stores it in gpu metric dictionary
-    :param nvidia_metrics_cmd_result: nvidia query output
-    :param gpu_metric_output_dict: dictionary with nvidia gpu utilization data added
+    This method collects nvidia gpu utilization from nvidia gpu sample
+    :param nvidia_metrics_cmd_result: nvidia gpu sample
     '''
     if nvidia_metrics_cmd_result is not None:
-        try:
-            gpu_util_list = common_parser.get_col_from_df(nvidia_metrics_cmd_result, 'utilization.gpu [%]')
-            return gpu_util_list
-        except Exception as err:
-            common_logging.log_error("data_collector_nvidia_gpu:get_nvidia_gpu_utilization",
-                                     "could not parse gpu utilization from nvidia-smi"+str(err))
-            return None
+        return nvidia_metrics_cmd_result["utilization"]
     return None
 
 
 def get_nvidia_gpu_avg_utilization(nvidia_metrics_cmd_result):
     '''
     This method calculates average gpu utilization on the node
-    and stores it in gpu metric dictionary
-    :param nvidia_metrics_cmd_result: nvidia query output
-    :param gpu_metric_output_dict: dictionary with nvidia gpu average utilization data added
+    :param nvidia_metrics_cmd_result: nvidia gpu sample
     '''
     if nvidia_metrics_cmd_result is not None:
-        try:
-            gpu_util_list = common_parser.get_col_from_df(nvidia_metrics_cmd_result, 'utilization.gpu [%]')
-            gpu_average_utilization = sum(gpu_util_list)/len(gpu_util_list)
-            return gpu_average_utilization
-        except Exception as err:
-            common_logging.log_error("data_collector_nvidia_gpu:get_nvidia_gpu_avg_utilization",
-                                     "could not parse gpu utilization from nvidia-smi"+str(err))
-            return None
+        gpu_util_list = [item for item in nvidia_metrics_cmd_result["utilization"] if item is not None]
+        if len(gpu_util_list) != 0:
+            return sum(gpu_util_list)/len(gpu_util_list)
+        common_logging.log_error("data_collector_nvidia_gpu:get_nvidia_gpu_avg_utilization",
+                                 "no gpu reported its utilization")
     return None
 
 def get_gpu_health_driver(nvidia_health_metrics_cmd_result):
     '''
-    This method collects nvidia gpu driver from nvidia query output
-    and stores it in gpu metric dictionary
+    This method collects nvidia gpu driver from nvidia gpu sample
     '''
     if nvidia_health_metrics_cmd_result is not None:
-        try:
-            gpu_driver_list = common_parser.get_col_from_df(nvidia_health_metrics_cmd_result, \
-                                                            'driver_version')
-            return gpu_driver_list
-        except Exception as err:
-            common_logging.log_error('data_collector_nvidia_gpu:get_gpu_health_driver',
-                                     "Error occurred while getting GPU Driver health:" \
-                                        + str(err))
-            return None
+        return nvidia_health_metrics_cmd_result["driver_version"]
     return None
 
 def get_gpu_health_nvlink(nvidia_health_metrics_cmd_result):
     '''
-    This method collects nvidia gpu nvlink from nvidia output
-    and stores it in gpu metric dictionary
+    This method collects nvidia gpu nvlink status from nvidia gpu sample,
+    True for a gpu whose nvlinks are all active, None for a gpu without nvlinks.
+    None when the nvlink status could not be queried.
     '''
-    if nvidia_health_metrics_cmd_result is not None:
-        try:
-            gpu_list = common_parser.get_col_from_df(nvidia_health_metrics_cmd_result, 'name')
-            gpu_nvlink_status = {}
-            for index, item in enumerate(gpu_list):
-                gpu_nvlink_status[index] = invoke_commands.call_command(f"nvidia-smi nvlink --status -i {index}")
-            return gpu_nvlink_status
-        except Exception as err:
-            common_logging.log_error('data_collector_nvidia_gpu:get_gpu_health_nvlink',
-                                     "Error occurred while getting GPU NVLink Status:" \
-                                        + {str(err)})
-            return None
+    if nvidia_health_metrics_cmd_result is not None and \
+            nvidia_health_metrics_cmd_result["nvlink_active"] is not None:
+        return dict(enumerate(nvidia_health_metrics_cmd_result["nvlink_active"]))
     return None
 
 def get_gpu_health_pcie(nvidia_health_metrics_cmd_result):
     '''
-    This method collects nvidia gpu pcie from nvidia query output
-    and stores it in gpu metric dictionary
+    This method collects nvidia gpu pcie from nvidia gpu sample
     '''
     if nvidia_health_metrics_cmd_result is not None:
-        try:
-            gpu_pcie_list = common_parser.get_col_from_df(nvidia_health_metrics_cmd_result, \
-                                                          'pci.bus_id')
-            return gpu_pcie_list
-        except Exception as err:
-            common_logging.log_error('data_collector_nvidia_gpu:get_gpu_health_pcie',
-                                     "Error occurred while getting GPU PCIE health:" \
-                                        + str(err))
-            return None
+        return nvidia_health_metrics_cmd_result["bus_id"]
     return None
 
 def get_gpu_health_pmu(nvidia_health_metrics_cmd_result):
     '''
-    This method collects nvidia gpu pmu from nvidia query output
-    and stores it in gpu metric dictionary
+    This method collects nvidia gpu pmu from nvidia gpu sample
     '''
     if nvidia_health_metrics_cmd_result is not None:
-        try:
-            gpu_pmu_list = common_parser.get_col_from_df(nvidia_health_metrics_cmd_result, \
-                                                         'power.management')
-            return gpu_pmu_list
-        except Exception as err:
-            common_logging.log_error('data_collector_nvidia_gpu:get_gpu_health_pmu',
-                                     "Error occurred while getting GPU " \
-                                        "Power Management health:" \
-                                        + str(err))
-            return None
+        return nvidia_health_metrics_cmd_result["power_management"]
     return None
 
 def get_gpu_health_power(nvidia_health_metrics_cmd_result):
     '''
-    This method collects nvidia gpu power from nvidia query output
-    and stores it in gpu metric dictionary
+    This method collects nvidia gpu power limit and draw from nvidia gpu sample
     '''
     if nvidia_health_metrics_cmd_result is not None:
-        try:
-            gpu_power_limit_list = common_parser.get_col_from_df\
-                (nvidia_health_metrics_cmd_result, 'power.limit [W]')
-            gpu_power_draw_list = common_parser.get_col_from_df\
-                (nvidia_health_metrics_cmd_result, 'power.draw [W]')
-            return(gpu_power_limit_list,gpu_power_draw_list)
-        except Exception as err:
-            common_logging.log_error('data_collector_nvidia_gpu:get_gpu_health_power',
-                                     "Error occurred while getting GPU Power health:" \
-                                        + str(err))
-            return None,None
+        return (nvidia_health_metrics_cmd_result["power_limit"],
+                nvidia_health_metrics_cmd_result["power_draw"])
     return None,None
 
 def get_gpu_health_thermal(nvidia_health_metrics_cmd_result):
     '''
-    This method collects nvidia gpu thermal from nvidia query output
-    and stores it in gpu metric dictionary
+    This method collects nvidia gpu thermal from nvidia gpu sample
     '''
     if nvidia_health_metrics_cmd_result is not None:
-        try:
-            gpu_thermal_list = common_parser.get_col_from_df(nvidia_health_metrics_cmd_result, \
-                                                             'temperature.gpu')
-            return gpu_thermal_list
-        except Exception as err:
-            common_logging.log_error('data_collector_nvidia_gpu:get_gpu_health_thermal',
-                                     "Error occurred while getting GPU Thermal health: " \
-                                        + str(err))
-            return None
+        return nvidia_health_metrics_cmd_result["temperature"].get("gpu")
     return None
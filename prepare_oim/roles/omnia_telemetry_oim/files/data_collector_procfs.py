@@ -0,0 +1,104 @@
+# Copyright 2025 Dell Inc. or its subsidiaries. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+'''
+Module to read metrics directly from procfs and sysfs.
+Files are opened once and re-read from the start on every collection,
+so no process is started for these metrics.
+'''
+
+import threading
+import common_logging
+
+PROC_STAT_PATH = "/proc/stat"
+PROC_MEMINFO_PATH = "/proc/meminfo"
+SYS_CLASS_NET_PATH = "/sys/class/net"
+
+open_files = {}
+open_files_lock = threading.Lock()
+
+def read_file(path, log_errors=True, keep_open=True):
+    '''
+    Read the content of a procfs or sysfs file, keeping the file open for the next read.
+
+    Args:
+        path (str): Path of the file.
+        log_errors (bool): Log files which can not be read.
+        keep_open (bool): Keep the file open, False for files of devices which may go away.
+
+    Returns:
+        str or None: The content of the file or None if it could not be read.
+    '''
+    with open_files_lock:
+        try:
+            if not keep_open:
+                with open(path, 'r', encoding='utf-8') as file:
+                    return file.read()
+            file = open_files.get(path)
+            if file is None:
+                file = open(path, 'r', encoding='utf-8')
+                open_files[path] = file
+            file.seek(0)
+            return file.read()
+        except OSError as exc:
+            # The file may belong to a device which is gone, open it again next time
+            file = open_files.pop(path, None)
+            if file is not None:
+                file.close()
+            if log_errors:
+                common_logging.log_error('data_collector_procfs:read_file', f"Unable to read {path}: {exc}")
+            return None
+
+def get_key_value(content, key):
+    '''
+    Return the first value after key in a "key value" or "key: value" formatted file content.
+
+    Args:
+        content (str): The file content.
+        key (str): The key to search for.
+    '''
+    if content is None:
+        return None
+    for line in content.splitlines():
+        tokens = line.split()
+        if tokens and tokens[0].rstrip(':') == key and len(tokens) > 1:
+            return tokens[1]
+    return None
+
+def get_blocked_processes():
+    '''
+    Return the number of processes blocked waiting for I/O from /proc/stat.
+    '''
+    return get_key_value(read_file(PROC_STAT_PATH), "procs_blocked")
+
+def get_meminfo_value(key):
+    '''
+    Return a value of /proc/meminfo, in kB for the memory sizes.
+
+    Args:
+        key (str): The /proc/meminfo field, e.g. HardwareCorrupted.
+    '''
+    return get_key_value(read_file(PROC_MEMINFO_PATH), key)
+
+def is_link_detected(interface):
+    '''
+    Check the carrier of a network interface, as ethtool reports it in "Link detected".
+
+    Args:
+        interface (str): The network interface name.
+    '''
+    # carrier can not be read while the interface is down. Pod interfaces come and go,
+    # the file is not kept open so interfaces which are gone hold no descriptor
+    carrier = read_file(f"{SYS_CLASS_NET_PATH}/{interface}/carrier", log_errors=False, keep_open=False)
+    return carrier is not None and carrier.strip() == "1"
@@ -19,6 +19,7 @@
 '''
 import psutil
 import common_logging
+import utility
 
 def get_cpu_time_info():
     '''
@@ -55,3 +56,14 @@ def get_memory_info():
         # Log the error with exception details using common_logging.log_error
         common_logging.log_error('data_collector_psutil:get_memory_info', f"Error occurred while getting memory information: {exc}")
         return None
+
+def get_unique_loggedin_users():
+    '''
+    Get the number of unique users logged in from utmp using psutil.
+    '''
+    try:
+        return len({user.name for user in psutil.users()})
+    except psutil.Error as exc:
+        # Log the error with exception details using common_logging.log_error
+        common_logging.log_error('data_collector_psutil:get_unique_loggedin_users', f"Error occurred while getting logged in users: {exc}")
+        return utility.Result.NO_DATA.value
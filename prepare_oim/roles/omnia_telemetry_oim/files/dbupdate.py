@@ -20,20 +20,99 @@
     the database.
 '''
 
+import os
+import math
+import time
+import random
+import datetime
+from io import StringIO
 import psycopg2
+from psycopg2.extras import execute_values
 import common_parser
 import common_logging
 import common_security
-import time
-import datetime
+from spool_ring import SpoolRing
 
 filepath = "/opt/omnia/telemetry/.timescaledb/config.yml"
 keypath = "/opt/omnia/telemetry/.timescaledb/.config_pass.key"
 
+# Seconds an idle connection is trusted before it is checked with a round trip
+health_check_interval = 60
+# Reconnect backoff in seconds, doubled after every failed attempt
+reconnect_backoff_min = 5
+reconnect_backoff_max = 300
+connect_timeout = 10
+# Rows are buffered and written in one transaction when either bound is reached
+default_batch_max_rows = 5000
+default_batch_max_age = 60
+# Batches which could not be written are kept on disk, oldest batches are dropped first
+spool_directory = "/opt/omnia/telemetry/spool"
+default_spool_max_bytes = 100 * 1024 * 1024
+
+# Dictionary tables, the samples reference their ids instead of repeating the text
+host_query = """INSERT INTO omnia_telemetry.hosts (system, hostname) VALUES %s
+                ON CONFLICT (system, hostname) DO UPDATE SET system = EXCLUDED.system
+                RETURNING host_id, system, hostname"""
+metric_name_query = """INSERT INTO omnia_telemetry.metric_names (id, context, unit) VALUES %s
+                       ON CONFLICT (id, context, unit) DO UPDATE SET unit = EXCLUDED.unit
+                       RETURNING metric_id, id, context, unit"""
+status_query = """INSERT INTO omnia_telemetry.metric_statuses (status) VALUES %s
+                  ON CONFLICT (status) DO UPDATE SET status = EXCLUDED.status
+                  RETURNING status_id, status"""
+copy_query = """COPY omnia_telemetry.metric_samples (time, host_id, metric_id, value, status_id)
+                FROM STDIN"""
+
+def split_value(value):
+    '''
+    Split a metric value into a number and a status, e.g. (45, None) or (None, "Pass").
+    '''
+    number = common_parser.to_number(value)
+    if number is None or isinstance(number, bool) or not math.isfinite(number):
+        return None, str(value)
+    return number, None
+
 class DatabaseClient:
 
-    def __init__(self):
+    def __init__(self, batch_max_rows=default_batch_max_rows, batch_max_age=default_batch_max_age,
+                 spool_max_bytes=default_spool_max_bytes):
         self.db_conn = None
+        self.dbdata = None
+        self.config_mtime = None
+        self.last_used = 0
+        self.backoff = 0
+        self.next_connect_time = 0
+        self.batch_max_rows = batch_max_rows
+        self.batch_max_age = batch_max_age
+        self.batch = []
+        self.batch_start_time = 0
+        self.spool = SpoolRing(spool_directory, spool_max_bytes)
+        self.host_ids = {}
+        self.metric_ids = {}
+        self.status_ids = {}
+
+    def get_dbdata(self):
+        '''
+        This module returns the decrypted db connect info, decrypting the config
+        file again only when it has changed
+        '''
+
+        try:
+            config_mtime = os.path.getmtime(filepath)
+        except OSError as ex:
+            common_logging.log_error("dbupdate:get_dbdata",
+                                    "Unable to read timescaledb config file" + str(ex))
+            return self.dbdata
+        if self.dbdata is None or config_mtime != self.config_mtime:
+            try:
+                self.dbdata = common_parser.parse_yaml_file(common_security.get_config_data(filepath,keypath))
+            except Exception as ex:
+                common_logging.log_error("dbupdate:get_dbdata",
+                                        "Unable to decrypt timescaledb config file" + str(ex))
+                return self.dbdata
+            self.config_mtime = config_mtime
+            # Connect with the new credentials
+            self.db_close()
+        return self.dbdata
 
     def db_connect(self, dbdata):
         '''
@@ -50,20 +129,80 @@ class DatabaseClient:
         connection_string = f"postgres://{dbuser}:{dbpwd}@{dbhost}:{dbport}/{dbtelemetry}?gssencmode={dbgssencmode}".format(
             dbuser = dbuser, dbpwd = dbpwd, dbhost = dbhost, dbport = dbport, dbtelemetry = dbtelemetry, dbgssencmode = dbgssencmode)
         try:
-            self.db_conn = psycopg2.connect(connection_string)
+            # TCP keepalives let a connection kept across intervals notice a lost OIM
+            self.db_conn = psycopg2.connect(connection_string, connect_timeout=connect_timeout,
+                                            keepalives=1, keepalives_idle=60)
             if self.db_conn is not None:
-                self.db_conn.autocommit = True
+                # A batch is committed as a whole by db_insert
+                self.db_conn.autocommit = False
         except Exception as ex:
             # Log the error message with the error output
             common_logging.log_error("dbupdate:db_connect",
                                     "Error in connecting to timescaledb" + str(ex))
+            self.db_conn = None
 
     def db_close(self):
         '''
         This module closes the database connection object
         '''
 
-        self.db_conn.close()
+        if self.db_conn is not None:
+            try:
+                self.db_conn.close()
+            except Exception as ex:
+                common_logging.log_error("dbupdate:db_close",
+                                        "Error in closing Database connection" + str(ex))
+            self.db_conn = None
+        # The database may have been recreated while disconnected
+        self.host_ids.clear()
+        self.metric_ids.clear()
+        self.status_ids.clear()
+
+    def is_connection_alive(self):
+        '''
+        This module checks the open connection, with a round trip to the database
+        when it has been idle for longer than health_check_interval
+        '''
+
+        if self.db_conn is None or self.db_conn.closed:
+            return False
+        if time.monotonic() - self.last_used < health_check_interval:
+            return True
+        try:
+            db_cursor = self.db_conn.cursor()
+            db_cursor.execute("SELECT 1")
+            db_cursor.close()
+            self.db_conn.rollback()
+            self.last_used = time.monotonic()
+            return True
+        except Exception as ex:
+            common_logging.log_error("dbupdate:is_connection_alive",
+                                    "Database connection is not usable" + str(ex))
+            return False
+
+    def ensure_connection(self):
+        '''
+        This module returns True when a usable connection is open, reconnecting
+        with exponential backoff when the connection was lost
+        '''
+
+        dbdata = self.get_dbdata()
+        if self.is_connection_alive():
+            return True
+        self.db_close()
+        if dbdata is None or time.monotonic() < self.next_connect_time:
+            return False
+
+        self.db_connect(dbdata)
+        if self.db_conn is None:
+            self.backoff = min(max(self.backoff * 2, reconnect_backoff_min), reconnect_backoff_max)
+            # Jitter keeps the nodes of a cluster from reconnecting at the same moment
+            self.next_connect_time = time.monotonic() + random.uniform(self.backoff / 2, self.backoff)
+            return False
+        self.backoff = 0
+        self.next_connect_time = 0
+        self.last_used = time.monotonic()
+        return True
 
     def create_db_query(self, combined_result_dict,combined_unit_dict, service_tag, hostname):
         '''
@@ -82,51 +221,133 @@ class DatabaseClient:
                                 unit=""
                             else:
                                 unit = common_parser.get_unit(key,combined_unit_dict)
-                            label = key+" "+metric
-                            db_data_tuple = (key,metric,label,value,unit,service_tag,hostname,timestamp)
+                            db_data_tuple = (key,metric,value,unit or "",service_tag,hostname or "",timestamp)
                             db_query_list.append(db_data_tuple)
             return db_query_list
         else:
             common_logging.log_error("dbupdate:create_db_query","Service Tag is empty.")
 
+    def resolve_ids(self, db_cursor, ids, sql_query, keys):
+        '''
+        This module adds the ids of the dictionary keys missing in ids,
+        inserting keys the database does not know yet
+        '''
+
+        missing_keys = sorted({key for key in keys if key not in ids})
+        if missing_keys:
+            for row in execute_values(db_cursor, sql_query, missing_keys, fetch=True):
+                ids[tuple(row[1:])] = row[0]
+
     def db_insert(self, db_query):
         '''
-        This module inserts data into database
+        This module inserts data into database with COPY in one transaction.
+        Numeric values are stored as numbers, other values as a status.
+        Returns False when the connection failed and the batch has to be retried.
+        A batch the database rejects is quarantined and True is returned, so it
+        does not block the batches behind it.
         '''
 
         try:
             db_cursor = self.db_conn.cursor()
-            sql_insert_query = """INSERT INTO omnia_telemetry.metrics \
-                            (id, context, label, value, unit, system, hostname, time )\
-                            VALUES (%s,%s,%s,%s,%s,%s,%s,%s)"""
-            db_cursor.executemany(sql_insert_query, db_query)
+            values = [split_value(row[2]) for row in db_query]
+            self.resolve_ids(db_cursor, self.host_ids, host_query,
+                             [(row[4], row[5]) for row in db_query])
+            self.resolve_ids(db_cursor, self.metric_ids, metric_name_query,
+                             [(row[0], row[1], row[3]) for row in db_query])
+            self.resolve_ids(db_cursor, self.status_ids, status_query,
+                             [(status,) for _, status in values if status is not None])
+
+            copy_data = StringIO()
+            for row, (number, status) in zip(db_query, values):
+                copy_data.write("\t".join((
+                    row[6],
+                    str(self.host_ids[(row[4], row[5])]),
+                    str(self.metric_ids[(row[0], row[1], row[3])]),
+                    repr(number) if number is not None else "\\N",
+                    str(self.status_ids[(status,)]) if status is not None else "\\N")) + "\n")
+            copy_data.seek(0)
+            db_cursor.copy_expert(copy_query, copy_data)
             self.db_conn.commit()
             db_cursor.close()
-        except Exception as ex:
+            self.last_used = time.monotonic()
+            return True
+        except (psycopg2.OperationalError, psycopg2.InterfaceError) as ex:
             # Log the error message with the error output
             common_logging.log_error("dbupdate:db_insert",
                                     "Error in inserting data to Database" + str(ex))
             self.db_close()
+            return False
+        except Exception as ex:
+            try:
+                self.db_conn.rollback()
+            except Exception as rollback_ex:
+                common_logging.log_error("dbupdate:db_insert",
+                                        "Error in inserting data to Database" + str(rollback_ex))
+                self.db_close()
+                return False
+            # Ids resolved in the rolled back transaction may not exist
+            self.host_ids.clear()
+            self.metric_ids.clear()
+            self.status_ids.clear()
+            common_logging.log_error("dbupdate:db_insert",
+                                    f"Database rejected a batch of {len(db_query)} rows, "
+                                    f"quarantining it: {ex}")
+            self.spool.quarantine(db_query)
+            return True
+
+    def flush_spool(self):
+        '''
+        This module inserts the spooled batches in the order they were written,
+        returns True when the spool is empty. Rejected batches are quarantined by
+        db_insert and draining continues with the next batch.
+        '''
+
+        flushed_batches = 0
+        while True:
+            spooled_batch = self.spool.peek()
+            if spooled_batch is None:
+                break
+            key, spooled_rows = spooled_batch
+            if not self.db_insert(spooled_rows):
+                return False
+            self.spool.remove(key)
+            flushed_batches += 1
+        if flushed_batches:
+            common_logging.log_message("dbupdate:flush_spool",
+                                      f"Inserted {flushed_batches} spooled batches")
+        return True
+
+    def flush(self):
+        '''
+        This module writes the buffered rows to the database, older spooled batches first.
+        The rows are spooled on disk when the database is unreachable.
+        '''
+
+        if not self.batch:
+            return
+        batch, self.batch = self.batch, []
+        if self.ensure_connection() and self.flush_spool() and self.db_insert(batch):
+            return
+        self.spool.append(batch)
 
     def update_db(self, combined_result_dict,combined_unit_dict, service_tag, hostname):
         '''
         This module updates the Timescaledb on the Omnia Infrastructure Manager with telemetry data
+        over a connection kept open between collection intervals. Rows of several intervals are
+        buffered and written together once batch_max_rows rows or batch_max_age seconds are reached.
+        Batches are spooled on disk while the database is unreachable and inserted once it is back.
 
         Args:
         Combined metric dictionary {dict}
         '''
 
-        #Fetch the db connect info from config file
-        dbdata = common_parser.parse_yaml_file(common_security.get_config_data(filepath,keypath))
+        #Create sql query
+        db_query = self.create_db_query(combined_result_dict,combined_unit_dict,service_tag,hostname)
+        if db_query:
+            if not self.batch:
+                self.batch_start_time = time.monotonic()
+            self.batch.extend(db_query)
 
-        #Connect to the database
-        self.db_connect(dbdata)
-
-        if self.db_conn is not None:
-            #Create sql query
-            db_query = self.create_db_query(combined_result_dict,combined_unit_dict,service_tag,hostname)
-
-            #Insert into database
-            self.db_insert(db_query)
-
-            self.db_close()
+        if self.batch and (len(self.batch) >= self.batch_max_rows or
+                           time.monotonic() - self.batch_start_time >= self.batch_max_age):
+            self.flush()
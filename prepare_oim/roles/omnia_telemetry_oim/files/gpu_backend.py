@@ -0,0 +1,439 @@
+# Copyright 2025 Dell Inc. or its subsidiaries. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+'''
+Module to sample gpu metrics through one backend per vendor.
+The vendor python bindings (pynvml, amdsmi) are used when they can be loaded,
+the smi command line tools otherwise. A backend collects all fields of all gpus
+in one call and returns them as plain lists indexed by gpu.
+
+The collector binary is built with pyinstaller on the Omnia Infrastructure Manager,
+where only pynvml (nvidia-ml-py) is installed. amdsmi needs the ROCm libraries and
+is not bundled, so the binary always samples amd gpus with rocm-smi; AmdSmiBackend
+is only used when the collector runs from source on a node with the ROCm bindings.
+'''
+
+import os
+import re
+import time
+import threading
+import common_logging
+import common_parser
+import data_collector_procfs
+import invoke_commands
+
+try:
+    import pynvml
+except ImportError:
+    pynvml = None
+
+try:
+    import amdsmi
+except ImportError:
+    amdsmi = None
+
+# Seconds a sample is reused, so the gpu and health probes of a cycle share it
+sample_max_age = 1
+
+rocm_bin_path = "/opt/rocm/bin/"
+amdgpu_version_path = "/sys/module/amdgpu/version"
+
+nvidia_smi_query = "nvidia-smi --query-gpu=gpu_name,driver_version,pci.bus_id,power.management,power.limit,power.draw,temperature.gpu,utilization.gpu --format=csv,nounits"
+nvidia_smi_nvlink_query = "nvidia-smi nvlink --status"
+rocm_smi_query = rocm_bin_path + "rocm-smi -t -u -P -M --showbus --csv"
+hl_smi_query = "hl-smi --query-aip=Name,driver_version,bus_id,power.draw,temperature.aip,utilization.aip --format=csv,nounits"
+
+# Fields of a sample holding one value per gpu, temperature holds one list per sensor
+sample_fields = ["name", "driver_version", "bus_id", "power_management", "power_limit",
+                 "power_draw", "power_current", "utilization", "nvlink_active"]
+
+rocm_smi_temperature_columns = {
+    "edge": "Temperature (Sensor edge) (C)",
+    "junction": "Temperature (Sensor junction) (C)",
+    "memory": "Temperature (Sensor memory) (C)",
+    "hbm0": "Temperature (Sensor HBM 0) (C)",
+    "hbm1": "Temperature (Sensor HBM 1) (C)",
+    "hbm2": "Temperature (Sensor HBM 2) (C)",
+    "hbm3": "Temperature (Sensor HBM 3) (C)"
+}
+
+# amdsmi AmdSmiTemperatureType names of the rocm-smi temperature sensors
+amdsmi_temperature_types = {
+    "edge": "EDGE",
+    "junction": "HOTSPOT",
+    "memory": "VRAM",
+    "hbm0": "HBM_0",
+    "hbm1": "HBM_1",
+    "hbm2": "HBM_2",
+    "hbm3": "HBM_3"
+}
+
+def new_sample(gpu_count):
+    '''
+    This method returns an empty sample for gpu_count gpus.
+    '''
+    sample = {field: [None] * gpu_count for field in sample_fields}
+    sample["temperature"] = {}
+    return sample
+
+def get_column(columns, column_name, gpu_count, convert=None):
+    '''
+    This method returns a csv column with one value per gpu, None for a missing column.
+    '''
+    values = columns.get(column_name)
+    if values is None:
+        return [None] * gpu_count
+    if convert is not None:
+        values = [convert(value) for value in values]
+    return values[:gpu_count] + [None] * (gpu_count - len(values))
+
+def get_optional(function, *args):
+    '''
+    This method calls a binding function and returns None when the gpu does not support it.
+    '''
+    try:
+        return function(*args)
+    except Exception:
+        return None
+
+def decode(value):
+    '''
+    This method returns binding strings as str, older pynvml versions return bytes.
+    '''
+    return value.decode() if isinstance(value, bytes) else value
+
+def get_amdgpu_driver_version():
+    '''
+    This method reads the amdgpu driver version the way rocm-smi does,
+    the kernel release is the version of an in-tree driver.
+    '''
+    version = data_collector_procfs.read_file(amdgpu_version_path, log_errors=False)
+    if version is not None and version.strip():
+        return version.strip()
+    return os.uname().release
+
+class GPUBackend:
+    '''
+    GPUBackend is the base class of the gpu sampling backends.
+    Subclasses implement collect, sample returns the collected fields
+    while they are younger than sample_max_age seconds.
+    '''
+
+    name = "none"
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.last_sample = None
+        self.last_sample_time = 0
+        self.last_sample_with_links = False
+
+    def collect(self, with_links=False):
+        '''
+        This method collects the fields of all gpus, None if the gpus could not be queried.
+        '''
+        raise NotImplementedError
+
+    def sample(self, with_links=False):
+        '''
+        This method returns the fields of all gpus, with_links also collects the nvlink status.
+        The sample is shared and must not be modified.
+        '''
+        with self.lock:
+            if self.last_sample is None or \
+                    time.monotonic() - self.last_sample_time > sample_max_age or \
+                    (with_links and not self.last_sample_with_links):
+                self.last_sample = self.collect(with_links)
+                self.last_sample_time = time.monotonic()
+                self.last_sample_with_links = with_links
+            return self.last_sample
+
+    def close(self):
+        '''
+        This method releases the resources of the backend.
+        '''
+
+class NvmlBackend(GPUBackend):
+    '''
+    NvmlBackend samples nvidia gpus through the NVML python bindings.
+    '''
+
+    name = "pynvml"
+
+    def __init__(self):
+        super().__init__()
+        if pynvml is None:
+            raise ImportError("pynvml is not installed")
+        pynvml.nvmlInit()
+
+    def get_nvlink_active(self, handle):
+        '''
+        This method checks whether all nvlinks of a gpu are active,
+        None for a gpu without nvlinks.
+        '''
+        active = None
+        for link in range(pynvml.NVML_NVLINK_MAX_LINKS):
+            # Links the gpu does not have are not supported
+            state = get_optional(pynvml.nvmlDeviceGetNvLinkState, handle, link)
+            if state is not None:
+                active = (active is not False) and state == pynvml.NVML_FEATURE_ENABLED
+        return active
+
+    def collect(self, with_links=False):
+        try:
+            driver_version = decode(pynvml.nvmlSystemGetDriverVersion())
+            gpu_count = pynvml.nvmlDeviceGetCount()
+            sample = new_sample(gpu_count)
+            temperature = sample["temperature"]["gpu"] = [None] * gpu_count
+            for index in range(gpu_count):
+                handle = pynvml.nvmlDeviceGetHandleByIndex(index)
+                sample["name"][index] = decode(pynvml.nvmlDeviceGetName(handle))
+                sample["driver_version"][index] = driver_version
+                sample["bus_id"][index] = decode(pynvml.nvmlDeviceGetPciInfo(handle).busId)
+                power_management = get_optional(pynvml.nvmlDeviceGetPowerManagementMode, handle)
+                if power_management is not None:
+                    sample["power_management"][index] = "Enabled" \
+                        if power_management == pynvml.NVML_FEATURE_ENABLED else "Disabled"
+                # NVML reports power in milliwatts
+                power_limit = get_optional(pynvml.nvmlDeviceGetEnforcedPowerLimit, handle)
+                sample["power_limit"][index] = power_limit / 1000 if power_limit is not None else None
+                power_draw = get_optional(pynvml.nvmlDeviceGetPowerUsage, handle)
+                sample["power_draw"][index] = power_draw / 1000 if power_draw is not None else None
+                temperature[index] = get_optional(pynvml.nvmlDeviceGetTemperature, handle,
+                                                  pynvml.NVML_TEMPERATURE_GPU)
+                utilization = get_optional(pynvml.nvmlDeviceGetUtilizationRates, handle)
+                sample["utilization"][index] = utilization.gpu if utilization is not None else None
+                if with_links:
+                    sample["nvlink_active"][index] = self.get_nvlink_active(handle)
+            return sample
+        except pynvml.NVMLError as err:
+            common_logging.log_error("gpu_backend:NvmlBackend.collect",
+                                     "could not query nvidia gpus through NVML. " + str(err))
+            return None
+
+    def close(self):
+        get_optional(pynvml.nvmlShutdown)
+
+class NvidiaSmiBackend(GPUBackend):
+    '''
+    NvidiaSmiBackend samples nvidia gpus by parsing nvidia-smi output.
+    '''
+
+    name = "nvidia-smi"
+
+    def collect(self, with_links=False):
+        command_result = invoke_commands.call_command(nvidia_smi_query)
+        columns = common_parser.get_csv_columns(command_result) if command_result is not None else None
+        if columns is None:
+            common_logging.log_error("gpu_backend:NvidiaSmiBackend.collect",
+                                     "nvidia-smi command did not give output for gpu metrics.")
+            return None
+        gpu_count = len(columns.get("name", []))
+        sample = new_sample(gpu_count)
+        sample["name"] = get_column(columns, "name", gpu_count)
+        sample["driver_version"] = get_column(columns, "driver_version", gpu_count)
+        sample["bus_id"] = get_column(columns, "pci.bus_id", gpu_count)
+        sample["power_management"] = get_column(columns, "power.management", gpu_count)
+        sample["power_limit"] = get_column(columns, "power.limit [W]", gpu_count, common_parser.to_number)
+        sample["power_draw"] = get_column(columns, "power.draw [W]", gpu_count, common_parser.to_number)
+        sample["temperature"]["gpu"] = get_column(columns, "temperature.gpu", gpu_count, common_parser.to_number)
+        sample["utilization"] = get_column(columns, "utilization.gpu [%]", gpu_count, common_parser.to_number)
+        if with_links:
+            sample["nvlink_active"] = self.get_nvlink_active(gpu_count)
+        return sample
+
+    def get_nvlink_active(self, gpu_count):
+        '''
+        This method checks whether all nvlinks of every gpu are active with one nvidia-smi call,
+        None for a gpu without nvlinks, None when nvidia-smi fails.
+        '''
+        command_result = invoke_commands.call_command(nvidia_smi_nvlink_query)
+        if command_result is None:
+            return None
+        nvlink_active = [None] * gpu_count
+        index = None
+        for line in command_result.splitlines():
+            gpu_match = re.match(r'^GPU (\d+):', line.strip())
+            if gpu_match:
+                index = int(gpu_match.group(1))
+            elif index is not None and index < gpu_count and re.match(r'^Link \d+:', line.strip()):
+                nvlink_active[index] = (nvlink_active[index] is not False) and 'inactive' not in line.lower()
+        return nvlink_active
+
+class AmdSmiBackend(GPUBackend):
+    '''
+    AmdSmiBackend samples amd gpus through the amdsmi python bindings.
+    The bindings are not bundled in the collector binary, which uses RocmSmiBackend.
+    '''
+
+    name = "amdsmi"
+
+    def __init__(self):
+        super().__init__()
+        if amdsmi is None:
+            raise ImportError("amdsmi is not installed")
+        amdsmi.amdsmi_init()
+
+    def collect(self, with_links=False):
+        try:
+            handles = amdsmi.amdsmi_get_processor_handles()
+        except amdsmi.AmdSmiException as err:
+            common_logging.log_error("gpu_backend:AmdSmiBackend.collect",
+                                     "could not query amd gpus through amdsmi. " + str(err))
+            return None
+        gpu_count = len(handles)
+        sample = new_sample(gpu_count)
+        driver_version = get_amdgpu_driver_version()
+        for sensor in amdsmi_temperature_types:
+            sample["temperature"][sensor] = [None] * gpu_count
+        for index, handle in enumerate(handles):
+            sample["driver_version"][index] = driver_version
+            sample["bus_id"][index] = get_optional(amdsmi.amdsmi_get_gpu_device_bdf, handle)
+            activity = get_optional(amdsmi.amdsmi_get_gpu_activity, handle) or {}
+            sample["utilization"][index] = common_parser.to_number(activity.get("gfx_activity"))
+            power_info = get_optional(amdsmi.amdsmi_get_power_info, handle) or {}
+            sample["power_draw"][index] = common_parser.to_number(power_info.get("average_socket_power"))
+            sample["power_current"][index] = common_parser.to_number(power_info.get("current_socket_power"))
+            # amdsmi reports the power cap in microwatts
+            power_cap = common_parser.to_number((get_optional(amdsmi.amdsmi_get_power_cap_info, handle) or {})
+                                  .get("power_cap"))
+            sample["power_limit"][index] = power_cap / 1000000 if power_cap is not None else None
+            for sensor, temperature_type in amdsmi_temperature_types.items():
+                sample["temperature"][sensor][index] = common_parser.to_number(get_optional(
+                    amdsmi.amdsmi_get_temp_metric, handle,
+                    getattr(amdsmi.AmdSmiTemperatureType, temperature_type),
+                    amdsmi.AmdSmiTemperatureMetric.CURRENT))
+        return sample
+
+    def close(self):
+        get_optional(amdsmi.amdsmi_shut_down)
+
+class RocmSmiBackend(GPUBackend):
+    '''
+    RocmSmiBackend samples amd gpus by parsing the output of a single rocm-smi call.
+    '''
+
+    name = "rocm-smi"
+
+    def collect(self, with_links=False):
+        command_result = invoke_commands.run_command(rocm_smi_query)
+        columns = common_parser.get_csv_columns(command_result) if command_result is not None else None
+        if columns is None:
+            common_logging.log_error("gpu_backend:RocmSmiBackend.collect",
+                                     "rocm-smi command did not give output for gpu metrics.")
+            return None
+        gpu_count = len(columns.get("device", []))
+        sample = new_sample(gpu_count)
+        sample["driver_version"] = [get_amdgpu_driver_version()] * gpu_count
+        sample["bus_id"] = get_column(columns, "PCI Bus", gpu_count)
+        sample["utilization"] = get_column(columns, "GPU use (%)", gpu_count, common_parser.to_number)
+        sample["power_limit"] = get_column(columns, "Max Graphics Package Power (W)",
+                                           gpu_count, common_parser.to_number)
+        sample["power_draw"] = get_column(columns, "Average Graphics Package Power (W)",
+                                          gpu_count, common_parser.to_number)
+        sample["power_current"] = get_column(columns, "Current Socket Graphics Package Power (W)",
+                                             gpu_count, common_parser.to_number)
+        # Only the sensors the gpus have are reported
+        for sensor, column_name in rocm_smi_temperature_columns.items():
+            if column_name in columns:
+                sample["temperature"][sensor] = get_column(columns, column_name, gpu_count, common_parser.to_number)
+        return sample
+
+class HlSmiBackend(GPUBackend):
+    '''
+    HlSmiBackend samples intel gaudi accelerators by parsing hl-smi output.
+    '''
+
+    name = "hl-smi"
+
+    def collect(self, with_links=False):
+        command_result = invoke_commands.call_command(hl_smi_query)
+        columns = common_parser.get_csv_columns(command_result) if command_result is not None else None
+        if columns is None:
+            common_logging.log_error("gpu_backend:HlSmiBackend.collect",
+                                     "hl-smi command did not give output for gaudi metrics.")
+            return None
+        gpu_count = len(columns.get("bus_id", []))
+        sample = new_sample(gpu_count)
+        sample["name"] = get_column(columns, "name", gpu_count)
+        sample["driver_version"] = get_column(columns, "driver_version", gpu_count)
+        sample["bus_id"] = get_column(columns, "bus_id", gpu_count)
+        sample["power_draw"] = get_column(columns, "power.draw [W]", gpu_count, common_parser.to_number)
+        sample["temperature"]["aip"] = get_column(columns, "temperature.aip [C]", gpu_count, common_parser.to_number)
+        sample["utilization"] = get_column(columns, "utilization.aip [%]", gpu_count, common_parser.to_number)
+        return sample
+
+class FakeGPUBackend(GPUBackend):
+    '''
+    FakeGPUBackend returns given samples, to run the gpu collectors without gpus.
+    Each collection returns the next sample, the last one is repeated.
+    '''
+
+    name = "fake"
+
+    def __init__(self, samples):
+        super().__init__()
+        self.samples = list(samples)
+
+    def collect(self, with_links=False):
+        if len(self.samples) > 1:
+            return self.samples.pop(0)
+        return self.samples[0] if self.samples else None
+
+# Backends of each vendor in order of preference
+backend_classes = {
+    "nvidia": [NvmlBackend, NvidiaSmiBackend],
+    "amd": [AmdSmiBackend, RocmSmiBackend],
+    "gaudi": [HlSmiBackend]
+}
+
+backends = {}
+backends_lock = threading.Lock()
+
+def get_backend(vendor):
+    '''
+    This method returns the backend of a vendor, loading the first one that works.
+    '''
+    with backends_lock:
+        backend = backends.get(vendor)
+        if backend is None:
+            for backend_class in backend_classes[vendor]:
+                try:
+                    backend = backend_class()
+                    break
+                except Exception as err:
+                    common_logging.log_message("gpu_backend:get_backend",
+                                               f"{backend_class.name} can not be used for {vendor} gpus: {err}")
+            common_logging.log_message("gpu_backend:get_backend",
+                                       f"Sampling {vendor} gpus with {backend.name}")
+            backends[vendor] = backend
+        return backend
+
+def set_backend(vendor, backend):
+    '''
+    This method replaces the backend of a vendor, e.g. with a FakeGPUBackend.
+    '''
+    with backends_lock:
+        previous = backends.get(vendor)
+        if previous is not None:
+            previous.close()
+        backends[vendor] = backend
+
+def close_backends():
+    '''
+    This method releases all loaded backends.
+    '''
+    with backends_lock:
+        for backend in backends.values():
+            backend.close()
+        backends.clear()
@@ -15,7 +15,7 @@
 '''
 Module to gather gpu related metrics
 '''
-import math
+from functools import partial
 import data_collector_nvidia_gpu
 import data_collector_amd_gpu
 import data_collector_amd_proc_acc
@@ -36,14 +36,15 @@ class GPUMetricCollector:
         '''
         This method collects all the nvidia gpu metrics
         '''
-        # run nvidia-smi command and store output in a variable
+        # sample all NVIDIA GPU fields at once
         nvidia_metrics_cmd_output = data_collector_nvidia_gpu.get_nvidia_metrics_output()
 
         # get temperature details for NVIDIA GPU
         gpu_temp = data_collector_nvidia_gpu.get_nvidia_gpu_temp(nvidia_metrics_cmd_output)
         if gpu_temp is not None:
             for index, item in enumerate(gpu_temp):
-                self.gpu_metric_output_dict["gpu_temperature:gpu" + str(index)] = str(item)
+                self.gpu_metric_output_dict["gpu_temperature:gpu" + str(index)] = \
+                    str(item) if item is not None else utility.Result.NO_DATA.value
                 self.gpu_unit["gpu_temperature"] = "C"
         else:
             self.gpu_metric_output_dict["gpu_temperature:gpu"] = utility.Result.NO_DATA.value
@@ -52,7 +53,8 @@ class GPUMetricCollector:
         gpu_util = data_collector_nvidia_gpu.get_nvidia_gpu_utilization(nvidia_metrics_cmd_output)
         if gpu_util is not None:
             for index, item in enumerate(gpu_util):
-                self.gpu_metric_output_dict["gpu_utilization:gpu" + str(index)] = str(item)
+                self.gpu_metric_output_dict["gpu_utilization:gpu" + str(index)] = \
+                    str(item) if item is not None else utility.Result.NO_DATA.value
                 self.gpu_unit["gpu_utilization"] = "percent"
         else:
             self.gpu_metric_output_dict["gpu_utilization:gpu"] = utility.Result.NO_DATA.value
@@ -69,12 +71,15 @@ class GPUMetricCollector:
         '''
         This method collects all the AMD gpu metrics
         '''
+        # sample all AMD GPU fields at once
+        amd_metrics_output = data_collector_amd_gpu.get_amd_metrics_output()
+
         # get temperature details for AMD GPU
-        gpu_temp = data_collector_amd_gpu.get_amd_gpu_temp()
+        gpu_temp = data_collector_amd_gpu.get_amd_gpu_temp(amd_metrics_output)
         if gpu_temp is not None:
             for keys, values in gpu_temp.items():
                 for index, value in enumerate(values):
-                    if not math.isnan(float(value)):
+                    if value is not None:
                         self.gpu_metric_output_dict['gpu_temperature:' + keys + ':gpu' + str(index)] = str(value)
                         self.gpu_unit['gpu_temperature:' + keys] = "C"
                     else:
@@ -84,10 +89,11 @@ class GPUMetricCollector:
             self.gpu_metric_output_dict["gpu_temperature:gpu"] = utility.Result.NO_DATA.value
 
         # get utilization details for AMD GPU
-        gpu_util = data_collector_amd_gpu.get_amd_gpu_utilization()
+        gpu_util = data_collector_amd_gpu.get_amd_gpu_utilization(amd_metrics_output)
         if gpu_util is not None:
             for index, item in enumerate(gpu_util):
-                self.gpu_metric_output_dict["gpu_utilization:gpu" + str(index)] = str(item)
+                self.gpu_metric_output_dict["gpu_utilization:gpu" + str(index)] = \
+                    str(item) if item is not None else utility.Result.NO_DATA.value
                 self.gpu_unit["gpu_utilization:gpu"] = "percent"
         else:
             self.gpu_metric_output_dict["gpu_utilization:gpu"] = utility.Result.NO_DATA.value
@@ -104,12 +110,15 @@ class GPUMetricCollector:
         '''
         This method collects all the AMD gpu metrics
         '''
+        # sample all AMD GPU fields at once
+        amd_metrics_output = data_collector_amd_gpu.get_amd_metrics_output()
+
         # get temperature details for AMD GPU
-        gpu_temp = data_collector_amd_proc_acc.get_amd_gpu_temp()
+        gpu_temp = data_collector_amd_proc_acc.get_amd_gpu_temp(amd_metrics_output)
         if gpu_temp is not None:
             for keys, values in gpu_temp.items():
                 for index, value in enumerate(values):
-                    if not math.isnan(float(value)):
+                    if value is not None:
                         self.gpu_metric_output_dict['gpu_temperature:' + keys + ':gpu' + str(index)] = str(value)
                         self.gpu_unit['gpu_temperature:' + keys] = "C"
                     else:
@@ -120,10 +129,11 @@ class GPUMetricCollector:
 
         # This function is same as in data_collector_amd_gpu
         # get utilization details for AMD GPU
-        gpu_util = data_collector_amd_gpu.get_amd_gpu_utilization()
+        gpu_util = data_collector_amd_gpu.get_amd_gpu_utilization(amd_metrics_output)
         if gpu_util is not None:
             for index, item in enumerate(gpu_util):
-                self.gpu_metric_output_dict["gpu_utilization:gpu" + str(index)] = str(item)
+                self.gpu_metric_output_dict["gpu_utilization:gpu" + str(index)] = \
+                    str(item) if item is not None else utility.Result.NO_DATA.value
                 self.gpu_unit["gpu_utilization:gpu"] = "percent"
         else:
             self.gpu_metric_output_dict["gpu_utilization:gpu"] = utility.Result.NO_DATA.value
@@ -141,14 +151,15 @@ class GPUMetricCollector:
         '''
         This method collects all the gaudi metrics
         '''
-        # run hl-smi command and store output in a variable
+        # sample all Gaudi fields at once
         gaudi_metrics_cmd_output = data_collector_gaudi.get_gaudi_metrics_output()
 
         # get temperature details for Gaudi
         gpu_temp = data_collector_gaudi.get_gaudi_temp(gaudi_metrics_cmd_output)
         if gpu_temp is not None:
             for index, item in enumerate(gpu_temp):
-                self.gpu_metric_output_dict["gpu_temperature:gpu" + str(index)] = str(item)
+                self.gpu_metric_output_dict["gpu_temperature:gpu" + str(index)] = \
+                    str(item) if item is not None else utility.Result.NO_DATA.value
                 self.gpu_unit["gpu_temperature"] = "C"
         else:
             self.gpu_metric_output_dict["gpu_temperature:gpu"] = utility.Result.NO_DATA.value
@@ -157,7 +168,8 @@ class GPUMetricCollector:
         gpu_util = data_collector_gaudi.get_gaudi_utilization(gaudi_metrics_cmd_output)
         if gpu_util is not None:
             for index, item in enumerate(gpu_util):
-                self.gpu_metric_output_dict["gpu_utilization:gpu" + str(index)] = str(item)
+                self.gpu_metric_output_dict["gpu_utilization:gpu" + str(index)] = \
+                    str(item) if item is not None else utility.Result.NO_DATA.value
                 self.gpu_unit["gpu_utilization"] = "percent"
         else:
             self.gpu_metric_output_dict["gpu_utilization:gpu"] = utility.Result.NO_DATA.value
@@ -169,25 +181,44 @@ class GPUMetricCollector:
             self.gpu_unit["gpu_utilization"] = "percent"
         else:
             self.gpu_metric_output_dict["gpu_utilization:average"] = utility.Result.NO_DATA.value
-    def metric_collector(self, aggregation_level):
+
+    def set_metric_values(self, metric_names, value):
         '''
-        This method collects all the gpu metric parameters.
+        This method sets the same value, e.g. No data, for several gpu metric parameters.
+        '''
+        for metric_name in metric_names:
+            self.gpu_metric_output_dict[metric_name] = value
+
+    def get_probes(self, aggregation_level):
+        '''
+        This method resets the gpu metric output and returns the (name, method) pairs
+        collecting the gpu metric parameters.
         '''
+        self.gpu_metric_output_dict = {}
+        probes = []
         # Run only when nvidia gpu present
         if prerequisite.dict_component_existence['nvidiagpu']:
-            self.get_nvidia_metrics()
+            probes.append(("gpu:nvidia", self.get_nvidia_metrics))
         # Run only when amd gpu present
         if prerequisite.dict_component_existence['amdgpu']:
-            self.get_amd_metrics()
+            probes.append(("gpu:amd", self.get_amd_metrics))
         # Run only when amd processing accelerator present
         if prerequisite.dict_component_existence['amd_proc_acc']:
-            self.get_amd_proc_acc_metrics()
+            probes.append(("gpu:amd_proc_acc", self.get_amd_proc_acc_metrics))
         # Run only when gaudi present
         if prerequisite.dict_component_existence['intelgaudi']:
-            self.get_gaudi_metrics()
+            probes.append(("gpu:gaudi", self.get_gaudi_metrics))
 
         if prerequisite.dict_component_existence['nvidiagpu'] is False and prerequisite.dict_component_existence[
             'amdgpu'] is False and prerequisite.dict_component_existence['amd_proc_acc'] is False and prerequisite.dict_component_existence['intelgaudi'] is False:
-            self.gpu_metric_output_dict["gpu_temperature"] = utility.Result.NO_DATA.value
-            self.gpu_metric_output_dict["gpu_utilization"] = utility.Result.NO_DATA.value
-            self.gpu_metric_output_dict["gpu_utilization:average"] = utility.Result.NO_DATA.value
+            probes.append(("gpu:none", partial(self.set_metric_values,
+                           ["gpu_temperature", "gpu_utilization", "gpu_utilization:average"],
+                           utility.Result.NO_DATA.value)))
+        return probes
+
+    def metric_collector(self, aggregation_level):
+        '''
+        This method collects all the gpu metric parameters.
+        '''
+        for _, probe in self.get_probes(aggregation_level):
+            probe()
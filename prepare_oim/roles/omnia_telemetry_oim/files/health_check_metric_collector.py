@@ -21,6 +21,7 @@ import data_collector_storage
 import data_collector_smart
 import data_collector_os
 from collections import defaultdict
+from functools import partial
 import utility
 import data_collector_nvidia_gpu
 import data_collector_amd_gpu
@@ -39,17 +40,32 @@ class HealthCheckMetricCollector:
         '''
         This method initiates kubernetes calls to data_collector_kubernetes and retrieves necessary values.
         '''
-        #get using "kubectl get pods" commands
+        self.get_kubernetes_pods()
+        self.get_kubernetes_nodes()
+        self.get_kubernetes_components()
+
+    def get_kubernetes_pods(self):
+        '''
+        This method retrieves the pods status using "kubectl get pods".
+        '''
         kubernetes_pods_dict=data_collector_kubernetes.get_kubectl_get_pods()
         self.health_check_metric_output_dict["Kubernetespodsstatus"]=\
             kubernetes_pods_dict["Kubernetespodsstatus"]
-        #get using "kubectl get nodes" commands
+
+    def get_kubernetes_nodes(self):
+        '''
+        This method retrieves the nodes status using "kubectl get nodes".
+        '''
         kubernetes_nodes_dict=data_collector_kubernetes.get_kubectl_get_nodes()
         self.health_check_metric_output_dict["Kuberneteschildnode"]=\
             kubernetes_nodes_dict["Kuberneteschildnode"]
         self.health_check_metric_output_dict["kubernetesnodesstatus"]=\
             kubernetes_nodes_dict["kubernetesnodesstatus"]
-        #get using "kubectl get componentstatus" commands
+
+    def get_kubernetes_components(self):
+        '''
+        This method retrieves the components status using "kubectl get componentstatus".
+        '''
         kubernetes_component_status_dict=data_collector_kubernetes.get_kubectl_get_cs()
         self.health_check_metric_output_dict["kubernetescomponentsstatus"]=\
             kubernetes_component_status_dict["kubernetescomponentsstatus"]
@@ -74,8 +90,8 @@ class HealthCheckMetricCollector:
         '''
         health_metrics = defaultdict(list)
 
-        # run nvidia-smi command and store output in a variable
-        nvidia_metrics_cmd_output = data_collector_nvidia_gpu.get_nvidia_metrics_output()
+        # sample all NVIDIA GPU fields at once, including the nvlink status
+        nvidia_metrics_cmd_output = data_collector_nvidia_gpu.get_nvidia_metrics_output(with_links=True)
 
         # get driver health details for NVIDIA GPU
         health_metrics['gpu_driver'] = data_collector_nvidia_gpu.get_gpu_health_driver \
@@ -111,25 +127,28 @@ class HealthCheckMetricCollector:
         This method collects all the amd gpu health metrics
         '''
         health_metrics = defaultdict(list)
+        # sample all AMD GPU fields at once
+        amd_metrics_output = data_collector_amd_gpu.get_amd_metrics_output()
+
         # get driver health details for AMD GPU
-        health_metrics['gpu_driver'] = data_collector_amd_gpu.get_gpu_health_driver()
+        health_metrics['gpu_driver'] = data_collector_amd_gpu.get_gpu_health_driver(amd_metrics_output)
         # get nvlink health details for AMD GPU
 
         health_metrics['gpu_nvlink'] = data_collector_amd_gpu.get_gpu_health_nvlink()
 
         # get pcie health details for AMD GPU
-        health_metrics['gpu_pcie'] = data_collector_amd_gpu.get_gpu_health_pcie()
+        health_metrics['gpu_pcie'] = data_collector_amd_gpu.get_gpu_health_pcie(amd_metrics_output)
 
         # get pmu health details for AMD GPU
         health_metrics['gpu_pmu'] = data_collector_amd_gpu.get_gpu_health_pmu()
 
         # get power health details for AMD GPU
-        gpu_power_max,gpu_power_avg = data_collector_amd_gpu.get_gpu_health_power()
+        gpu_power_max,gpu_power_avg = data_collector_amd_gpu.get_gpu_health_power(amd_metrics_output)
         health_metrics['gpu_power_max'] = gpu_power_max
         health_metrics['gpu_power_avg'] = gpu_power_avg
 
         # get thermal health details for AMD GPU
-        health_metrics['gpu_thermal'] = data_collector_amd_gpu.get_gpu_health_thermal()
+        health_metrics['gpu_thermal'] = data_collector_amd_gpu.get_gpu_health_thermal(amd_metrics_output)
 
         self.gpu_health_metrics(health_metrics)
 
@@ -138,9 +157,12 @@ class HealthCheckMetricCollector:
         This method collects all the amd gpu health metrics
         '''
         health_metrics = defaultdict(list)
+        # sample all AMD GPU fields at once
+        amd_metrics_output = data_collector_amd_gpu.get_amd_metrics_output()
+
         # This function is same as in data_collector_amd_gpu
         # get driver health details for AMD GPU
-        health_metrics['gpu_driver'] = data_collector_amd_gpu.get_gpu_health_driver()
+        health_metrics['gpu_driver'] = data_collector_amd_gpu.get_gpu_health_driver(amd_metrics_output)
         
         # This function is same as in data_collector_amd_gpu
         # get nvlink health details for AMD GPU
@@ -148,19 +170,19 @@ class HealthCheckMetricCollector:
 
         # This function is same as in data_collector_amd_gpu
         # get pcie health details for AMD GPU
-        health_metrics['gpu_pcie'] = data_collector_amd_gpu.get_gpu_health_pcie()
+        health_metrics['gpu_pcie'] = data_collector_amd_gpu.get_gpu_health_pcie(amd_metrics_output)
 
         # This function is same as in data_collector_amd_gpu
         # get pmu health details for AMD GPU
         health_metrics['gpu_pmu'] = data_collector_amd_gpu.get_gpu_health_pmu()
 
         # get power health details for AMD GPU
-        gpu_power_max,gpu_power_avg = data_collector_amd_proc_acc.get_gpu_health_power()
+        gpu_power_max,gpu_power_avg = data_collector_amd_proc_acc.get_gpu_health_power(amd_metrics_output)
         health_metrics['gpu_power_max'] = gpu_power_max
         health_metrics['gpu_power_avg'] = gpu_power_avg
 
         # get thermal health details for AMD GPU
-        health_metrics['gpu_thermal'] = data_collector_amd_proc_acc.get_gpu_health_thermal()
+        health_metrics['gpu_thermal'] = data_collector_amd_proc_acc.get_gpu_health_thermal(amd_metrics_output)
 
         self.gpu_health_metrics(health_metrics)
 
@@ -169,7 +191,7 @@ class HealthCheckMetricCollector:
         This method collects all the gaudi health metrics
         '''
         health_metrics = defaultdict(list)
-        # run hl-smi command and store output in a variable
+        # sample all Gaudi fields at once
         gaudi_metrics_cmd_output = data_collector_gaudi.get_gaudi_metrics_output()
 
         # get driver health details for Gaudi
@@ -230,7 +252,7 @@ class HealthCheckMetricCollector:
         if gpu_nvlink is not None:
             for index, item in gpu_nvlink.items():
                 if item is not None:
-                    if 'inActive' not in item:
+                    if item:
                         self.health_check_metric_output_dict["gpu_health_nvlink:gpu" \
                                                             + str(index)] = \
                                                                 utility.Result.SUCCESS.value
@@ -239,8 +261,10 @@ class HealthCheckMetricCollector:
                                                             + str(index)] = \
                                                                 utility.Result.FAILURE.value
                 else:
-                    self.health_check_metric_output_dict["gpu_health_nvlink:gpu"] = \
-                        utility.Result.UNKNOWN.value
+                    # A gpu without nvlinks has no inactive link, it passes as it always did
+                    self.health_check_metric_output_dict["gpu_health_nvlink:gpu" \
+                                                        + str(index)] = \
+                                                            utility.Result.SUCCESS.value
         else:
             self.health_check_metric_output_dict["gpu_health_nvlink:gpu"] = \
                 utility.Result.UNKNOWN.value
@@ -269,7 +293,7 @@ class HealthCheckMetricCollector:
 		'''
         if gpu_pmu is not None:
             for index, item in enumerate(gpu_pmu):
-                if item is not None or item.strip() == "Enabled" or item.strip() == "Supported":
+                if item is not None:
                     self.health_check_metric_output_dict["gpu_health_pmu:gpu" \
                                                          + str(index)] = \
                                                             utility.Result.SUCCESS.value
@@ -287,7 +311,8 @@ class HealthCheckMetricCollector:
 		'''
         if gpu_power_max is not None and gpu_power_avg is not None:
             for index,item in enumerate(gpu_power_avg):
-                if float(item) <= float(gpu_power_max[index]):
+                if item is not None and gpu_power_max[index] is not None and \
+                        float(item) <= float(gpu_power_max[index]):
                     self.health_check_metric_output_dict["gpu_health_power:gpu" \
                                                          + str(index)] = \
                                                             utility.Result.SUCCESS.value
@@ -305,7 +330,7 @@ class HealthCheckMetricCollector:
 		'''
         if gpu_thermal is not None:
             for index, item in enumerate(gpu_thermal):
-                if int(item) < 85:
+                if item is not None and int(item) < 85:
                     self.health_check_metric_output_dict["gpu_health_thermal:gpu" \
                                                          + str(index)] = \
                                                             utility.Result.SUCCESS.value
@@ -327,46 +352,49 @@ class HealthCheckMetricCollector:
         for key in smart_dict.keys():
             self.health_check_metric_output_dict["Smart:"+key]=smart_dict[key]
 
-    def metric_collector(self, aggregation_level="compute"):
+    def set_metric_values(self, metric_names, value):
         '''
-        This method aggregates all the health check parameters.
+        This method sets the same value, e.g. Unknown, for several health check parameters.
+        '''
+        for metric_name in metric_names:
+            self.health_check_metric_output_dict[metric_name] = value
+
+    def get_probes(self, aggregation_level="compute"):
+        '''
+        This method resets the health check metric output and returns the (name, method)
+        pairs collecting the health check parameters. Parameters of missing components
+        are set to Unknown by a probe of the same name, so they follow its cadence.
         '''
         self.health_check_metric_output_dict={}
-        self.get_health_node_dmesg()
+        probes = [("health:dmesg", self.get_health_node_dmesg)]
         if prerequisite.dict_component_existence["beegfs"]:
-            self.get_beegfs_details()
+            probes.append(("health:beegfs", self.get_beegfs_details))
         else:
-            self.health_check_metric_output_dict["Beegfs -beegfsstat"] = utility.Result.UNKNOWN.value
+            probes.append(("health:beegfs", partial(self.set_metric_values, ["Beegfs -beegfsstat"],
+                                                    utility.Result.UNKNOWN.value)))
 
         if prerequisite.dict_component_existence["smartctl"]:
-            self.get_smart_health_parameters()
+            probes.append(("health:smart", self.get_smart_health_parameters))
         else:
-            self.health_check_metric_output_dict["Smart"] = utility.Result.UNKNOWN.value
+            probes.append(("health:smart", partial(self.set_metric_values, ["Smart"],
+                                                   utility.Result.UNKNOWN.value)))
 
         # Run only when nvidia gpu present
         if prerequisite.dict_component_existence['nvidiagpu']:
-            self.get_nvidia_metrics()
+            probes.append(("health:nvidia", self.get_nvidia_metrics))
         # Run only when amd gpu present
         if prerequisite.dict_component_existence['amdgpu']:
-            self.get_amd_metrics()
+            probes.append(("health:amd", self.get_amd_metrics))
         if prerequisite.dict_component_existence['amd_proc_acc']:
-            self.get_amd_proc_acc_metrics()
+            probes.append(("health:amd_proc_acc", self.get_amd_proc_acc_metrics))
         # Run only when gaudi present
         if prerequisite.dict_component_existence['intelgaudi']:
-            self.get_gaudi_metrics()
+            probes.append(("health:gaudi", self.get_gaudi_metrics))
         if prerequisite.dict_component_existence['nvidiagpu'] is False and prerequisite.dict_component_existence['amdgpu'] is False and prerequisite.dict_component_existence['amd_proc_acc'] and prerequisite.dict_component_existence['intelgaudi'] is False:
-            self.health_check_metric_output_dict["gpu_health_driver"] = \
-                utility.Result.UNKNOWN.value
-            self.health_check_metric_output_dict["gpu_health_nvlink"] = \
-                        utility.Result.UNKNOWN.value
-            self.health_check_metric_output_dict["gpu_health_pcie"] = \
-                utility.Result.UNKNOWN.value
-            self.health_check_metric_output_dict["gpu_health_pmu"] = \
-                utility.Result.UNKNOWN.value
-            self.health_check_metric_output_dict["gpu_health_power"] = \
-                utility.Result.UNKNOWN.value
-            self.health_check_metric_output_dict["gpu_health_thermal"] = \
-                utility.Result.UNKNOWN.value
+            probes.append(("health:gpu", partial(self.set_metric_values,
+                           ["gpu_health_driver", "gpu_health_nvlink", "gpu_health_pcie",
+                            "gpu_health_pmu", "gpu_health_power", "gpu_health_thermal"],
+                           utility.Result.UNKNOWN.value)))
         if aggregation_level in ["kube_control_plane"]:
 
             if prerequisite.dict_component_existence["kubernetes"]:
@@ -376,9 +404,21 @@ class HealthCheckMetricCollector:
                 # 2.Kuberneteschildnode
                 # 3.kubernetesnodesstatus
                 # 4.kubernetescomponentsstatus
-                self.get_using_kubernetes()
+                probes.append(("health:kubernetes_pods", self.get_kubernetes_pods))
+                probes.append(("health:kubernetes_nodes", self.get_kubernetes_nodes))
+                probes.append(("health:kubernetes_components", self.get_kubernetes_components))
             else:
-                self.health_check_metric_output_dict["Kubernetespodsstatus"] = utility.Result.UNKNOWN.value
-                self.health_check_metric_output_dict["Kuberneteschildnode"] = utility.Result.UNKNOWN.value
-                self.health_check_metric_output_dict["kubernetesnodesstatus"] = utility.Result.UNKNOWN.value
-                self.health_check_metric_output_dict["kubernetescomponentsstatus"] = utility.Result.UNKNOWN.value
+                probes.append(("health:kubernetes_pods", partial(self.set_metric_values,
+                               ["Kubernetespodsstatus"], utility.Result.UNKNOWN.value)))
+                probes.append(("health:kubernetes_nodes", partial(self.set_metric_values,
+                               ["Kuberneteschildnode", "kubernetesnodesstatus"], utility.Result.UNKNOWN.value)))
+                probes.append(("health:kubernetes_components", partial(self.set_metric_values,
+                               ["kubernetescomponentsstatus"], utility.Result.UNKNOWN.value)))
+        return probes
+
+    def metric_collector(self, aggregation_level="compute"):
+        '''
+        This method aggregates all the health check parameters.
+        '''
+        for _, probe in self.get_probes(aggregation_level):
+            probe()
@@ -0,0 +1,57 @@
+# Copyright 2025 Dell Inc. or its subsidiaries. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+'''
+Module to report metrics only when their value changes.
+'''
+
+import time
+
+# Seconds after which an unchanged metric is reported again
+default_heartbeat_interval = 3600
+
+class MetricChangeFilter:
+    '''
+    MetricChangeFilter keeps the last reported value of every metric and passes a metric
+    only when its value changed or it was not reported for heartbeat_interval seconds,
+    so every state transition is kept with a few rows. A heartbeat_interval of 0
+    passes every metric.
+    '''
+
+    def __init__(self, heartbeat_interval=default_heartbeat_interval):
+        self.heartbeat_interval = heartbeat_interval
+        self.last_reported = {}
+
+    def filter(self, metrics, now=None):
+        '''
+        Return the metrics to report and remember them as reported.
+
+        Args:
+            metrics (dict): Metric name to value of this collection.
+            now (float): Monotonic time of the collection, the current time by default.
+
+        Returns:
+            dict: The changed metrics and the metrics due for a heartbeat.
+        '''
+        if self.heartbeat_interval <= 0:
+            return dict(metrics)
+        now = time.monotonic() if now is None else now
+        changed = {}
+        for metric, value in metrics.items():
+            last_reported = self.last_reported.get(metric)
+            if last_reported is None or last_reported[0] != value or \
+                    now - last_reported[1] >= self.heartbeat_interval:
+                changed[metric] = value
+                self.last_reported[metric] = (value, now)
+        return changed
@@ -16,109 +16,196 @@
 This file holds functions related to prerequisite checking.
 """
 
+import os
+import shutil
+import threading
 import invoke_commands
 import utility
+import common_logging
 
 dict_component_existence = {}
+system_name = None
+
+PCI_DEVICES_PATH = "/sys/bus/pci/devices"
+SYSTEMD_UNITS_PATH = "/run/systemd/units"
+watched_services = ["slurmctld.service", "beegfs-client.service"]
+watched_tools = ["smartctl", "nvidia-smi", "rocm-smi", "hl-smi"]
+
+# Seconds after which the components are detected again even if nothing changed
+default_component_cache_ttl = 300
+component_cache_lock = threading.Lock()
+component_refresh_event = threading.Event()
+component_signature = None
+refresher_thread = None
 
 def get_system_name():
-    '''Get system Serial no./Service Tag
+    '''Get system Serial no./Service Tag, running dmidecode only until it succeeds
     '''
-    return invoke_commands.call_command('dmidecode -s system-serial-number')
+    global system_name
+    if system_name is None:
+        system_name = invoke_commands.call_command('dmidecode -s system-serial-number')
+    return system_name
 
-def check_slurm_existence():
+def check_slurm_existence(components):
     '''
     Method to check slurm existence
     '''
     output =  invoke_commands.call_command('systemctl is-active slurmctld')
     if output is not None:
-        dict_component_existence["slurm"] = True
+        components["slurm"] = True
     else:
-        dict_component_existence["slurm"] = False
+        components["slurm"] = False
 
-def check_kubernetes_existence():
+def check_kubernetes_existence(components):
     '''
     Method to check kubernetes existence
     '''
     output = invoke_commands.call_command("sudo /usr/local/bin/kubectl version")
     if output is not None:
-        dict_component_existence["kubernetes"] = True
+        components["kubernetes"] = True
     else:
-        dict_component_existence["kubernetes"] = False
+        components["kubernetes"] = False
 
-def check_nvidia_gpu_existence():
+def check_nvidia_gpu_existence(components):
     '''
     Method to check whether nvidia GPU is present
     '''
     nvidia_output = invoke_commands.call_command_with_pipe("lspci|grep -i nvidia")
     if (nvidia_output is not None) and len(nvidia_output)>0:
-        dict_component_existence["nvidiagpu"] = True
+        components["nvidiagpu"] = True
     else:
-        dict_component_existence["nvidiagpu"] = False
+        components["nvidiagpu"] = False
 
-def check_amd_gpu_existence():
+def check_amd_gpu_existence(components):
     '''
     Method to check whether AMD GPU is present
     '''
     # Check for Display Controller AMD GPU
     amd_output = invoke_commands.call_command_with_pipe("lspci|grep \"Display controller: Advanced Micro Devices, Inc. \[AMD/ATI\]\"")
     if (amd_output is not None) and len(amd_output) > 0:
-        dict_component_existence["amdgpu"] = True
+        components["amdgpu"] = True
     else:
-        dict_component_existence["amdgpu"] = False
+        components["amdgpu"] = False
 
     # Check for Processing Accelerators AMD GPU
     amd_proc_acc_output = invoke_commands.call_command_with_pipe("lspci|grep \"Processing accelerators: Advanced Micro Devices, Inc. \[AMD/ATI\]\"")
     if (amd_proc_acc_output is not None) and len(amd_proc_acc_output) > 0:
-        dict_component_existence["amd_proc_acc"] = True
+        components["amd_proc_acc"] = True
     else:
-        dict_component_existence["amd_proc_acc"] = False
+        components["amd_proc_acc"] = False
 
-def check_gaudi_existence():
+def check_gaudi_existence(components):
     '''
     Method to check whether Gaudi is present
     '''
     gaudi_output = invoke_commands.call_command_with_pipe\
         ("lspci|grep \"Processing accelerators: Habana Labs Ltd.\"")
     if (gaudi_output is not None) and len(gaudi_output)>0:
-        dict_component_existence["intelgaudi"] = True
+        components["intelgaudi"] = True
     else:
-        dict_component_existence["intelgaudi"] = False
+        components["intelgaudi"] = False
 
-def check_beegfs_existence():
+def check_beegfs_existence(components):
     '''
     Method to check whether beegfs is present
     '''
     output  =  invoke_commands.run_command("systemctl is-active beegfs-client")
     if output is not None and output in ("failed", "active"):
-        dict_component_existence["beegfs"] = True
+        components["beegfs"] = True
     else:
-        dict_component_existence["beegfs"] = False
+        components["beegfs"] = False
 
-def check_smartctl_existence():
+def check_smartctl_existence(components):
     '''
         Method to check whether smarmontools is installed or not
     '''
     output =  invoke_commands.call_command("smartctl -V")
     if output is not None:
-        dict_component_existence["smartctl"] = True
+        components["smartctl"] = True
     else:
-        dict_component_existence["smartctl"] = False
-
-def check_component_existence():
-    '''check if required component are installed or not'''
+        components["smartctl"] = False
 
-    global dict_component_existence
-    dict_component_existence = {}
+def detect_components():
+    '''
+    Run all component checks and replace dict_component_existence with the result at once,
+    so collectors never see a partially filled dictionary.
+    '''
+    global dict_component_existence, component_signature
+    signature = get_component_signature()
+    components = {}
 
     if utility.dict_telemetry_ini["group_info"] in ["slurm_control_node", "slurm_control_node,login"]:
-        check_slurm_existence()
+        check_slurm_existence(components)
 
     if utility.dict_telemetry_ini["group_info"] in ["kube_control_plane"]:
-        check_kubernetes_existence()
+        check_kubernetes_existence(components)
+
+    check_nvidia_gpu_existence(components)
+    check_amd_gpu_existence(components)
+    check_gaudi_existence(components)
+    check_beegfs_existence(components)
+    check_smartctl_existence(components)
+
+    with component_cache_lock:
+        dict_component_existence = components
+        component_signature = signature
+
+def get_component_signature():
+    '''
+    Cheap fingerprint of the installed hardware and component services: the PCI devices,
+    which change on hotplug or rescan, the active state of the checked services and the
+    presence of the checked tools.
+    '''
+    try:
+        pci_devices = tuple(sorted(os.listdir(PCI_DEVICES_PATH)))
+    except OSError:
+        pci_devices = ()
+    active_services = tuple(os.path.lexists(os.path.join(SYSTEMD_UNITS_PATH, f"invocation:{service}"))
+                            for service in watched_services)
+    tools = tuple(shutil.which(tool) is not None for tool in watched_tools)
+    return pci_devices, active_services, tools
+
+def refresh_components():
+    '''
+    Background loop detecting the components again when the cache expires or is invalidated.
+    '''
+    while True:
+        component_refresh_event.wait(get_component_cache_ttl())
+        component_refresh_event.clear()
+        try:
+            detect_components()
+        except Exception as exc:
+            common_logging.log_error("prerequisite:refresh_components", f"Component detection failed: {exc}")
+
+def invalidate_component_cache():
+    '''
+    Request a new component detection from the background thread.
+    '''
+    component_refresh_event.set()
+
+def get_component_cache_ttl():
+    '''
+    Seconds a component detection stays valid when nothing changes.
+    '''
+    try:
+        return int(utility.dict_telemetry_ini.get("component_detection_interval") or default_component_cache_ttl)
+    except ValueError:
+        return default_component_cache_ttl
+
+def check_component_existence():
+    '''
+    check if required component are installed or not.
+    The components are detected once at startup and then refreshed in the background,
+    when the cache expires or the hardware or service signature changes.
+    '''
+    global refresher_thread
+
+    if refresher_thread is None:
+        detect_components()
+        refresher_thread = threading.Thread(target=refresh_components, name="omnia_telemetry_components",
+                                            daemon=True)
+        refresher_thread.start()
+        return
 
-    check_nvidia_gpu_existence()
-    check_amd_gpu_existence()
-    check_gaudi_existence()
-    check_beegfs_existence()
-    check_smartctl_existence()
+    if get_component_signature() != component_signature:
+        invalidate_component_cache()
@@ -0,0 +1,104 @@
+# Copyright 2025 Dell Inc. or its subsidiaries. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+'''
+Module to run independent metric probes concurrently with per-probe deadlines.
+'''
+
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+import common_logging
+
+# Number of probes running at the same time
+probe_workers = 16
+# Number of commands of one probe (one per disk, GPU, ...) running at the same time
+command_workers = 8
+
+class ProbeScheduler:
+    '''
+    ProbeScheduler runs the probes of a collection cycle on a shared thread pool.
+    Every probe has its own deadline. A probe still running when the cycle stops
+    waiting keeps running in the background, and is not started again until it
+    has finished.
+    '''
+
+    def __init__(self, max_workers=probe_workers):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers,
+                                           thread_name_prefix="omnia_telemetry_probe")
+        self.in_flight = {}
+
+    def run(self, probes, deadlines, wait):
+        '''
+        Run probes concurrently and wait until they finish, miss their deadline
+        or the cycle stops waiting for them.
+
+        Args:
+            probes (list): (name, callable) pairs, the callables take no arguments.
+            deadlines (dict): Seconds each probe may take, by probe name.
+            wait (float): Seconds the cycle waits for its probes. A probe with a
+                later deadline which is still running afterwards is not reported.
+
+        Returns:
+            list: Names of the probes which did not finish within their deadline.
+        '''
+        started = []
+        for name, probe in probes:
+            previous = self.in_flight.get(name)
+            if previous is not None and not previous[0].done():
+                common_logging.log_error("probe_scheduler:run",
+                                         f"Probe {name} did not finish within {previous[2]} seconds, "
+                                         "skipping it until it has finished")
+                continue
+            self.in_flight[name] = (self.executor.submit(probe), time.monotonic(), deadlines[name])
+            started.append(name)
+
+        missed = []
+        cycle_end = time.monotonic() + wait
+        for name in started:
+            future, start_time, deadline = self.in_flight[name]
+            probe_end = start_time + deadline
+            try:
+                future.result(timeout=max(min(probe_end, cycle_end) - time.monotonic(), 0))
+            except FutureTimeoutError:
+                if probe_end <= cycle_end:
+                    missed.append(name)
+                    common_logging.log_error("probe_scheduler:run",
+                                             f"Probe {name} did not finish within {deadline} seconds")
+            except Exception as exc:
+                common_logging.log_error("probe_scheduler:run", f"Probe {name} failed: {exc}")
+        return missed
+
+    def shutdown(self):
+        '''
+        Stop accepting probes, without waiting for running ones.
+        '''
+        self.executor.shutdown(wait=False)
+
+def map_concurrently(function, items, max_workers=command_workers):
+    '''
+    Call function for every item concurrently, e.g. one command per disk or GPU.
+
+    Args:
+        function (callable): Function taking one item.
+        items (list): The items.
+        max_workers (int): Number of concurrent calls.
+
+    Returns:
+        list: The results in the order of items.
+    '''
+    items = list(items)
+    if len(items) <= 1:
+        return [function(item) for item in items]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as executor:
+        return list(executor.map(function, items))
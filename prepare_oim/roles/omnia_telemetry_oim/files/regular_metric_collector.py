@@ -19,12 +19,11 @@
 '''
 import data_collector_psutil
 import data_collector_smart
-import data_collector_os
-import invoke_commands
-import common_parser
+import data_collector_procfs
 import utility
 import data_collector_slurm
 import prerequisite
+from functools import partial
 
 
 class RegularMetricCollector:
@@ -40,14 +39,10 @@ class RegularMetricCollector:
         '''
         Retrieve blocked process information and store it in the dictionary.
         '''
-        # Run the command to read /proc/stat and grep for procs_blocked
-        command = "grep procs_blocked /proc/stat"
-        output = invoke_commands.call_command(command)
-
-        if output is not None:
-            tokens = common_parser.split_by_regex(output, r"\s+")
-            blocked_processes = tokens[1]
+        # Read procs_blocked from /proc/stat
+        blocked_processes = data_collector_procfs.get_blocked_processes()
 
+        if blocked_processes is not None:
             # BlockedProcess is number of blocked processes waiting for I/O
             self.regular_metric_output_dict["BlockedProcesses"] = blocked_processes
             self.regular_unit["BlockedProcesses"] = "processes"
@@ -84,15 +79,9 @@ class RegularMetricCollector:
 
             # Dynamically check link status for each interface in netio
             for interface in netio.keys():
-                try:
-                    # Check link status using ethtool
-                    ethtool_output = invoke_commands.call_command(f"ethtool {interface} | grep -i 'Link detected.*yes'")
-                    if "yes" in ethtool_output.lower():
-                        # Add interface to the list if the link is active
-                        interface_list.append(interface)
-                except Exception as e:
-                    # Log or handle any errors during the ethtool call
-                    print(f"Error checking link status for interface {interface}: {e}")
+                # Add interface to the list if the link is active
+                if data_collector_procfs.is_link_detected(interface):
+                    interface_list.append(interface)
 
             # Process each interface in the updated interface list
             for interface in interface_list:
@@ -113,14 +102,10 @@ class RegularMetricCollector:
         '''
         Retrieve HardwareCorrupted information and store it in the dictionary.
         '''
-        # Run the command to grep for HardwareCorrupted in /proc/meminfo
-        command = "grep HardwareCorrupted /proc/meminfo"
-        output = invoke_commands.call_command(command)
-
-        if output is not None:
-            tokens = common_parser.split_by_regex(output, r"\s+")
-            hardware_corrupted = tokens[1]
+        # Read HardwareCorrupted from /proc/meminfo
+        hardware_corrupted = data_collector_procfs.get_meminfo_value("HardwareCorrupted")
 
+        if hardware_corrupted is not None:
             # Hardware corrupted memory detected by ECC
             self.regular_metric_output_dict["HardwareCorruptedMemory"] = hardware_corrupted
             self.regular_unit["HardwareCorruptedMemory"] = "kB"
@@ -204,22 +189,32 @@ class RegularMetricCollector:
         Get the following regular metric parameters:
         1. UniqueUserLogin
         '''
-        self.regular_metric_output_dict["UniqueUserLogin"] = str(data_collector_os.get_unique_loggedin_users())
+        self.regular_metric_output_dict["UniqueUserLogin"] = str(data_collector_psutil.get_unique_loggedin_users())
 
-    def metric_collector(self, aggregation_level="compute"):
+    def set_metric_values(self, metric_names, value):
         '''
-        This method aggregrates all the regular metric parameters.
+        This method sets the same value, e.g. No data, for several regular metric parameters.
+        '''
+        for metric_name in metric_names:
+            self.regular_metric_output_dict[metric_name] = value
+
+    def get_probes(self, aggregation_level="compute"):
+        '''
+        This method resets the regular metric output and returns the (name, method) pairs
+        collecting the regular metric parameters. Parameters of missing components
+        are set to No data by a probe of the same name, so they follow its cadence.
         '''
         self.regular_metric_output_dict = {}
-        self.get_blocked_process()
-        self.get_cpu_info()
-        self.get_packet_errors()
-        self.get_hardware_corrupted_memory()
-        self.get_virtual_memory_info()
+        probes = [("regular:blocked_process", self.get_blocked_process),
+                  ("regular:cpu_info", self.get_cpu_info),
+                  ("regular:packet_errors", self.get_packet_errors),
+                  ("regular:hardware_corrupted_memory", self.get_hardware_corrupted_memory),
+                  ("regular:virtual_memory_info", self.get_virtual_memory_info)]
         if prerequisite.dict_component_existence["smartctl"]:
-            self.get_smart_regular_parameters()
+            probes.append(("regular:smart", self.get_smart_regular_parameters))
         else:
-            self.regular_metric_output_dict["SMARTHDATemp"] = utility.Result.NO_DATA.value
+            probes.append(("regular:smart", partial(self.set_metric_values, ["SMARTHDATemp"],
+                                                    utility.Result.NO_DATA.value)))
 
         # Get cluster level parameters.
         if aggregation_level in ["slurm_control_node", "slurm_control_node,login"]:
@@ -231,16 +226,21 @@ class RegularMetricCollector:
                 # 4.QueuedJobs
                 # 5.RunningJobs
                 # 6.FailedJobs
-                self.get_using_slurm()
+                probes.append(("regular:slurm", self.get_using_slurm))
             else:
-                self.regular_metric_output_dict["NodesTotal"] = utility.Result.NO_DATA.value
-                self.regular_metric_output_dict["NodesUp"] = utility.Result.NO_DATA.value
-                self.regular_metric_output_dict["NodesDown"] = utility.Result.NO_DATA.value
-                self.regular_metric_output_dict["QueuedJobs"] = utility.Result.NO_DATA.value
-                self.regular_metric_output_dict["RunningJobs"] = utility.Result.NO_DATA.value
-                self.regular_metric_output_dict["FailedJobs"] = utility.Result.NO_DATA.value
+                probes.append(("regular:slurm", partial(self.set_metric_values,
+                               ["NodesTotal", "NodesUp", "NodesDown", "QueuedJobs", "RunningJobs", "FailedJobs"],
+                               utility.Result.NO_DATA.value)))
 
         if aggregation_level in ["login", "slurm_control_node,login"]:
             # Get the Folloiwng parameter
             # 1. UniqueUserLogin
-            self.get_unique_user_login()
\ No newline at end of file
+            probes.append(("regular:unique_user_login", self.get_unique_user_login))
+        return probes
+
+    def metric_collector(self, aggregation_level="compute"):
+        '''
+        This method aggregrates all the regular metric parameters.
+        '''
+        for _, probe in self.get_probes(aggregation_level):
+            probe()
@@ -0,0 +1,177 @@
+# Copyright 2025 Dell Inc. or its subsidiaries. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+'''
+Module to keep unsent telemetry batches on disk.
+Every batch is one file named after its sequence number, so batches survive
+restarts of the service and are replayed in the order they were written.
+'''
+
+import os
+import json
+import time
+import common_logging
+
+# Version of the batch file content, batches of another version are dropped
+spool_format_version = 1
+batch_file_prefix = "batch-"
+batch_file_suffix = ".json"
+# Batches the database rejected, kept out of the ring for inspection
+rejected_file_prefix = "rejected-"
+max_rejected_batches = 10
+
+class SpoolRing:
+    '''
+    SpoolRing is a bounded on-disk ring of batches. When the batches exceed max_bytes,
+    the oldest batches are dropped first. Batches are kept in memory when the spool
+    directory can not be written.
+    '''
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        # (sequence, path, size) of the batches on disk, (sequence, rows, size) of
+        # the batches in memory, both oldest first
+        self.batches = []
+        self.memory_batches = []
+        self.size = 0
+        self.next_sequence = 0
+        try:
+            os.makedirs(self.directory, mode=0o700, exist_ok=True)
+            for file_name in sorted(os.listdir(self.directory)):
+                if file_name.startswith(batch_file_prefix) and file_name.endswith(batch_file_suffix):
+                    path = os.path.join(self.directory, file_name)
+                    sequence = int(file_name[len(batch_file_prefix):-len(batch_file_suffix)])
+                    self.batches.append((sequence, path, os.path.getsize(path)))
+                    self.size += os.path.getsize(path)
+                    self.next_sequence = sequence + 1
+                elif file_name.endswith(".tmp"):
+                    # A batch which was being written when the service stopped
+                    os.remove(os.path.join(self.directory, file_name))
+        except (OSError, ValueError) as exc:
+            common_logging.log_error("spool_ring:SpoolRing",
+                                     f"Unable to read spool directory {self.directory}: {exc}")
+        if self.batches:
+            common_logging.log_message("spool_ring:SpoolRing",
+                                       f"Found {len(self.batches)} unsent batches in {self.directory}")
+
+    def __len__(self):
+        return len(self.memory_batches) + len(self.batches)
+
+    def append(self, rows):
+        '''
+        Add a batch of rows at the end of the ring.
+
+        Args:
+            rows (list): Rows of the batch, lists or tuples of json serializable values.
+        '''
+        sequence = self.next_sequence
+        self.next_sequence += 1
+        content = json.dumps({"version": spool_format_version, "rows": rows})
+        path = os.path.join(self.directory, f"{batch_file_prefix}{sequence:012d}{batch_file_suffix}")
+        try:
+            with open(path + ".tmp", "w", encoding="utf-8") as batch_file:
+                batch_file.write(content)
+            os.replace(path + ".tmp", path)
+        except OSError as exc:
+            common_logging.log_error("spool_ring:append",
+                                     f"Unable to write {path}, keeping the batch in memory: {exc}")
+            self.memory_batches.append((sequence, rows, len(content)))
+        else:
+            self.batches.append((sequence, path, len(content)))
+            self.size += len(content)
+        self.drop_oldest()
+
+    def oldest_sequence(self):
+        '''
+        Return the sequence number of the oldest batch, on disk or in memory.
+        '''
+        return min(batches[0][0] for batches in (self.batches, self.memory_batches) if batches)
+
+    def drop_oldest(self):
+        '''
+        Drop the oldest batches until the ring fits in max_bytes, always keeping the newest.
+        '''
+        dropped_batches = 0
+        while len(self) > 1 and self.size + sum(batch[2] for batch in self.memory_batches) > self.max_bytes:
+            self.remove(self.oldest_sequence())
+            dropped_batches += 1
+        if dropped_batches:
+            common_logging.log_error("spool_ring:drop_oldest",
+                                     f"Spool is full, dropped {dropped_batches} oldest batches")
+
+    def peek(self):
+        '''
+        Return the oldest batch as (key, rows), None when the ring is empty.
+        Batches which can not be read are dropped.
+        '''
+        while self.batches:
+            sequence, path, _ = self.batches[0]
+            if self.memory_batches and self.memory_batches[0][0] < sequence:
+                break
+            try:
+                with open(path, "r", encoding="utf-8") as batch_file:
+                    content = json.load(batch_file)
+                if content.get("version") == spool_format_version:
+                    return sequence, content["rows"]
+                common_logging.log_error("spool_ring:peek",
+                                         f"Dropping {path} of unsupported version {content.get('version')}")
+            except (OSError, ValueError, AttributeError, KeyError) as exc:
+                common_logging.log_error("spool_ring:peek", f"Dropping unreadable {path}: {exc}")
+            self.remove(sequence)
+        # Batches are kept in memory while the spool directory can not be written,
+        # they may be older than batches written to disk afterwards
+        if self.memory_batches:
+            return self.memory_batches[0][0], self.memory_batches[0][1]
+        return None
+
+    def remove(self, key):
+        '''
+        Remove a batch returned by peek.
+        '''
+        for index, (sequence, _, _) in enumerate(self.memory_batches):
+            if sequence == key:
+                del self.memory_batches[index]
+                return
+        for index, (sequence, path, size) in enumerate(self.batches):
+            if sequence == key:
+                del self.batches[index]
+                self.size -= size
+                try:
+                    os.remove(path)
+                except OSError as exc:
+                    common_logging.log_error("spool_ring:remove", f"Unable to remove {path}: {exc}")
+                return
+
+    def quarantine(self, rows):
+        '''
+        Keep a batch the database rejected next to the ring, where it is not replayed.
+        Only the newest max_rejected_batches rejected batches are kept.
+
+        Args:
+            rows (list): Rows of the batch, lists or tuples of json serializable values.
+        '''
+        path = os.path.join(self.directory, f"{rejected_file_prefix}{time.time_ns()}{batch_file_suffix}")
+        try:
+            with open(path, "w", encoding="utf-8") as batch_file:
+                json.dump({"version": spool_format_version, "rows": rows}, batch_file)
+            rejected_files = sorted(file_name for file_name in os.listdir(self.directory)
+                                    if file_name.startswith(rejected_file_prefix))
+            for file_name in rejected_files[:-max_rejected_batches]:
+                os.remove(os.path.join(self.directory, file_name))
+        except (OSError, TypeError, ValueError) as exc:
+            common_logging.log_error("spool_ring:quarantine",
+                                     f"Unable to keep the rejected batch in {path}, dropping it: {exc}")
+            return
+        common_logging.log_error("spool_ring:quarantine", f"Rejected batch kept in {path}")
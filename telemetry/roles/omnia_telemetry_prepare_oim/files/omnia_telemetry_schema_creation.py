@@ -69,28 +69,302 @@ def db_schema(conn):
     cursor.execute(sql_query)
     cursor.close()
 
+# Values stored in the numeric value column, any other value is stored as a status
+numeric_value_pattern = r'^[-+]?([0-9]+\.?[0-9]*|\.[0-9]+)([eE][-+]?[0-9]+)?$'
+
+# Raw samples are compressed by host and metric once they are older than compress_after
+compress_after = '1 day'
+raw_retention = '2 months'
+
+# Continuous aggregates of the samples, each kept longer than the finer ones.
+# Nodes replay the samples spooled during a database outage of any length, so the
+# refresh window covers all raw samples; only the buckets invalidated by new rows
+# are materialized again, so the wide window does not make a refresh slower
+rollups = [
+    {'name': 'metric_samples_1m', 'bucket': '1 minute', 'start_offset': raw_retention,
+     'end_offset': '1 minute', 'schedule_interval': '1 minute', 'retention': '6 months'},
+    {'name': 'metric_samples_1h', 'bucket': '1 hour', 'start_offset': raw_retention,
+     'end_offset': '1 hour', 'schedule_interval': '1 hour', 'retention': '2 years'}
+]
+
+# Longest time range omnia_telemetry.get_metrics reads from the raw samples
+# and from the 1 minute rollup, longer ranges are read from the 1 hour rollup
+raw_query_max_range = '6 hours'
+minute_query_max_range = '7 days'
+
 def db_table(conn):
     '''
-    This module creates a table for omnia telemetry metrics
+    This module creates the tables for omnia telemetry metrics.
+    Samples reference a host, a metric name and, for values which are not numbers
+    such as "No data", "Pass" or "Fail", a status instead of repeating them as text.
 
     Args:
        conn (Connection Object): It accepts connection object as input
     '''
-    sql_query = '''CREATE TABLE IF NOT EXISTS omnia_telemetry.metrics (
-                       id       TEXT NOT NULL,
-                       context  TEXT NOT NULL,
-                       label    TEXT NOT NULL,
-                       value    TEXT NOT NULL,
-                       unit     TEXT,
-                       system   TEXT,
-                       hostname TEXT,
-                       time     TIMESTAMPTZ NOT NULL
+    sql_query = '''CREATE TABLE IF NOT EXISTS omnia_telemetry.hosts (
+                       host_id  SERIAL PRIMARY KEY,
+                       system   TEXT NOT NULL,
+                       hostname TEXT NOT NULL,
+                       UNIQUE (system, hostname)
                   );
-                  SELECT create_hypertable('omnia_telemetry.metrics', 'time', if_not_exists => TRUE);
-                  SELECT add_retention_policy('omnia_telemetry.metrics', INTERVAL '2 months', if_not_exists => TRUE);
+                  CREATE TABLE IF NOT EXISTS omnia_telemetry.metric_names (
+                       metric_id SERIAL PRIMARY KEY,
+                       id        TEXT NOT NULL,
+                       context   TEXT NOT NULL,
+                       unit      TEXT NOT NULL DEFAULT '',
+                       UNIQUE (id, context, unit)
+                  );
+                  CREATE TABLE IF NOT EXISTS omnia_telemetry.metric_statuses (
+                       status_id SERIAL PRIMARY KEY,
+                       status    TEXT NOT NULL UNIQUE
+                  );
+                  INSERT INTO omnia_telemetry.metric_statuses (status)
+                  VALUES ('No data'), ('Unknown'), ('Pass'), ('Fail')
+                  ON CONFLICT (status) DO NOTHING;
+                  CREATE TABLE IF NOT EXISTS omnia_telemetry.metric_samples (
+                       time      TIMESTAMPTZ NOT NULL,
+                       host_id   INTEGER NOT NULL,
+                       metric_id INTEGER NOT NULL,
+                       value     DOUBLE PRECISION,
+                       status_id INTEGER
+                  );
+                  SELECT create_hypertable('omnia_telemetry.metric_samples', 'time', if_not_exists => TRUE);
+                  CREATE INDEX IF NOT EXISTS metric_samples_host_metric_time_idx
+                  ON omnia_telemetry.metric_samples (host_id, metric_id, time DESC);
+                  SELECT add_retention_policy('omnia_telemetry.metric_samples', %(retention)s::INTERVAL, if_not_exists => TRUE);
                   '''
     cursor = conn.cursor()
-    cursor.execute(sql_query)
+    cursor.execute(sql_query, {'retention': raw_retention})
+    cursor.close()
+
+def db_compression(conn):
+    '''
+    This module enables native compression of the samples, segmented by host and metric
+    so a compressed chunk stores each series together
+
+    Args:
+       conn (Connection Object): It accepts connection object as input
+    '''
+    cursor = conn.cursor()
+    cursor.execute('''SELECT compression_enabled FROM timescaledb_information.hypertables
+                      WHERE hypertable_schema = 'omnia_telemetry' AND hypertable_name = 'metric_samples';''')
+    compression_enabled = cursor.fetchone()
+    # The settings can not be changed once chunks are compressed
+    if compression_enabled is None or not compression_enabled[0]:
+        cursor.execute('''ALTER TABLE omnia_telemetry.metric_samples SET (
+                              timescaledb.compress,
+                              timescaledb.compress_segmentby = 'host_id, metric_id',
+                              timescaledb.compress_orderby = 'time DESC');''')
+    cursor.execute("SELECT add_compression_policy('omnia_telemetry.metric_samples', "
+                   "%(compress_after)s::INTERVAL, if_not_exists => TRUE);",
+                   {'compress_after': compress_after})
+    cursor.close()
+
+def db_continuous_aggregates(conn):
+    '''
+    This module creates the continuous aggregates of the samples with their refresh
+    and retention policies. A new aggregate is filled with the existing samples.
+
+    Args:
+       conn (Connection Object): It accepts connection object as input
+    '''
+    cursor = conn.cursor()
+    for rollup in rollups:
+        cursor.execute('''SELECT 1 FROM timescaledb_information.continuous_aggregates
+                          WHERE view_schema = 'omnia_telemetry' AND view_name = %(name)s;''',
+                       {'name': rollup['name']})
+        if cursor.fetchone() is None:
+            cursor.execute(f'''CREATE MATERIALIZED VIEW omnia_telemetry.{rollup['name']}
+                               WITH (timescaledb.continuous) AS
+                               SELECT time_bucket(%(bucket)s::INTERVAL, time) AS bucket,
+                                      host_id, metric_id,
+                                      min(value) AS min_value,
+                                      max(value) AS max_value,
+                                      avg(value) AS avg_value,
+                                      last(value, time) AS last_value,
+                                      last(status_id, time) AS last_status_id,
+                                      count(*) AS samples
+                               FROM omnia_telemetry.metric_samples
+                               GROUP BY bucket, host_id, metric_id
+                               WITH NO DATA;''', rollup)
+            # Refreshing can not run in a transaction, the connection is in autocommit
+            cursor.execute(f"CALL refresh_continuous_aggregate('omnia_telemetry.{rollup['name']}', NULL, NULL);")
+        # The policy is replaced, so schemas created with other offsets get the current ones
+        cursor.execute(f'''SELECT remove_continuous_aggregate_policy('omnia_telemetry.{rollup['name']}',
+                               if_exists => TRUE);
+                           SELECT add_continuous_aggregate_policy('omnia_telemetry.{rollup['name']}',
+                               start_offset => %(start_offset)s::INTERVAL,
+                               end_offset => %(end_offset)s::INTERVAL,
+                               schedule_interval => %(schedule_interval)s::INTERVAL,
+                               if_not_exists => TRUE);
+                           SELECT add_retention_policy('omnia_telemetry.{rollup['name']}',
+                               %(retention)s::INTERVAL, if_not_exists => TRUE);''', rollup)
+    cursor.close()
+
+def get_metrics_query(source, time_column, value_columns, status_column):
+    '''
+    This module returns the query of omnia_telemetry.get_metrics reading one source
+
+    Args:
+       source (str): Samples table or rollup
+       time_column (str): Time column of the source
+       value_columns (str): Min, max, avg and last value columns of the source
+       status_column (str): Status id column of the source
+    '''
+    return f'''SELECT source.{time_column}, hosts.system, hosts.hostname,
+                      names.id, names.context, names.unit, {value_columns},
+                      statuses.status, source.{status_column}
+               FROM omnia_telemetry.{source} source
+               JOIN omnia_telemetry.hosts hosts ON hosts.host_id = source.host_id
+               JOIN omnia_telemetry.metric_names names ON names.metric_id = source.metric_id
+               LEFT JOIN omnia_telemetry.metric_statuses statuses
+                 ON statuses.status_id = source.{status_column}
+               WHERE source.{time_column} >= range_start AND source.{time_column} < range_end'''
+
+def db_query_helpers(conn):
+    '''
+    This module creates omnia_telemetry.get_metrics(range_start, range_end), which reads
+    a time range from the raw samples or from the rollup matching the length of the range
+
+    Args:
+       conn (Connection Object): It accepts connection object as input
+    '''
+    rollup_columns = 'source.min_value, source.max_value, source.avg_value, source.last_value'
+    raw_query = get_metrics_query('metric_samples', 'time',
+                                  'source.value, source.value, source.value, source.value',
+                                  'status_id')
+    minute_query = get_metrics_query(rollups[0]['name'], 'bucket', rollup_columns, 'last_status_id')
+    hour_query = get_metrics_query(rollups[1]['name'], 'bucket', rollup_columns, 'last_status_id')
+    sql_query = f'''CREATE OR REPLACE FUNCTION omnia_telemetry.get_metrics(
+                       range_start TIMESTAMPTZ, range_end TIMESTAMPTZ DEFAULT now())
+                   RETURNS TABLE (time TIMESTAMPTZ, system TEXT, hostname TEXT, id TEXT,
+                                  context TEXT, unit TEXT, min_value DOUBLE PRECISION,
+                                  max_value DOUBLE PRECISION, avg_value DOUBLE PRECISION,
+                                  last_value DOUBLE PRECISION, status TEXT, status_id INTEGER)
+                   LANGUAGE plpgsql STABLE AS $$
+                   BEGIN
+                       IF range_end - range_start <= %(raw_range)s::INTERVAL THEN
+                           RETURN QUERY {raw_query};
+                       ELSIF range_end - range_start <= %(minute_range)s::INTERVAL THEN
+                           RETURN QUERY {minute_query};
+                       ELSE
+                           RETURN QUERY {hour_query};
+                       END IF;
+                   END;
+                   $$;'''
+    cursor = conn.cursor()
+    cursor.execute(sql_query, {'raw_range': raw_query_max_range,
+                               'minute_range': minute_query_max_range})
+    cursor.close()
+
+def migrate_metrics_table(conn):
+    '''
+    This module moves the rows of the omnia_telemetry.metrics table of earlier releases,
+    which stored every column as text, into the metric tables and drops it.
+
+    Args:
+       conn (Connection Object): It accepts connection object as input
+    '''
+    cursor = conn.cursor()
+    cursor.execute('''SELECT table_type FROM information_schema.tables
+                      WHERE table_schema = 'omnia_telemetry' AND table_name = 'metrics';''')
+    table_type = cursor.fetchone()
+    if table_type is None or table_type[0] != 'BASE TABLE':
+        cursor.close()
+        return
+
+    sql_query = '''ALTER TABLE omnia_telemetry.metrics RENAME TO metrics_text;
+                  INSERT INTO omnia_telemetry.hosts (system, hostname)
+                  SELECT DISTINCT COALESCE(system, ''), COALESCE(hostname, '')
+                  FROM omnia_telemetry.metrics_text
+                  ON CONFLICT (system, hostname) DO NOTHING;
+                  INSERT INTO omnia_telemetry.metric_names (id, context, unit)
+                  SELECT DISTINCT id, context, COALESCE(unit, '')
+                  FROM omnia_telemetry.metrics_text
+                  ON CONFLICT (id, context, unit) DO NOTHING;
+                  INSERT INTO omnia_telemetry.metric_statuses (status)
+                  SELECT DISTINCT value FROM omnia_telemetry.metrics_text
+                  WHERE value !~ %(pattern)s
+                  ON CONFLICT (status) DO NOTHING;
+                  INSERT INTO omnia_telemetry.metric_samples (time, host_id, metric_id, value, status_id)
+                  SELECT metrics.time, hosts.host_id, names.metric_id,
+                         CASE WHEN metrics.value ~ %(pattern)s THEN metrics.value::DOUBLE PRECISION END,
+                         statuses.status_id
+                  FROM omnia_telemetry.metrics_text metrics
+                  JOIN omnia_telemetry.hosts hosts
+                    ON hosts.system = COALESCE(metrics.system, '')
+                   AND hosts.hostname = COALESCE(metrics.hostname, '')
+                  JOIN omnia_telemetry.metric_names names
+                    ON names.id = metrics.id AND names.context = metrics.context
+                   AND names.unit = COALESCE(metrics.unit, '')
+                  LEFT JOIN omnia_telemetry.metric_statuses statuses
+                    ON metrics.value !~ %(pattern)s AND statuses.status = metrics.value;
+                  DROP TABLE omnia_telemetry.metrics_text;
+                  '''
+    # Migrate in one transaction, a failed migration leaves the table as it was
+    conn.autocommit = False
+    try:
+        cursor.execute(sql_query, {'pattern': numeric_value_pattern})
+        conn.commit()
+    except Exception as ex:
+        conn.rollback()
+        sys.exit(f"Failed to migrate omnia_telemetry.metrics: {ex}")
+    finally:
+        conn.autocommit = True
+        cursor.close()
+
+def db_view(conn):
+    '''
+    This module creates the omnia_telemetry.metrics view, which returns the samples
+    with the text columns of earlier releases and accepts their inserts.
+
+    Args:
+       conn (Connection Object): It accepts connection object as input
+    '''
+    sql_query = '''CREATE OR REPLACE VIEW omnia_telemetry.metrics AS
+                  SELECT names.id, names.context, names.id || ' ' || names.context AS label,
+                         COALESCE(statuses.status, samples.value::TEXT) AS value, names.unit,
+                         hosts.system, hosts.hostname, samples.time
+                  FROM omnia_telemetry.metric_samples samples
+                  JOIN omnia_telemetry.hosts hosts ON hosts.host_id = samples.host_id
+                  JOIN omnia_telemetry.metric_names names ON names.metric_id = samples.metric_id
+                  LEFT JOIN omnia_telemetry.metric_statuses statuses
+                    ON statuses.status_id = samples.status_id;
+
+                  CREATE OR REPLACE FUNCTION omnia_telemetry.insert_metric() RETURNS trigger AS $$
+                  DECLARE
+                      sample_host_id INTEGER;
+                      sample_metric_id INTEGER;
+                      sample_status_id INTEGER;
+                      sample_value DOUBLE PRECISION;
+                  BEGIN
+                      INSERT INTO omnia_telemetry.hosts (system, hostname)
+                      VALUES (COALESCE(NEW.system, ''), COALESCE(NEW.hostname, ''))
+                      ON CONFLICT (system, hostname) DO UPDATE SET system = EXCLUDED.system
+                      RETURNING host_id INTO sample_host_id;
+                      INSERT INTO omnia_telemetry.metric_names (id, context, unit)
+                      VALUES (NEW.id, NEW.context, COALESCE(NEW.unit, ''))
+                      ON CONFLICT (id, context, unit) DO UPDATE SET unit = EXCLUDED.unit
+                      RETURNING metric_id INTO sample_metric_id;
+                      IF NEW.value ~ %(pattern)s THEN
+                          sample_value := NEW.value::DOUBLE PRECISION;
+                      ELSE
+                          INSERT INTO omnia_telemetry.metric_statuses (status) VALUES (NEW.value)
+                          ON CONFLICT (status) DO UPDATE SET status = EXCLUDED.status
+                          RETURNING status_id INTO sample_status_id;
+                      END IF;
+                      INSERT INTO omnia_telemetry.metric_samples (time, host_id, metric_id, value, status_id)
+                      VALUES (NEW.time, sample_host_id, sample_metric_id, sample_value, sample_status_id);
+                      RETURN NEW;
+                  END;
+                  $$ LANGUAGE plpgsql;
+
+                  DROP TRIGGER IF EXISTS metrics_insert ON omnia_telemetry.metrics;
+                  CREATE TRIGGER metrics_insert INSTEAD OF INSERT ON omnia_telemetry.metrics
+                  FOR EACH ROW EXECUTE PROCEDURE omnia_telemetry.insert_metric();
+                  '''
+    cursor = conn.cursor()
+    cursor.execute(sql_query, {'pattern': numeric_value_pattern})
     cursor.close()
 
 args = parse_arguments()
@@ -112,6 +386,11 @@ def main():
     if db_conn is not None:
         db_schema(db_conn)
         db_table(db_conn)
+        migrate_metrics_table(db_conn)
+        db_view(db_conn)
+        db_compression(db_conn)
+        db_continuous_aggregates(db_conn)
+        db_query_helpers(db_conn)
         db_conn.close()
 
 if __name__ == '__main__':
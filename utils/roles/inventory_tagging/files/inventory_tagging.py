@@ -18,7 +18,6 @@ import sys
 import logging
 from typing import List, Tuple
 import argparse
-import commentedconfigparser
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -32,6 +31,12 @@ class InventoryManager:
         self.vendors = vendors
         self.inventory_dir_path = os.path.abspath(inventory_dir_path)
         self.db_path = path_to_db_file
+        if self.db_path:
+            sys.path.insert(0, self.db_path)
+        # pylint: disable=C0415
+        from inventory_writer import InventoryWriter
+        # Collects the hosts of all nodes, every inventory file is written once
+        self.inventory_writer = InventoryWriter(self.inventory_dir_path)
 
     def add_inventory_files(self) -> None:
         """
@@ -61,7 +66,6 @@ class InventoryManager:
             node, service tag, admin IP, CPU, and GPU of each node in the cluster.
         """
         if self.db_path:
-            sys.path.insert(0, self.db_path)
             try:
                 # pylint: disable=C0415
                 from omniadb_connection import create_connection
@@ -93,50 +97,23 @@ class InventoryManager:
 
     def add_hostname_inventory(self, inventory_file: str, hostname: str) -> None:
         """
-        Adds a hostname to the inventory file, if does not exist.
+        Adds a hostname to the inventory file, replacing the line of the same host if it exists.
+        The hostname is written by write_inventory_files.
         Args:
-            inventory_file (str): The path to the inventory file.
+            inventory_file (str): The name of the inventory file.
             hostname (str): The hostname to add.
         """
-        try:
-            # Read Content of file if it exist
-            if os.path.exists(os.path.abspath(inventory_file)):
-                with open(os.path.abspath(inventory_file), 'r', encoding='utf-8') as file:
-                    lines = file.readlines()
-            else:
-                lines = []
-            if lines:
-                # Check if the hostname is already in the file
-                if any(hostname in line for line in lines):
-                    logger.info("Hostname '%s' already exists in %s. Skipping addition.", hostname, inventory_file)
-                    return
-            # Read the config file
-            config = commentedconfigparser.CommentedConfigParser(allow_no_value=True)
-            config.read(inventory_file, encoding='utf-8')
+        self.inventory_writer.add(inventory_file, hostname)
 
-            # Check if the section exists, otherwise create it
-            if not config.has_section(inventory_file):
-                config.add_section(inventory_file)
-
-            # Set the hostname under the correct section
-            config.set(inventory_file, hostname, None)  # Use None as value since no value is required
-
-            # Write the inventory file
-            with open(os.path.abspath(inventory_file), 'w', encoding='utf-8') as configfile:
-                config.write(configfile, space_around_delimiters=False)
-                configfile.flush()
-        except KeyError as e:
-            logger.error("inventory_tagging:add_hostname_inventory: "
-                         "Error adding hostname %s to inventory file %s. "
-                         "Error type: %s. Error message: %s",
-                         hostname, inventory_file, type(e), e)
-        except (OSError, Exception) as err:  # pylint: disable=W0718
-            logger.error("inventory_tagging:add_hostname_inventory: "
-                         "Error adding hostname %s to inventory file %s. "
-                         "Error type: %s. "
+    def write_inventory_files(self) -> None:
+        """
+        Write the hostnames added to every inventory file, each file once.
+        """
+        for inventory_file, err in self.inventory_writer.write().items():
+            logger.error("inventory_tagging:write_inventory_files: "
+                         "Error writing inventory file %s. "
                          "Error message: %s",
-                         hostname, inventory_file, type(err), err
-                         )
+                         inventory_file, err)
 
     def update_inventory(self, node_detail: Tuple[str, str, str, str, str, str]) -> None:
         """
@@ -151,15 +128,6 @@ class InventoryManager:
             logger.warning("inventory_tagging:update_inventory: "
                            "hostname is unavailable for node %s; skipping inventory update", node)
             return
-        try:
-            if os.getcwd() != self.inventory_dir_path:
-                os.chdir(self.inventory_dir_path)
-        except OSError as err:
-            logger.error("inventory_tagging:update_inventory: "
-                         "Error changing current working directory to %s.\n"
-                         "Error type: %s.\n"
-                         "Error message: %s",
-                         self.inventory_dir_path, type(err), str(err))
         if cpu:
             inventory_file_name = self.vendors.get("cpu", {}).get(cpu)
             if inventory_file_name:
@@ -205,4 +173,5 @@ if __name__ == "__main__":
     node_detail_list = manager.get_cluster_details_db()
     for info in node_detail_list:
         manager.update_inventory(info)
+    manager.write_inventory_files()
     manager.change_inventory_file_permission(manager.inventory_filenames)
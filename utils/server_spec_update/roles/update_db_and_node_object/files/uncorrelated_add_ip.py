@@ -14,62 +14,43 @@
 
 import ipaddress
 import sys
-from psycopg2.extensions import AsIs
+import ip_allocator
 
 """
     This module provides functionality for calculating and
     validating the uncorrelated admin IP for a node.
 """
 
-def cal_nic_ip(cursor, col, ip, end_ip):
+def get_nic_ip_allocator(cursor, col, nic_range):
     """
-    Calculates the uncorrelated network interface IP for a node.
+    Gets the allocator of the network interface IPs of a range, the IPs in use are loaded from DB on first use.
 
     Args:
         cursor (psycopg2.extensions.cursor): A cursor object for executing SQL queries.
         col (str): The column name in the database.
-        ip (str): The starting IP address.
-        end_ip (str): The ending IP address.
+        nic_range (str): static range for assigning network interface ip.
 
     Returns:
-        str: The uncorrelated network interface IP.
-
-    Raises:
-        SystemExit: If the end of the IP range is reached.
-
+        IPAllocator: The allocator of the range.
     """
-    end_ip = ipaddress.IPv4Address(end_ip)
-    op = check_presence_ip(cursor, col, ip)
-    if not op:
-        nic_ip = ipaddress.IPv4Address(ip)
-        return str(nic_ip)
-    elif op:
-        while True:
-            ip = ipaddress.IPv4Address(ip) + 1
-            nic_ip = ip
-            output = check_presence_ip(cursor, col, nic_ip)
-            if not output and nic_ip < end_ip:
-                break
-            else:
-                sys.exit(
-                    "We have reached the end of ranges. Please do a cleanup and provide a wider nic_range, if more nodes needs to be discovered.")
+    start_nic_ip = ipaddress.IPv4Address(nic_range.split('-')[0])
+    # The end ip of the range is not assigned
+    end_nic_ip = ipaddress.IPv4Address(nic_range.split('-')[1]) - 1
+    return ip_allocator.get_allocator(cursor, "cluster.nicinfo", f"{col}_ip", start_nic_ip, end_nic_ip)
 
-        return str(nic_ip)
-def check_presence_ip(cursor, col, ip):
+
+def reserve_ip(cursor, col, nic_range, ip):
     """
-        Check presence of bmc ip in DB.
+        Reserve a correlated network interface ip, if it is not used by another node.
         Parameters:
             cursor: Pointer to omniadb DB.
             col: the col name in the DB
-            ip: ip whose presence we need to check in DB.
+            nic_range: static range for assigning network interface ip.
+            ip: ip to reserve.
         Returns:
-            bool: that gives true or false if the bmc ip is present in DB.
+            bool: true if the ip is in the range, was free and is reserved for the node.
     """
-    query = '''SELECT EXISTS(SELECT %s FROM cluster.nicinfo WHERE %s=%s)'''
-    cursor.execute(query, (AsIs(f"{col}_ip"), AsIs(f"{col}_ip"), str(ip)))
-    output = cursor.fetchone()[0]
-    return output
-
+    return get_nic_ip_allocator(cursor, col, nic_range).reserve(ip)
 
 
 def cal_uncorrelated_add_ip(cursor, col, nic_mode, nic_range):
@@ -83,34 +64,8 @@ def cal_uncorrelated_add_ip(cursor, col, nic_mode, nic_range):
       Returns:
           nic_ip: A valid uncorrelated admin_ip for the node.
     """
-    # create start and end ip
-    start_nic_ip = nic_range.split('-')[0]
-    start_nic_ip = ipaddress.IPv4Address(start_nic_ip)
-    end_nic_ip = nic_range.split('-')[1]
-    end_nic_ip = ipaddress.IPv4Address(end_nic_ip)
-    cursor.execute("SELECT EXISTS(SELECT 1 FROM cluster.nicinfo LIMIT 1)")
-    rows_exist = cursor.fetchone()[0]
-    if nic_mode == "static":
-        if rows_exist:
-            sql = f'''select %s from cluster.nicinfo where %s is not NULL ORDER BY %s  DESC LIMIT 1'''
-            cursor.execute(sql, (AsIs(f"{col}_ip"), AsIs(f"{col}_ip"), AsIs(f"{col}_ip")))
-            last_nic_ip = cursor.fetchone()
-            if last_nic_ip is None:
-                return str(start_nic_ip)
-            elif start_nic_ip <= ipaddress.IPv4Address(last_nic_ip[0]) <= end_nic_ip:
-                nic_ip = cal_nic_ip(cursor, col, last_nic_ip[0], str(end_nic_ip))
-                return str(nic_ip)
-        else:
-            return str(start_nic_ip)
-    if nic_mode == "cidr":
-        if rows_exist:
-            sql = f'''select %s from cluster.nicinfo where %s is not NULL ORDER BY %s  DESC LIMIT 1'''
-            cursor.execute(sql, (AsIs(f"{col}_ip"), AsIs(f"{col}_ip"), AsIs(f"{col}_ip")))
-            last_nic_ip = cursor.fetchone()
-            if last_nic_ip is None:
-                return str(start_nic_ip)
-            elif start_nic_ip <= ipaddress.IPv4Address(last_nic_ip[0]) <= end_nic_ip:
-                nic_ip = cal_nic_ip(cursor, col, last_nic_ip[0], str(end_nic_ip))
-                return str(nic_ip)
-        else:
-            return str(start_nic_ip)
\ No newline at end of file
+    nic_ip = get_nic_ip_allocator(cursor, col, nic_range).allocate()
+    if nic_ip is None:
+        sys.exit(
+            "We have reached the end of ranges. Please do a cleanup and provide a wider nic_range, if more nodes needs to be discovered.")
+    return str(nic_ip)
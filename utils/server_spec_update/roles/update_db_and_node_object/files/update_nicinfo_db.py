@@ -15,14 +15,16 @@
 import sys, os
 import yaml
 import ipaddress
+
+db_path = sys.argv[7]
+sys.path.insert(0, db_path)
+
 import uncorrelated_add_ip
 import correlation_admin_add_nic
 import insert_nicinfo_db
 from distutils.util import strtobool
 from fetch_booted_node import get_booted_nodes  # Import fetch_booted_nodes
 
-db_path = sys.argv[7]
-sys.path.insert(0, db_path)
 inventory_status = bool(strtobool(sys.argv[8]))
 
 def validate_input(value):
@@ -87,16 +89,14 @@ def generate_ip(nw_name):
                 return nic_ip
             if nic_mode == "cidr":
                 start_ip = ipaddress.IPv4Address(nic_range.split('-')[0])
-                end_ip = ipaddress.IPv4Address(nic_range.split('-')[1])
                 output = correlation_admin_add_nic.check_valid_nb(net_bits, admin_nb)
                 if output:
                     nic_ip = correlation_admin_add_nic.correlation_admin_to_nic(node_detail, start_ip,
                                                                                 net_bits,
                                                                                 admin_nb)
-                    op = uncorrelated_add_ip.check_presence_ip(cursor, col, nic_ip)
-                    if not op and ipaddress.IPv4Address(nic_ip) < end_ip:
+                    if uncorrelated_add_ip.reserve_ip(cursor, col, nic_range, nic_ip):
                         return nic_ip
-                    elif op:
+                    else:
                         nic_ip = uncorrelated_add_ip.cal_uncorrelated_add_ip(cursor, col, nic_mode, nic_range)
                         return nic_ip
                 elif not output: